@@ -1,18 +1,30 @@
 from flask import Flask
 from config import Config
-from .extensions import db, migrate, login_manager, mail
+from .extensions import db, migrate, login_manager, mail, mail_dispatcher, permission_cache, report_cache, choices_cache, workload_cache, fragment_cache, query_profiler
 from .routes import register_blueprints
+from .commands import register_commands
+from .utils import database
 
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = database.engine_options(app.config)
 
     db.init_app(app)
+    database.init_app(app, db)
+    query_profiler.init_app(app, db)
     migrate.init_app(app, db)
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
     mail.init_app(app)
+    mail_dispatcher.init_app(app)
+    permission_cache.init_app(app)
+    report_cache.init_app(app)
+    choices_cache.init_app(app)
+    workload_cache.init_app(app)
+    fragment_cache.init_app(app)
 
     register_blueprints(app)
+    register_commands(app)
 
     return app
\ No newline at end of file
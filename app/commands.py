@@ -0,0 +1,185 @@
+import csv
+import sys
+import tempfile
+import time
+from contextlib import nullcontext
+from datetime import date
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from app.extensions import db
+from app.models import MonthlyKPISummary, OutboxMessage, User
+from app.utils import db_benchmark, kpi_engine, outbox, replica, search
+from app.utils.importer import import_rows, read_rows, KINDS
+from app.utils.exporter import stream_export, EXPORTS, FORMATS
+
+kpi_cli = AppGroup('kpi', help='Monthly KPI maintenance.')
+
+@kpi_cli.command('rebuild-summary')
+def rebuild_summary():
+    """Recompute monthly_kpi_summary from every monthly_kpis row."""
+    MonthlyKPISummary.refresh(db.session.connection())
+    db.session.commit()
+    click.echo(f"Rebuilt {db.session.query(MonthlyKPISummary).count()} monthly KPI summaries.")
+
+@kpi_cli.command('suggest')
+@click.option('--month', help='Last month to compute, YYYY-MM (default: the current month).')
+@click.option('--months', type=click.IntRange(min=1), default=2, show_default=True,
+              help='Months to recompute, counting back from --month.')
+def suggest(month, months):
+    """Precompute suggested KPI scores into kpi_suggestions. Meant to run nightly."""
+    today = date.today()
+    try:
+        year, month = (int(part) for part in month.split('-')) if month else (today.year, today.month)
+        date(year, month, 1)
+    except ValueError:
+        raise click.BadParameter("expected YYYY-MM", param_hint='--month') from None
+    index = year * 12 + month - 1 - (months - 1)
+    first, last = (index // 12, index % 12 + 1), (year, month)
+    count = kpi_engine.precompute(first, last)
+    db.session.commit()
+    click.echo(f"Stored {count} KPI suggestions for {first[0]}-{first[1]:02d} to {last[0]}-{last[1]:02d}.")
+
+outbox_cli = AppGroup('outbox', help='Send queued notification emails.')
+
+@outbox_cli.command('run')
+@click.option('--batch-size', type=int, help='Messages claimed per batch (default OUTBOX_BATCH_SIZE).')
+@click.option('--interval', type=float, help='Seconds to sleep when the outbox is empty (default OUTBOX_POLL_INTERVAL).')
+@click.option('--once', is_flag=True, help='Exit once nothing is due instead of polling.')
+@click.option('--flush', is_flag=True, help='Send digests now instead of waiting out OUTBOX_DIGEST_WINDOW.')
+def outbox_run(batch_size, interval, once, flush):
+    """Claim pending notifications in batches and send them. Run several for more throughput."""
+    try:
+        sent = outbox.run(batch_size=batch_size, interval=interval, once=once, flush=flush)
+        click.echo(f"Sent {sent} messages.")
+    except KeyboardInterrupt:
+        click.echo("Stopped.")
+
+@outbox_cli.command('status')
+def outbox_status():
+    """Show message counts per status."""
+    counts = db.session.execute(
+        db.select(OutboxMessage.status, db.func.count()).group_by(OutboxMessage.status)
+    ).all()
+    for status, count in counts:
+        click.echo(f"{status}: {count}")
+
+import_cli = AppGroup('import', help='Bulk-load CSV/XLSX files.')
+
+@import_cli.command('file')
+@click.argument('kind', type=click.Choice(sorted(KINDS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--dry-run', is_flag=True, help='Validate every row, then roll everything back.')
+@click.option('--chunk-size', type=int, help='Rows per transaction (default IMPORT_CHUNK_SIZE).')
+@click.option('--as', 'importer_email', help='Email recorded as creator of imported projects and tasks.')
+@click.option('--errors', 'errors_path', type=click.Path(dir_okay=False, writable=True), help='Write every row error to this CSV.')
+def import_file(kind, path, dry_run, chunk_size, importer_email, errors_path):
+    """Import departments, users, projects or tasks from PATH. Import in that order."""
+    importer_id = None
+    if importer_email:
+        importer_id = db.session.scalar(db.select(User.id).where(User.email == importer_email))
+        if importer_id is None:
+            raise click.BadParameter(f"no user with email {importer_email!r}", param_hint='--as')
+    with open(path, 'rb') as stream:
+        try:
+            rows = read_rows(stream, path)
+        except RuntimeError as e:
+            raise click.ClickException(str(e))
+        result = import_rows(kind, rows, importer_id=importer_id, dry_run=dry_run,
+                             chunk_size=chunk_size or current_app.config['IMPORT_CHUNK_SIZE'])
+    verb = 'Would import' if dry_run else 'Imported'
+    click.echo(f"{verb} {result.imported} of {result.rows} {kind} rows; {len(result.errors)} errors.")
+    if errors_path:
+        with open(errors_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['line', 'error'])
+            writer.writerows(result.errors)
+    else:
+        for error in result.errors[:20]:
+            click.echo(f"  line {error.line}: {error.message}")
+        if len(result.errors) > 20:
+            click.echo(f"  ... {len(result.errors) - 20} more; use --errors to save them all.")
+
+export_cli = AppGroup('export', help='Stream tasks, reviews, KPIs or assignments to CSV/Parquet.')
+
+@export_cli.command('file')
+@click.argument('kind', type=click.Choice(sorted(EXPORTS)))
+@click.option('--format', 'fmt', type=click.Choice(sorted(FORMATS)), default='csv', show_default=True)
+@click.option('--department', 'department_id', type=int, help='Only this department and everything below it.')
+@click.option('--start', type=click.DateTime(['%Y-%m-%d']), help='First day to include (YYYY-MM-DD).')
+@click.option('--end', type=click.DateTime(['%Y-%m-%d']), help='First day to exclude (YYYY-MM-DD).')
+@click.option('-o', '--output', type=click.Path(dir_okay=False, writable=True), help='Write here instead of stdout.')
+def export_file(kind, fmt, department_id, start, end, output):
+    """Export KIND rows, streamed a chunk at a time so any size fits in constant memory."""
+    if fmt == 'parquet' and not output:
+        raise click.UsageError('Parquet exports need --output.')
+    try:
+        chunks = stream_export(kind, fmt, department_id=department_id,
+                               start=start.date() if start else None, end=end.date() if end else None)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    with (open(output, 'wb') if output else nullcontext(sys.stdout.buffer)) as f:
+        for chunk in chunks:
+            f.write(chunk)
+
+search_cli = AppGroup('search', help='Full-text search index over tasks and projects.')
+
+@search_cli.command('rebuild')
+def search_rebuild():
+    """Create the FTS5 tables if missing and reindex every task and project (SQLite only)."""
+    if db.engine.dialect.name != 'sqlite':
+        click.echo("Full-text search needs SQLite FTS5; this database uses the LIKE fallback.")
+        return
+    connection = db.session.connection()
+    search.create_index(connection)
+    counts = {kind: search.reindex(connection, kind) for kind in search.INDEXES}
+    db.session.commit()
+    click.echo(f"Indexed {counts['task']} tasks and {counts['project']} projects.")
+
+bench_cli = AppGroup('bench', help='Measure the app under load.')
+
+@bench_cli.command('writes')
+@click.option('--workers', type=click.IntRange(min=1), multiple=True, default=(1, 4, 8), show_default=True,
+              help='Concurrent writer processes; repeat to compare several.')
+@click.option('--readers', type=click.IntRange(min=0), default=2, show_default=True,
+              help='Processes running report queries alongside the writers.')
+@click.option('--seconds', type=click.FloatRange(min=1), default=5, show_default=True, help='Length of each run.')
+def bench_writes(workers, readers, seconds):
+    """Task toggles + reviews committed per second on scratch SQLite files, stock settings vs SQLITE_PRAGMAS."""
+    profiles = (('stock', {}), ('tuned', current_app.config['SQLITE_PRAGMAS']))
+    click.echo(f"{'writers':>7} {'readers':>7}  {'profile':<7} {'writes/s':>9} {'reads/s':>8} {'locked':>7}")
+    with tempfile.TemporaryDirectory() as directory:
+        for count in workers:
+            for name, pragmas in profiles:
+                result = db_benchmark.run(pragmas, count, seconds, directory, name, readers=readers)
+                click.echo(f"{count:>7} {readers:>7}  {name:<7} {result.write_rate:>9.1f} {result.read_rate:>8.1f} {result.locked:>7}")
+
+replica_cli = AppGroup('replica', help='Read replica helpers.')
+
+@replica_cli.command('sync')
+@click.option('--every', type=click.FloatRange(min=0.1), help='Keep syncing at this interval (seconds) until stopped.')
+def replica_sync(every):
+    """Copy a SQLite primary over a SQLite replica: a stand-in for replication when developing locally."""
+    engines = db.engines
+    if replica.REPLICA not in engines:
+        raise click.UsageError("No replica configured; set REPLICA_DATABASE_URL.")
+    if engines[None].dialect.name != 'sqlite' or engines[replica.REPLICA].dialect.name != 'sqlite':
+        raise click.UsageError("Only SQLite databases can be synced; a real replica replicates itself.")
+    try:
+        while True:
+            replica.sync_sqlite(engines[None], engines[replica.REPLICA])
+            if every is None:
+                click.echo("Replica synced.")
+                return
+            time.sleep(every)
+    except KeyboardInterrupt:
+        click.echo("Stopped.")
+
+def register_commands(app):
+    app.cli.add_command(kpi_cli)
+    app.cli.add_command(outbox_cli)
+    app.cli.add_command(import_cli)
+    app.cli.add_command(export_cli)
+    app.cli.add_command(search_cli)
+    app.cli.add_command(bench_cli)
+    app.cli.add_command(replica_cli)
\ No newline at end of file
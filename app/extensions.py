@@ -2,8 +2,21 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_login import LoginManager
 from flask_mail import Mail
+from app.utils.cache import Cache, FragmentCache
+from app.utils.mail_queue import MailDispatcher
+from app.utils.profiling import QueryProfiler
+from app.utils.replica import RoutingSession
 
-db = SQLAlchemy()
+# reads of @replica_reads views go to the 'replica' bind when one is configured
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
 login_manager = LoginManager()
-mail = Mail()
\ No newline at end of file
+mail = Mail()
+mail_dispatcher = MailDispatcher(mail)
+permission_cache = Cache('permissions')
+report_cache = Cache('reports')
+choices_cache = Cache('choices')
+# one entry per (user, week), so a department-wide capacity view fits
+workload_cache = Cache('workload', maxsize=200_000)
+fragment_cache = FragmentCache()
+query_profiler = QueryProfiler()
\ No newline at end of file
@@ -1,7 +1,7 @@
 from flask_wtf import FlaskForm
 from wtforms import StringField, SelectField, SubmitField
 from wtforms.validators import DataRequired, Optional, Length
-from app.models import Department
+from app.utils import choices
 
 class DepartmentForm(FlaskForm):
     name = StringField('Department Name', validators=[DataRequired(), Length(min=1, max=128)])
@@ -10,4 +10,4 @@ class DepartmentForm(FlaskForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.parent_id.choices = [(-1, 'None')] + [(d.id, d.name) for d in Department.query.order_by(Department.name).all()]
\ No newline at end of file
+        self.parent_id.choices = [(-1, 'None')] + choices.departments()
\ No newline at end of file
@@ -0,0 +1,12 @@
+from flask_wtf import FlaskForm
+from flask_wtf.file import FileField, FileRequired, FileAllowed
+from wtforms import SelectField, BooleanField, SubmitField
+from app.utils.importer import EXTENSIONS
+
+class ImportForm(FlaskForm):
+    kind = SelectField('Import', choices=[
+        ('departments', 'Departments'), ('users', 'Users'), ('projects', 'Projects'), ('tasks', 'Tasks')
+    ])
+    file = FileField('CSV or XLSX file', validators=[FileRequired(), FileAllowed(EXTENSIONS, 'CSV or XLSX files only.')])
+    dry_run = BooleanField('Dry run (validate only, import nothing)', default=True)
+    submit = SubmitField('Upload')
\ No newline at end of file
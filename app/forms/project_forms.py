@@ -1,7 +1,7 @@
 from flask_wtf import FlaskForm
 from wtforms import StringField, SelectField, SubmitField, TextAreaField
 from wtforms.validators import DataRequired, Length
-from app.models import Department
+from app.utils import choices
 
 class ProjectForm(FlaskForm):
     name = StringField('Project Name', validators=[DataRequired(), Length(min=1, max=128)])
@@ -11,4 +11,4 @@ class ProjectForm(FlaskForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.department_id.choices = [(d.id, d.name) for d in Department.query.order_by(Department.name).all()]
\ No newline at end of file
+        self.department_id.choices = choices.departments()
\ No newline at end of file
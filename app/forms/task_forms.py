@@ -1,6 +1,6 @@
 from flask_wtf import FlaskForm
 from wtforms import StringField, TextAreaField, SelectField, SelectMultipleField, DateField, SubmitField, IntegerField
-from wtforms.validators import DataRequired, NumberRange
+from wtforms.validators import DataRequired, NumberRange, Optional
 
 class TaskForm(FlaskForm):
     name = StringField('Task Name', validators=[DataRequired()])
@@ -8,6 +8,7 @@ class TaskForm(FlaskForm):
     project_id = SelectField('Project', coerce=int, validators=[DataRequired()])
     manager_id = SelectField('Manager', coerce=int, validators=[DataRequired()])
     assignees = SelectMultipleField('Assignees', coerce=int)
+    workload_percent = IntegerField('Workload per assignee (%)', default=100, validators=[Optional(), NumberRange(min=0, max=100)])
     start_date = DateField('Start Date')
     end_date = DateField('End Date')
     submit = SubmitField('Create/Edit Task')
@@ -1,7 +1,7 @@
 from flask_wtf import FlaskForm
-from wtforms import SelectField, SubmitField, HiddenField, StringField, DateField, IntegerField, BooleanField, TextAreaField
+from wtforms import SelectField, SubmitField, StringField, DateField, IntegerField, BooleanField, TextAreaField
 from wtforms.validators import DataRequired, Email, Length, Optional, NumberRange
-from app.models import User, Department, Role, UserAssignment
+from app.utils import choices
 
 class UserRoleAssignForm(FlaskForm):
     user_id = SelectField('User', coerce=int, validators=[DataRequired()])
@@ -11,18 +11,13 @@ class UserRoleAssignForm(FlaskForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.user_id.choices = [(u.id, u.name) for u in User.query.all()]
-        self.department_id.choices = [(d.id, d.name) for d in Department.query.all()]
-        self.role_id.choices = [(r.id, r.name) for r in Role.query.order_by(Role.level.desc()).all()]
+        self.user_id.choices = choices.users()
+        self.department_id.choices = choices.departments()
+        self.role_id.choices = [(r.id, r.name) for r in choices.roles()]
 
-class UserAssignmentEditForm(FlaskForm):
-    assignment_id = HiddenField("Assignment ID")
-    role_id = SelectField("Role", coerce=int, validators=[DataRequired()])
-    submit = SubmitField("Update")
-
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.role_id.choices = [(r.id, r.name) for r in Role.query.order_by(Role.level.desc()).all()]
+class BulkRoleUpdateForm(FlaskForm):
+    # one ``role-<assignment id>`` select per row is read straight from request.form
+    submit = SubmitField('Save changes')
 
 class EditUserForm(FlaskForm):
     name = StringField('Name', validators=[DataRequired(), Length(min=2, max=128)])
@@ -33,9 +28,8 @@ class EditUserForm(FlaskForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        from app.models import Department, Role
-        self.department_id.choices = [(d.id, d.name) for d in Department.query.order_by(Department.name).all()]
-        self.role_id.choices = [(r.id, f"{r.name} (Level {r.level})") for r in Role.query.order_by(Role.level).all()]
+        self.department_id.choices = choices.departments()
+        self.role_id.choices = [(r.id, f"{r.name} (Level {r.level})") for r in reversed(choices.roles())]
 
 class DateRangeForm(FlaskForm):
     start_date = DateField('Start date (inclusive)', validators=[Optional()])
@@ -1,17 +1,24 @@
+from collections import namedtuple
 from datetime import datetime
-from app.extensions import db
+from app.extensions import db, permission_cache, report_cache, choices_cache, workload_cache, fragment_cache
 from flask_login import UserMixin
+from sqlalchemy.orm import make_transient_to_detached
 from werkzeug.security import generate_password_hash, check_password_hash
 from app import login_manager
+from app.utils.access_control import AuthContext, DepartmentRole
+from app.utils.cache import flushed_tables, statement_table
 from datetime import datetime, timezone
 
 task_assignments = db.Table(
     'task_assignments',
     db.Column('task_id', db.Integer, db.ForeignKey('tasks.id'), primary_key=True),
     db.Column('user_id', db.Integer, db.ForeignKey('users.id'), primary_key=True),
-    db.Column('workload_percent', db.Integer)
+    db.Column('workload_percent', db.Integer),
+    db.Index('ix_task_assignments_user_task', 'user_id', 'task_id'),
 )
 
+_TreeNode = namedtuple('_TreeNode', 'id name parent_id')
+
 class Department(db.Model):
     __tablename__ = 'departments'
     id = db.Column(db.Integer, primary_key=True)
@@ -20,9 +27,123 @@ class Department(db.Model):
     children = db.relationship('Department', backref='parent', remote_side=[id])
     projects = db.relationship('Project', back_populates='department', lazy='dynamic')
 
+    __table_args__ = (
+        db.Index('ix_departments_parent_id', 'parent_id'),
+    )
+
     def __repr__(self):
         return f"<Department {self.name}>"
 
+    @staticmethod
+    def subtree_ids(department_id):
+        """Select of ``department_id`` and every department below it, for use in ``IN``/joins."""
+        return db.select(DepartmentClosure.descendant_id).where(DepartmentClosure.ancestor_id == department_id)
+
+    def descendants(self, include_self=False):
+        query = (
+            Department.query
+            .join(DepartmentClosure, DepartmentClosure.descendant_id == Department.id)
+            .filter(DepartmentClosure.ancestor_id == self.id)
+        )
+        if not include_self:
+            query = query.filter(DepartmentClosure.depth > 0)
+        return query.order_by(DepartmentClosure.depth, Department.name)
+
+    def ancestors(self, include_self=False):
+        """Ancestors from the root down to this department's parent (or itself)."""
+        query = (
+            Department.query
+            .join(DepartmentClosure, DepartmentClosure.ancestor_id == Department.id)
+            .filter(DepartmentClosure.descendant_id == self.id)
+        )
+        if not include_self:
+            query = query.filter(DepartmentClosure.depth > 0)
+        return query.order_by(DepartmentClosure.depth.desc())
+
+    @property
+    def depth(self):
+        return db.session.scalar(
+            db.select(db.func.max(DepartmentClosure.depth)).where(DepartmentClosure.descendant_id == self.id)
+        ) or 0
+
+    def is_ancestor_of(self, department_id):
+        return db.session.get(DepartmentClosure, (self.id, department_id)) is not None
+
+    @classmethod
+    def tree(cls, root_id=None, yield_per=1000):
+        """Yield every department as ``((id, name, parent_id), depth)`` in pre-order, siblings by name.
+
+        With ``root_id``, only that department and its descendants (depths stay absolute).
+        One query, read lazily in batches of ``yield_per`` plain rows rather than mapped objects;
+        nothing runs until the first item is requested.
+        """
+        query = (
+            db.select(cls.id, cls.name, cls.parent_id, db.func.max(DepartmentClosure.depth))
+            .join(DepartmentClosure, DepartmentClosure.descendant_id == cls.id)
+            .group_by(cls.id)
+            .order_by(cls.name)
+            .execution_options(yield_per=yield_per)
+        )
+        if root_id is not None:
+            query = query.where(cls.id.in_(cls.subtree_ids(root_id)))
+        result = db.session.execute(query)
+        children, root = {}, []
+        for id_, name, parent_id, depth in result:
+            node = (_TreeNode(id_, name, parent_id), depth)
+            children.setdefault(parent_id, []).append(node)
+            if id_ == root_id:
+                root = [node]
+        stack = list(reversed(children.get(None, []) if root_id is None else root))
+        while stack:
+            dept, depth = stack.pop()
+            yield dept, depth
+            stack.extend(reversed(children.get(dept.id, [])))
+
+class DepartmentClosure(db.Model):
+    """Every (ancestor, descendant) pair in the department hierarchy, including (d, d, 0)."""
+    __tablename__ = 'department_closure'
+    ancestor_id = db.Column(db.Integer, db.ForeignKey('departments.id', ondelete='CASCADE'), primary_key=True)
+    descendant_id = db.Column(db.Integer, db.ForeignKey('departments.id', ondelete='CASCADE'), primary_key=True)
+    depth = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_department_closure_descendant', 'descendant_id', 'depth'),
+    )
+
+    @staticmethod
+    def insert_node(connection, department_id, parent_id):
+        closure = DepartmentClosure.__table__
+        connection.execute(closure.insert().values(ancestor_id=department_id, descendant_id=department_id, depth=0))
+        if parent_id is not None:
+            connection.execute(closure.insert().from_select(
+                ['ancestor_id', 'descendant_id', 'depth'],
+                db.select(closure.c.ancestor_id, db.literal(department_id), closure.c.depth + 1)
+                .where(closure.c.descendant_id == parent_id)
+            ))
+
+    @staticmethod
+    def move_subtree(connection, department_id, parent_id):
+        closure = DepartmentClosure.__table__
+        if parent_id is not None and connection.execute(
+            db.select(closure.c.depth).where(closure.c.ancestor_id == department_id, closure.c.descendant_id == parent_id)
+        ).first():
+            raise ValueError(f"Department {department_id} cannot be moved under its own sub-department {parent_id}")
+        subtree = db.select(closure.c.descendant_id).where(closure.c.ancestor_id == department_id)
+        old_ancestors = db.select(closure.c.ancestor_id).where(closure.c.descendant_id == department_id, closure.c.depth > 0)
+        connection.execute(closure.delete().where(
+            closure.c.descendant_id.in_(subtree.scalar_subquery()),
+            closure.c.ancestor_id.in_(old_ancestors.scalar_subquery()),
+        ))
+        if parent_id is not None:
+            above = closure.alias('above')
+            below = closure.alias('below')
+            connection.execute(closure.insert().from_select(
+                ['ancestor_id', 'descendant_id', 'depth'],
+                db.select(above.c.ancestor_id, below.c.descendant_id, above.c.depth + below.c.depth + 1)
+                .select_from(above.join(below, db.true()))
+                .where(above.c.descendant_id == parent_id, below.c.ancestor_id == department_id)
+            ))
+
 class Role(db.Model):
     __tablename__ = 'roles'
     id = db.Column(db.Integer, primary_key=True)
@@ -37,6 +158,8 @@ class User(UserMixin, db.Model):
     password_hash = db.Column(db.String(128), nullable=False)
     assignments = db.relationship('UserAssignment', back_populates='user')
 
+    _auth = None  # AuthContext, set by load_user or built on first use
+
     def __repr__(self):
         return f"<User {self.email}>"
 
@@ -46,19 +169,51 @@ class User(UserMixin, db.Model):
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
     
+    @property
+    def auth(self):
+        if self._auth is None:
+            self._auth = AuthContext.from_assignments(self.assignments)
+        return self._auth
+
     @property
     def max_role_level(self):
-        levels = [assignment.role.level for assignment in self.assignments]
-        return max(levels) if levels else 0
+        return self.auth.max_level
     
     def get_kpi_for_month(self, year: int, month: int):
         """Return the highest KPI score (int) for this user in given year/month, or None."""
-        row = MonthlyKPI.query.filter_by(user_id=self.id, year=year, month=month).order_by(MonthlyKPI.score.desc()).first()
-        return row.score if row else None
+        summary = db.session.get(MonthlyKPISummary, (self.id, year, month))
+        return summary.max_score if summary else None
     
 @login_manager.user_loader
 def load_user(id): # id passed in here is string so we want to convert back to int for our database
-    return db.session.get(User, int(id))
+    user_id = int(id)
+    cached = permission_cache.get(user_id)
+    if cached is not None:
+        # the user's own columns are cached with the roles, so a hit makes no query of its own:
+        # the instance joins the session as if just loaded (password_hash stays unloaded until used)
+        name, email, department_roles = cached
+        user = User(id=user_id, name=name, email=email)
+        make_transient_to_detached(user)
+        user = db.session.merge(user, load=False)
+        user._auth = AuthContext(DepartmentRole(*dr) for dr in department_roles)
+        return user
+
+    # user and all of its roles in one round trip; the AuthContext then lives on the
+    # identity-mapped instance for the rest of the request
+    rows = db.session.execute(
+        db.select(User, UserAssignment.department_id, Department.name, Role.name, Role.level)
+        .outerjoin(User.assignments)
+        .outerjoin(UserAssignment.role)
+        .outerjoin(UserAssignment.department)
+        .filter(User.id == user_id)
+    ).all()
+    if not rows:
+        return None
+    department_roles = [tuple(row[1:]) for row in rows if row[1] is not None]
+    user = rows[0][0]
+    permission_cache.set(user_id, (user.name, user.email, department_roles))
+    user._auth = AuthContext(DepartmentRole(*dr) for dr in department_roles)
+    return user
 
 class UserAssignment(db.Model):
     __tablename__ = 'user_assignments'
@@ -71,6 +226,13 @@ class UserAssignment(db.Model):
     role = db.relationship('Role')
     department = db.relationship('Department')
 
+    __table_args__ = (
+        # load_user / permission checks: covers user -> (department, role)
+        db.Index('ix_user_assignments_user_dept_role', 'user_id', 'department_id', 'role_id'),
+        # managers' views filter by department
+        db.Index('ix_user_assignments_dept_user', 'department_id', 'user_id'),
+    )
+
 class Project(db.Model):
     __tablename__ = 'projects'
     id = db.Column(db.Integer, primary_key=True)
@@ -82,6 +244,10 @@ class Project(db.Model):
     creator = db.relationship('User', backref='created_projects')
     department = db.relationship('Department', back_populates='projects')
 
+    __table_args__ = (
+        db.Index('ix_projects_department_id', 'department_id'),
+    )
+
 class Task(db.Model):
     __tablename__ = 'tasks'
     id = db.Column(db.Integer, primary_key=True)
@@ -93,11 +259,22 @@ class Task(db.Model):
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
     manager_id = db.Column(db.Integer, db.ForeignKey('users.id'))
     submitted = db.Column(db.Boolean, default=False)
+    submitted_at = db.Column(db.DateTime)  # when it was last marked done; compared with end_date for lateness
 
     project = db.relationship('Project', backref='tasks')
     creator = db.relationship('User', foreign_keys=[created_by])
     manager = db.relationship('User', foreign_keys=[manager_id])
     assignees = db.relationship('User', secondary=task_assignments, backref='assigned_tasks')
+    # highest review score, only populated by queries that ask for it with with_expression()
+    best_score = db.query_expression()
+
+    # every task listing seeks on (start_date, id), optionally behind an equality filter
+    __table_args__ = (
+        db.Index('ix_tasks_start_date_id', 'start_date', 'id'),
+        db.Index('ix_tasks_project_start_date', 'project_id', 'start_date', 'id'),
+        db.Index('ix_tasks_manager_start_date', 'manager_id', 'start_date', 'id'),
+        db.Index('ix_tasks_submitted_start_date', 'submitted', 'start_date', 'id'),
+    )
 
 class TaskReview(db.Model):
     __tablename__ = 'task_reviews'
@@ -111,6 +288,10 @@ class TaskReview(db.Model):
     task = db.relationship('Task', backref=db.backref('reviews', cascade='all, delete-orphan'))
     reviewer = db.relationship('User')
 
+    __table_args__ = (
+        db.Index('ix_task_reviews_task_id', 'task_id'),
+    )
+
 class AccessRequest(db.Model):
     __tablename__ = 'access_requests'
     id = db.Column(db.Integer, primary_key=True)
@@ -123,6 +304,10 @@ class AccessRequest(db.Model):
     user = db.relationship('User', foreign_keys=[user_id], backref='access_requests')
     reviewer = db.relationship('User', foreign_keys=[decided_by])
 
+    __table_args__ = (
+        db.Index('ix_access_requests_timestamp', 'timestamp'),
+    )
+
 class MonthlyKPI(db.Model):
     __tablename__ = 'monthly_kpis'
     id = db.Column(db.Integer, primary_key=True)
@@ -139,4 +324,243 @@ class MonthlyKPI(db.Model):
 
     __table_args__ = (
         db.Index('ix_monthlykpi_user_year_month', 'user_id', 'year', 'month'),
-    )
\ No newline at end of file
+    )
+
+class OutboxMessage(db.Model):
+    """A notification written in the same transaction as the change it announces; sent by ``flask outbox run``."""
+    __tablename__ = 'outbox'
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(64), nullable=False)  # template name under email/
+    subject = db.Column(db.String(255), nullable=False)
+    sender = db.Column(db.String(120))
+    recipients = db.Column(db.JSON, nullable=False)
+    context = db.Column(db.JSON, nullable=False)  # ids the sender loads to render the template
+    recipient = db.Column(db.String(120))  # set for digestable rows: everything pending for it goes out as one mail
+    dedup_key = db.Column(db.String(128))  # a newer pending row with the same key replaces or cancels this one
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, sending, sent, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    available_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    claimed_by = db.Column(db.String(64))
+    claimed_at = db.Column(db.DateTime)
+    sent_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+
+    __table_args__ = (
+        db.Index('ix_outbox_status_available', 'status', 'available_at', 'id'),
+        db.Index('ix_outbox_claimed_by', 'claimed_by'),
+        db.Index('ix_outbox_recipient_status', 'recipient', 'status'),
+        db.Index('ix_outbox_dedup_key', 'dedup_key'),
+    )
+
+class MonthlyKPISummary(db.Model):
+    """Per (user, year, month) roll-up of MonthlyKPI, kept in step by the after_flush hook below."""
+    __tablename__ = 'monthly_kpi_summary'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    year = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, primary_key=True)
+    max_score = db.Column(db.Integer, nullable=False)
+    min_score = db.Column(db.Integer, nullable=False)
+    avg_score = db.Column(db.Float, nullable=False)
+    kpi_count = db.Column(db.Integer, nullable=False)
+    latest_reviewer_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'))
+
+    latest_reviewer = db.relationship('User', foreign_keys=[latest_reviewer_id])
+
+    @staticmethod
+    def _aggregate_select():
+        latest = db.aliased(MonthlyKPI)
+        latest_reviewer = (
+            db.select(latest.reviewer_id)
+            .where(latest.user_id == MonthlyKPI.user_id, latest.year == MonthlyKPI.year, latest.month == MonthlyKPI.month)
+            .order_by(latest.timestamp.desc(), latest.id.desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+        return db.select(
+            MonthlyKPI.user_id, MonthlyKPI.year, MonthlyKPI.month,
+            db.func.max(MonthlyKPI.score), db.func.min(MonthlyKPI.score), db.func.avg(MonthlyKPI.score),
+            db.func.count(MonthlyKPI.id), latest_reviewer,
+        ).group_by(MonthlyKPI.user_id, MonthlyKPI.year, MonthlyKPI.month)
+
+    @classmethod
+    def refresh(cls, connection, keys=None):
+        """Recompute the summary rows for ``keys`` ((user_id, year, month) tuples), or all of them."""
+        columns = ['user_id', 'year', 'month', 'max_score', 'min_score', 'avg_score', 'kpi_count', 'latest_reviewer_id']
+        delete = db.delete(cls)
+        select = cls._aggregate_select()
+        if keys is not None:
+            keys = list(keys)
+            if not keys:
+                return
+            delete = delete.where(db.tuple_(cls.user_id, cls.year, cls.month).in_(keys))
+            select = select.where(db.tuple_(MonthlyKPI.user_id, MonthlyKPI.year, MonthlyKPI.month).in_(keys))
+        connection.execute(delete)
+        connection.execute(db.insert(cls).from_select(columns, select))
+
+class KPISuggestion(db.Model):
+    """Suggested MonthlyKPI score per (user, year, month), precomputed by `flask kpi suggest`.
+
+    Rows of a precomputed month are recomputed when a commit changes their user's tasks or reviews
+    (app.utils.kpi_engine.refresh).
+    """
+    __tablename__ = 'kpi_suggestions'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    year = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, primary_key=True)
+    score = db.Column(db.Integer, nullable=False)  # 0-100
+    factors = db.Column(db.JSON, nullable=False)  # {factor name: 0-1 value} that went into the score
+    task_count = db.Column(db.Integer, nullable=False)
+    computed_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+class DataVersion(db.Model):
+    """Write counter per table (or finer-grained name, e.g. ``workload:<user id>``), bumped inside
+    the transaction that writes to it.
+
+    Conditional GETs (app.utils.conditional) build their validators from these rows, and every
+    Cache namespace keys its entries by them; being transactional they are shared by every
+    worker and never disagree with the data.
+    """
+    __tablename__ = 'data_versions'
+    table_name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    changed_at = db.Column(db.DateTime, nullable=False)
+
+    TRACKED = frozenset({
+        'departments', 'projects', 'roles', 'users', 'user_assignments', 'tasks', 'task_assignments',
+        'task_reviews', 'monthly_kpis',
+    })
+
+    @classmethod
+    def bump(cls, connection, tables):
+        now = datetime.now(timezone.utc)
+        tables = sorted(tables)
+        result = connection.execute(
+            db.update(cls).where(cls.table_name.in_(tables)).values(version=cls.version + 1, changed_at=now)
+        )
+        if result.rowcount != len(tables):
+            # first write to a table since the rows were seeded (or in a create_all() database)
+            existing = set(connection.scalars(db.select(cls.table_name).where(cls.table_name.in_(tables))))
+            connection.execute(db.insert(cls), [
+                {'table_name': table, 'version': 1, 'changed_at': now} for table in tables if table not in existing
+            ])
+
+    @classmethod
+    def bump_in(cls, session, names):
+        """Bump ``names`` in ``session``'s transaction; once per name and transaction is enough."""
+        bumped = session.info.setdefault('data_versions_bumped', set())
+        names = set(names) - bumped
+        if names:
+            bumped |= names
+            cls.bump(session.connection(), names)
+
+    @classmethod
+    def bump_at_commit(cls, session, names):
+        """Bump ``names`` just before ``session`` commits, for bulk statements that may run again."""
+        session.info.setdefault('data_versions_pending', set()).update(names)
+
+    @classmethod
+    def committed(cls, names):
+        """``{name: version}`` as last committed (0 if never bumped), or None if this transaction bumped any of ``names``.
+
+        Read once per transaction: the first call loads every tracked table along with ``names``,
+        later calls only query names not seen yet.
+        """
+        session = db.session()
+        if any(not session.info.get(key, set()).isdisjoint(names) for key in ('data_versions_bumped', 'data_versions_pending')):
+            return None
+        read = session.info.setdefault('data_versions_read', {})
+        missing = {name for name in names if name not in read}
+        if missing:
+            if not read:
+                missing |= cls.TRACKED
+            read.update(dict.fromkeys(missing, 0))
+            read.update(session.execute(
+                db.select(cls.table_name, cls.version).where(cls.table_name.in_(sorted(missing)))
+            ).all())
+        return {name: read[name] for name in names}
+
+@db.event.listens_for(db.session, 'after_flush')
+def _bump_flushed_versions(session, flush_context):
+    DataVersion.bump_in(session, flushed_tables(session) & DataVersion.TRACKED)
+
+@db.event.listens_for(db.session, 'do_orm_execute')
+def _mark_bulk_versions(orm_execute_state):
+    table = statement_table(orm_execute_state)
+    if table in DataVersion.TRACKED:
+        DataVersion.bump_at_commit(orm_execute_state.session, {table})
+
+@db.event.listens_for(db.session, 'before_commit')
+def _bump_bulk_versions(session):
+    pending = session.info.pop('data_versions_pending', None)
+    if pending:
+        DataVersion.bump_in(session, pending)
+
+@db.event.listens_for(db.session, 'after_commit')
+@db.event.listens_for(db.session, 'after_rollback')
+def _reset_data_versions(session):
+    session.info.pop('data_versions_bumped', None)
+    session.info.pop('data_versions_pending', None)
+    session.info.pop('data_versions_read', None)
+
+@db.event.listens_for(db.session, 'after_flush')
+def _maintain_department_closure(session, flush_context):
+    connection = None
+    new = [obj for obj in session.new if isinstance(obj, Department)]
+    # parents before children, so a child's insert can copy its parent's paths
+    pending = {obj.id for obj in new}
+    while new:
+        ready = [d for d in new if d.parent_id not in pending]
+        if not ready:
+            raise ValueError("Cycle among newly created departments")
+        for dept in ready:
+            connection = connection or session.connection()
+            DepartmentClosure.insert_node(connection, dept.id, dept.parent_id)
+            pending.discard(dept.id)
+        new = [d for d in new if d.id in pending]
+
+    for obj in session.dirty:
+        if isinstance(obj, Department) and db.inspect(obj).attrs.parent_id.history.has_changes():
+            connection = connection or session.connection()
+            DepartmentClosure.move_subtree(connection, obj.id, obj.parent_id)
+
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, Department)]
+    if deleted:
+        # ON DELETE CASCADE covers this where foreign keys are enforced; SQLite doesn't by default
+        closure = DepartmentClosure.__table__
+        (connection or session.connection()).execute(closure.delete().where(
+            db.or_(closure.c.ancestor_id.in_(deleted), closure.c.descendant_id.in_(deleted))
+        ))
+
+@db.event.listens_for(MonthlyKPI.user_id, 'set', active_history=True)
+@db.event.listens_for(MonthlyKPI.year, 'set', active_history=True)
+@db.event.listens_for(MonthlyKPI.month, 'set', active_history=True)
+def _load_old_kpi_key(target, value, oldvalue, initiator):
+    # nothing to do here; active_history makes the old key show up in the attribute history
+    pass
+
+@db.event.listens_for(db.session, 'after_flush')
+def _refresh_kpi_summaries(session, flush_context):
+    keys = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, MonthlyKPI):
+            keys.add((obj.user_id, obj.year, obj.month))
+            # a moved row also changes the summary it came from
+            state = db.inspect(obj)
+            old = [state.attrs[a].history.deleted for a in ('user_id', 'year', 'month')]
+            if any(old):
+                keys.add(tuple(o[0] if o else getattr(obj, a) for o, a in zip(old, ('user_id', 'year', 'month'))))
+    if keys:
+        MonthlyKPISummary.refresh(session.connection(), keys)
+
+# role levels, managed departments and department names all feed the cached AuthContext; the
+# user's name and email are cached with it
+permission_cache.track(DataVersion.committed, User, UserAssignment, Role, Department)
+# department reports aggregate scores over the hierarchy and task assignments
+report_cache.track(DataVersion.committed, MonthlyKPI, TaskReview, Task, UserAssignment, Department)
+# select-field choice lists (see app.utils.choices); assignments decide who counts as a manager
+choices_cache.track(DataVersion.committed, Department, Role, Project, User, UserAssignment)
+# per-user versions instead of tables: see app.utils.workload
+workload_cache.track(DataVersion.committed)
+# page fragments name the tables they were rendered from; see FragmentCache
+fragment_cache.track(DataVersion.committed, Department, Project, Role, User, UserAssignment, Task, task_assignments)
\ No newline at end of file
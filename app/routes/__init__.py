@@ -4,6 +4,11 @@ from .project import bp as project_bp
 from .task import bp as task_bp
 from .home import bp as home_bp
 from .user import bp as user_bp
+from .report import bp as report_bp
+from .imports import bp as imports_bp
+from .api import bp as api_bp
+from .search import bp as search_bp
+from .admin import bp as admin_bp
 
 def register_blueprints(app):
     app.register_blueprint(auth_bp, url_prefix='/auth')
@@ -11,4 +16,9 @@ def register_blueprints(app):
     app.register_blueprint(project_bp, url_prefix='/projects')
     app.register_blueprint(task_bp, url_prefix='/tasks')
     app.register_blueprint(home_bp)
-    app.register_blueprint(user_bp, url_prefix='/users')
\ No newline at end of file
+    app.register_blueprint(user_bp, url_prefix='/users')
+    app.register_blueprint(report_bp, url_prefix='/reports')
+    app.register_blueprint(imports_bp, url_prefix='/import')
+    app.register_blueprint(search_bp, url_prefix='/search')
+    app.register_blueprint(api_bp, url_prefix='/api/v1')
+    app.register_blueprint(admin_bp, url_prefix='/admin')
\ No newline at end of file
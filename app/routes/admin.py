@@ -0,0 +1,57 @@
+import hmac
+from flask import Blueprint, Response, abort, current_app, flash, redirect, render_template, request, url_for
+from flask_login import login_required, current_user
+from app.extensions import query_profiler
+from app.utils.access_control import role_required
+from app.utils.profiling import by_blueprint, prometheus_text
+
+bp = Blueprint('admin', __name__)
+
+def _caches():
+    return [cache for _, cache in sorted(current_app.extensions.get('caches', {}).items())]
+
+def _cache_stats():
+    """``Cache.stats()`` of every registered namespace, by name; counts are this worker's."""
+    return [cache.stats() for cache in _caches()]
+
+def _mail_stats():
+    dispatcher = current_app.extensions.get('mail_dispatcher')
+    return dispatcher.stats() if dispatcher else None
+
+@bp.route('/queries')
+@login_required
+@role_required(80)
+def queries():
+    """Per-endpoint query stats of this worker, heaviest SQL first."""
+    snapshot = query_profiler.snapshot()
+    endpoints = sorted(snapshot.items(), key=lambda item: item[1].sql_seconds, reverse=True)
+    blueprints = sorted(by_blueprint(snapshot).items(), key=lambda item: item[1].sql_seconds, reverse=True)
+    repeated = sorted(
+        ((endpoint, statement, seen) for endpoint, stats in snapshot.items() for statement, seen in stats.repeated.items()),
+        key=lambda item: item[2][0], reverse=True,
+    )
+    return render_template('admin/queries.html', endpoints=endpoints, blueprints=blueprints, repeated=repeated,
+                           slow_queries=list(reversed(query_profiler.slow_queries)), profiler=query_profiler,
+                           caches=_cache_stats(), mail=_mail_stats(), title='Query Stats')
+
+@bp.route('/queries/reset', methods=['POST'])
+@login_required
+@role_required(80)
+def reset_queries():
+    query_profiler.reset()
+    for cache in _caches():
+        cache.reset_stats()
+    flash("Query stats reset.", "info")
+    return redirect(url_for('admin.queries'))
+
+def _scraper_authorized():
+    token = current_app.config['METRICS_TOKEN']
+    header = request.headers.get('Authorization', '')
+    return bool(token) and header.startswith('Bearer ') and hmac.compare_digest(header[7:].encode(), token.encode())
+
+@bp.route('/metrics')
+def metrics():
+    """The same stats, with the cache and mail queue counters, in Prometheus' text format, for a scraper with ``METRICS_TOKEN`` or a logged-in admin."""
+    if not _scraper_authorized() and not (current_user.is_authenticated and current_user.max_role_level >= 80):
+        abort(403)
+    return Response(prometheus_text(query_profiler.snapshot(), caches=_cache_stats(), mail=_mail_stats()), mimetype='text/plain; version=0.0.4')
\ No newline at end of file
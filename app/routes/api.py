@@ -0,0 +1,101 @@
+from flask import Blueprint, current_app, jsonify, request, url_for
+from flask_login import current_user
+from app.extensions import db
+from app.utils.api import RESOURCES, ApiError
+
+bp = Blueprint('api', __name__)
+
+# session-authenticated like the rest of the app; writes only accept application/json bodies,
+# which a cross-site form can't send without a CORS preflight
+
+@bp.before_request
+def _authenticate():
+    if not current_user.is_authenticated:
+        return jsonify(error="Authentication required"), 401
+
+@bp.errorhandler(ApiError)
+def _api_error(error):
+    db.session.rollback()
+    body = {'error': error.message}
+    if error.errors:
+        body['errors'] = error.errors
+    return jsonify(body), error.status
+
+def _resource(name, write=False):
+    resource = RESOURCES.get(name)
+    if resource is None:
+        raise ApiError(404, f"Unknown resource {name!r}")
+    level = resource.write_level if write else resource.read_level
+    if level is None or current_user.max_role_level < level:
+        raise ApiError(403, "You do not have permission to " + ("change" if write else "read") + f" {name}")
+    return resource
+
+def _int_list(value, name):
+    try:
+        return list(dict.fromkeys(int(part) for part in value.split(',') if part.strip()))
+    except ValueError:
+        raise ApiError(400, f"{name} must be a comma-separated list of integers") from None
+
+def _items():
+    body = request.get_json(silent=True) if request.is_json else None
+    items = body.get('data') if isinstance(body, dict) else None
+    if not isinstance(items, list) or not items:
+        raise ApiError(400, 'Expected a JSON body of the form {"data": [...]}')
+    limit = current_app.config['API_MAX_BATCH']
+    if len(items) > limit:
+        raise ApiError(413, f"At most {limit} items per request")
+    return items
+
+@bp.route('/')
+def index():
+    level = current_user.max_role_level
+    return jsonify(data=[
+        {'name': name, 'url': url_for('api.collection', name=name), 'fields': list(resource.fields),
+         'filters': [field for field, spec in resource.fields.items() if spec.filter],
+         'writable': resource.write_level is not None and level >= resource.write_level}
+        for name, resource in RESOURCES.items() if level >= resource.read_level
+    ])
+
+@bp.route('/<name>', methods=['GET'])
+def collection(name):
+    """``?ids=1,2,3`` fetches a batch; otherwise a page by id with equality filters and ``?after=`` cursors."""
+    resource = _resource(name)
+    fields = resource.parse_fields(request.args.get('fields'))
+    max_size = current_app.config['API_MAX_PAGE_SIZE']
+    if 'ids' in request.args:
+        ids = _int_list(request.args['ids'], 'ids')
+        if len(ids) > max_size:
+            raise ApiError(413, f"At most {max_size} ids per request")
+        data, missing = resource.by_ids(ids, fields)
+        return jsonify(data=data, missing=missing)
+    limit = request.args.get('limit', 100, type=int)
+    if not 1 <= limit <= max_size:
+        raise ApiError(400, f"limit must be between 1 and {max_size}")
+    data, cursor = resource.page(fields, resource.parse_filters(request.args), request.args.get('after'), limit)
+    return jsonify(data=data, next_cursor=cursor)
+
+@bp.route('/<name>/<int:id>')
+def item(name, id):
+    resource = _resource(name)
+    data, _ = resource.by_ids([id], resource.parse_fields(request.args.get('fields')))
+    if not data:
+        raise ApiError(404, f"No {name} with id {id}")
+    return jsonify(data=data[0])
+
+@bp.route('/<name>', methods=['POST'])
+def create(name):
+    """Create every item in ``data`` in one transaction, or none of them."""
+    resource = _resource(name, write=True)
+    objects = resource.create(_items())
+    # dumped before committing, which would expire every object and reload them one by one
+    data = resource.dump(objects, list(resource.fields))
+    db.session.commit()
+    return jsonify(data=data), 201
+
+@bp.route('/<name>', methods=['PATCH'])
+def update(name):
+    """Apply the partial updates in ``data`` (each with its ``id``) in one transaction, or none of them."""
+    resource = _resource(name, write=True)
+    data = resource.dump(resource.update(_items()), list(resource.fields))
+    db.session.commit()
+    return jsonify(data=data)
\ No newline at end of file
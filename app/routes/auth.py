@@ -5,6 +5,7 @@ from app.models import User, Role, Department, UserAssignment, AccessRequest
 from app.extensions import db
 from app.utils.access_control import role_required
 from app.utils.email import send_email
+from app.utils.outbox import queue_email
 from datetime import datetime, timezone
 from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
 
@@ -101,17 +102,19 @@ def request_access():
         reason = request.form.get('reason')
         req = AccessRequest(user_id=current_user.id, reason=reason)
         db.session.add(req)
-        db.session.commit()
 
         admins = User.query.join(User.assignments).join(UserAssignment.role).filter(Role.level >= 80).distinct()
         for admin in admins:
-            send_email(
+            queue_email(
+                'access_request',
                 subject="New Access Request",
                 sender=current_user.email,
                 recipients=[admin.email],
-                text_body=render_template("email/access_request.txt", user=current_user, reason=reason),
-                html_body=render_template("email/access_request.html", user=current_user, reason=reason)
+                dedup_key=f"access_request:{current_user.id}",
+                user_id=current_user.id,
+                reason=reason
             )
+        db.session.commit()
 
         flash("Your access request has been submitted. An admin will review it.", "info")
         return redirect(url_for("home.dashboard"))
@@ -143,27 +146,28 @@ def handle_access_request(request_id, action):
         if role and dept:
             req.status = 'approved'
             db.session.add(UserAssignment(user_id=user.id, department_id=dept.id, role_id=role.id))
-            db.session.commit()
-            send_email(
+            queue_email(
+                'approved_request',
                 subject="Access Request Approved",
                 sender=current_user.email,
                 recipients=[user.email],
-                text_body=render_template("email/approved_request.txt", user=user, role=role.name),
-                html_body=render_template("email/approved_request.html", user=user, role=role.name)
+                user_id=user.id,
+                role=role.name
             )
+            db.session.commit()
             flash("Request approved and role assigned.", "success")
         else:
             flash("Invalid role or department.", "danger")
     elif action == 'deny':
         req.status = 'denied'
-        db.session.commit()
-        send_email(
+        queue_email(
+            'denied_request',
             subject="Access Request Denied",
             sender=current_user.email,
             recipients=[user.email],
-            text_body=render_template("email/denied_request.txt", user=user),
-            html_body=render_template("email/denied_request.html", user=user)
+            user_id=user.id
         )
+        db.session.commit()
         flash("Request denied.", "warning")
     else:
         flash("Invalid action.", "danger")
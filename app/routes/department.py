@@ -4,18 +4,54 @@ from app.forms.department_forms import DepartmentForm
 from app.models import Department
 from app.extensions import db
 from app.utils.access_control import role_required
+from app.utils.conditional import conditional
+from app.utils.streaming import render_listing
 
 bp = Blueprint('department', __name__)
 
+def _branches():
+    """``[(top-level department, [ids of its children])]`` by name: the tree page caches and streams
+    each child's subtree as a fragment of its own, so no single fragment holds the whole tree."""
+    top = Department.query.filter(Department.parent_id.is_(None)).order_by(Department.name).all()
+    children = {}
+    for id_, parent_id in db.session.execute(
+        db.select(Department.id, Department.parent_id)
+        .where(Department.parent_id.in_([dept.id for dept in top]))
+        .order_by(Department.name)
+    ):
+        children.setdefault(parent_id, []).append(id_)
+    return [(dept, children.get(dept.id, [])) for dept in top]
+
+def _subtrees():
+    """``subtree(child_id)`` -> ``[(department, depth)]`` of a branch from ``_branches``, in pre-order.
+
+    The whole tree is read in one query, and only once a branch's cached fragment has to be
+    rendered; every other branch is then cut from the same result.
+    """
+    branches = None
+
+    def subtree(child_id):
+        nonlocal branches
+        if branches is None:
+            branches, current = {}, None
+            for dept, depth in Department.tree():
+                if depth == 1:
+                    current = branches.setdefault(dept.id, [])
+                if depth >= 1:
+                    current.append((dept, depth))
+        return branches.get(child_id, [])
+    return subtree
+
 @bp.route('/')
 @login_required
 @role_required(70)
+@conditional('departments')
 def list_departments():
-    departments = Department.query.all()
     view = request.args.get('view', 'table')
 
     if view == 'tree':
-        return render_template('department/tree.html', departments=departments, title='Departments')
+        return render_listing('department/tree.html', branches=_branches(), subtree=_subtrees(), title='Departments')
+    departments = Department.query.all()
     return render_template('department/list.html', departments=departments, title='Departments')
 
 @bp.route('/create', methods=['GET', 'POST'])
@@ -40,6 +76,9 @@ def create_department():
 def edit_department(id):
     department = Department.query.get_or_404(id)
     form = DepartmentForm(obj=department)
+    # a department can't be moved under itself or anything below it
+    subtree = set(db.session.scalars(Department.subtree_ids(department.id)))
+    form.parent_id.choices = [(value, label) for value, label in form.parent_id.choices if value not in subtree]
     if form.validate_on_submit():
         department.name = form.name.data
         department.parent_id = form.parent_id.data if form.parent_id.data != -1 else None
@@ -53,10 +92,8 @@ def edit_department(id):
 @role_required(70)
 def delete_department(id):
     department = Department.query.get_or_404(id)
-    child_departments = Department.query.filter_by(parent_id=id).all()
-    for child in child_departments:
-        db.session.delete(child)
-    db.session.delete(department)
+    for dept in department.descendants(include_self=True).all():
+        db.session.delete(dept)
     db.session.commit()
     flash('Department and its sub-departments deleted successfully.', 'success')
     return redirect(url_for('department.list_departments'))
\ No newline at end of file
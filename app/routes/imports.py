@@ -0,0 +1,27 @@
+from flask import Blueprint, render_template, current_app
+from flask_login import login_required, current_user
+from app.forms.import_forms import ImportForm
+from app.utils.access_control import role_required
+from app.utils.importer import import_rows, read_rows, KINDS
+
+bp = Blueprint('imports', __name__)
+
+# the upload page lists this many errors; the CLI's --errors file has all of them
+MAX_ERRORS_SHOWN = 500
+
+@bp.route('/', methods=['GET', 'POST'])
+@login_required
+@role_required(80)
+def upload():
+    form = ImportForm()
+    result = None
+    if form.validate_on_submit():
+        upload = form.file.data
+        try:
+            rows = read_rows(upload.stream, upload.filename)
+            result = import_rows(form.kind.data, rows, importer_id=current_user.id, dry_run=form.dry_run.data,
+                                 chunk_size=current_app.config['IMPORT_CHUNK_SIZE'])
+        except (RuntimeError, UnicodeDecodeError) as e:
+            form.file.errors.append(str(e))
+    return render_template('imports/upload.html', form=form, result=result, kinds=KINDS,
+                           max_errors=MAX_ERRORS_SHOWN, title='Import')
\ No newline at end of file
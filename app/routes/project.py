@@ -4,17 +4,24 @@ from app.forms.project_forms import ProjectForm
 from app.models import Project, Department, Task
 from app.extensions import db
 from app.utils.access_control import role_required
+from app.utils.conditional import conditional
+from app.utils.replica import replica_reads
 
 bp = Blueprint('project', __name__)
 
 @bp.route('/')
 @login_required
+@replica_reads
+@conditional('projects', 'departments')
 def list_projects():
-    projects = Project.query.join(Department).add_columns(Project.id, Project.name, Department.name.label('department_name')).all()
+    # left unexecuted: the template only runs it when its cached fragment is stale
+    projects = Project.query.join(Department).add_columns(Project.id, Project.name, Department.name.label('department_name'))
     return render_template('project/list.html', projects=projects, title='Projects')
 
 @bp.route('/<int:project_id>')
 @login_required
+@replica_reads
+@conditional('projects', 'tasks')
 def project_detail(project_id):
     project = Project.query.get_or_404(project_id)
     tasks = Task.query.filter_by(project_id=project.id).all()
@@ -0,0 +1,105 @@
+from flask import Blueprint, render_template, request, abort, current_app, Response, stream_with_context
+from flask_login import login_required
+from app.models import Department
+from app.utils.access_control import role_required, visible_department_ids
+from app.utils.reports import department_report, period_bounds
+from app.utils.exporter import stream_export, EXPORTS, FORMATS
+from app.utils.workload import department_heatmap, week_start
+from app.utils.replica import replica_reads
+from datetime import date, timedelta
+
+bp = Blueprint('report', __name__)
+
+def _parse_month(value, default):
+    # <input type="month"> submits YYYY-MM
+    try:
+        year, month = (int(part) for part in value.split('-'))
+        if 1 <= month <= 12:
+            return year, month
+    except (AttributeError, ValueError):
+        pass
+    return default
+
+@bp.route('/')
+@login_required
+@role_required(60)
+def index():
+    visible = visible_department_ids()
+    query = Department.query.order_by(Department.name)
+    if visible is not None:
+        query = query.filter(Department.id.in_(visible))
+    return render_template('report/index.html', departments=query.all(), title='Reports')
+
+@bp.route('/departments/<int:department_id>')
+@login_required
+@role_required(60)
+@replica_reads
+def department(department_id):
+    dept = Department.query.get_or_404(department_id)
+    visible = visible_department_ids()
+    if visible is not None and dept.id not in visible:
+        abort(403)
+
+    today = date.today()
+    start = _parse_month(request.args.get('start'), (today.year, 1))
+    end = _parse_month(request.args.get('end'), (today.year, today.month))
+    if start > end:
+        start, end = end, start
+
+    report = department_report(dept.id, start, end)
+    return render_template('report/department.html', department=dept, report=report,
+                           start=start, end=end, title=f'Report: {dept.name}')
+
+
+@bp.route('/departments/<int:department_id>/export/<kind>.<fmt>')
+@login_required
+@role_required(60)
+@replica_reads
+def export(department_id, kind, fmt):
+    """Stream ``kind`` rows for the department's subtree and the ``start``..``end`` months as a download."""
+    if kind not in EXPORTS or fmt not in FORMATS:
+        abort(404)
+    dept = Department.query.get_or_404(department_id)
+    visible = visible_department_ids()
+    if visible is not None and dept.id not in visible:
+        abort(403)
+
+    today = date.today()
+    start = _parse_month(request.args.get('start'), (today.year, 1))
+    end = _parse_month(request.args.get('end'), (today.year, today.month))
+    if start > end:
+        start, end = end, start
+    start_date, end_date = period_bounds(start, end)
+    try:
+        chunks = stream_export(kind, fmt, department_id=dept.id, start=start_date, end=end_date)
+    except RuntimeError as e:
+        abort(501, description=str(e))
+
+    filename = f"{kind}-{dept.id}-{start[0]}{start[1]:02d}-{end[0]}{end[1]:02d}.{fmt}"
+    return Response(stream_with_context(chunks), mimetype=FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+@bp.route('/departments/<int:department_id>/workload')
+@login_required
+@role_required(60)
+@replica_reads
+def workload(department_id):
+    """Weekly load per person across the department's subtree, flagging anyone above capacity."""
+    dept = Department.query.get_or_404(department_id)
+    visible = visible_department_ids()
+    if visible is not None and dept.id not in visible:
+        abort(403)
+
+    try:
+        first_week = week_start(date.fromisoformat(request.args.get('start', '')))
+    except ValueError:
+        first_week = week_start(date.today())
+    weeks = request.args.get('weeks', 8, type=int)
+    weeks = min(max(weeks, 1), 26)
+
+    users, departments = department_heatmap(dept.id, first_week, weeks)
+    mondays = [first_week + timedelta(days=7 * i) for i in range(weeks)]
+    return render_template('report/workload.html', department=dept, users=users, departments=departments,
+                           mondays=mondays,
+                           capacity=current_app.config['WORKLOAD_CAPACITY_PERCENT'],
+                           title=f'Workload: {dept.name}')
\ No newline at end of file
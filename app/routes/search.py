@@ -0,0 +1,44 @@
+from datetime import date
+from flask import Blueprint, jsonify, render_template, request, url_for
+from flask_login import login_required
+from app.utils import choices
+from app.utils.replica import replica_reads
+from app.utils.search import search as run_search, typeahead as run_typeahead
+
+bp = Blueprint('search', __name__)
+
+# typeahead waits for this many characters; one-letter prefixes match too much to be useful
+TYPEAHEAD_MIN_LENGTH = 2
+
+def _url(hit):
+    if hit.kind == 'task':
+        return url_for('task.detail', task_id=hit.id)
+    return url_for('project.project_detail', project_id=hit.id)
+
+@bp.route('/')
+@login_required
+@replica_reads
+def results():
+    q = request.args.get('q', '').strip()
+    filters = {
+        'department_id': request.args.get('department', type=int),
+        'assignee_id': request.args.get('assignee', type=int),
+        'start': request.args.get('start', type=date.fromisoformat),
+        'end': request.args.get('end', type=date.fromisoformat),
+    }
+    hits = run_search(q, **filters) if q else {}
+    return render_template('search/results.html', q=q, hits=hits, filters=filters, url_for_hit=_url,
+                           departments=choices.departments(), users=choices.users(), title='Search')
+
+@bp.route('/typeahead')
+@login_required
+@replica_reads
+def typeahead():
+    q = request.args.get('q', '').strip()
+    hits = run_typeahead(q) if len(q) >= TYPEAHEAD_MIN_LENGTH else []
+    return jsonify({
+        'results': [
+            {'id': hit.id, 'kind': hit.kind, 'text': hit.name, 'context': hit.context, 'url': _url(hit)}
+            for hit in hits
+        ],
+    })
\ No newline at end of file
@@ -1,40 +1,78 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app
 from flask_login import login_required, current_user
 from app.forms.task_forms import TaskForm, TaskReviewForm
-from app.models import Task, Project, User, Role, TaskReview
+from app.models import Task, Project, User, Role, TaskReview, task_assignments
 from app.extensions import db
 from app.utils.access_control import role_required
-from app.utils.email import send_email
+from app.utils.outbox import queue_email, cancel_email
+from app.utils.pagination import keyset_paginate
+from app.utils import choices
+from app.utils.conditional import conditional
+from app.utils.streaming import render_listing
+from app.utils.workload import set_task_workload
+from sqlalchemy.orm import joinedload
 from datetime import datetime, timezone
 
 bp = Blueprint('task', __name__)
 
 @bp.route('/')
 @login_required
+@conditional('tasks', 'projects', 'users', 'task_assignments')
 def list_tasks():
-    tasks = Task.query.order_by(Task.start_date.desc()).all()
-    return render_template('task/list.html', tasks=tasks, title='Tasks')
+    filters = {
+        'project': request.args.get('project', type=int),
+        'manager': request.args.get('manager', type=int),
+        'assignee': request.args.get('assignee', type=int),
+        'submitted': request.args.get('submitted', ''),
+    }
+    query = Task.query.options(joinedload(Task.project), joinedload(Task.manager))
+    if filters['project']:
+        query = query.filter(Task.project_id == filters['project'])
+    if filters['manager']:
+        query = query.filter(Task.manager_id == filters['manager'])
+    if filters['assignee']:
+        query = query.join(task_assignments, task_assignments.c.task_id == Task.id).filter(
+            task_assignments.c.user_id == filters['assignee']
+        )
+    if filters['submitted'] in ('0', '1'):
+        query = query.filter(Task.submitted == (filters['submitted'] == '1'))
+
+    page = keyset_paginate(
+        query, Task.start_date, Task.id,
+        after=request.args.get('after'), before=request.args.get('before'), per_page=20
+    )
+
+    remote_users = _remote_users()
+    if remote_users:
+        users = choices.users_by_id([filters[key] for key in ('manager', 'assignee') if filters[key]])
+    else:
+        users = choices.users()
+    return render_listing('task/list.html', page=page, tasks=page.items, filters=filters,
+                          projects=choices.projects(), users=users, remote_users=remote_users, title='Tasks')
+
+def _remote_users():
+    """True once there are too many users to embed; user selects then search ``user.user_choices``."""
+    return choices.user_count() > current_app.config['CHOICES_INLINE_LIMIT']
+
+def _set_user_choices(field, current_ids=(), remote=False):
+    """Embed every user in ``field``, or with ``remote`` only the selected ones."""
+    if not remote:
+        field.choices = choices.users()
+        return
+    selected = field.data if request.method == 'POST' else current_ids
+    if not isinstance(selected, (list, tuple)):
+        selected = [selected]
+    field.choices = choices.users_by_id([id_ for id_ in selected if id_])
 
 @bp.route('/create', methods=['GET', 'POST'])
 @login_required
 @role_required(60)
 def create_task():
     form = TaskForm()
-    projects = Project.query.order_by(Project.name).all()
-    managers = (
-        User.query
-        .join(User.assignments)
-        .join(Role)
-        .filter(Role.level >= 60)
-        .distinct()
-        .order_by(User.name)
-        .all()
-    )
-    users = User.query.order_by(User.name).all()
-
-    form.project_id.choices = [(p.id, p.name) for p in projects]
-    form.manager_id.choices = [(m.id, m.name) for m in managers]
-    form.assignees.choices = [(u.id, u.name) for u in users]
+    form.project_id.choices = choices.projects()
+    form.manager_id.choices = choices.managers()
+    remote_users = _remote_users()
+    _set_user_choices(form.assignees, remote=remote_users)
 
     if form.validate_on_submit():
         task = Task(
@@ -46,22 +84,22 @@ def create_task():
             end_date=form.end_date.data,
             manager_id=form.manager_id.data
         )
-        for uid in form.assignees.data:
-            u = User.query.get(uid)
-            if u:
-                task.assignees.append(u)
+        if form.assignees.data:
+            task.assignees = User.query.filter(User.id.in_(form.assignees.data)).all()
 
         db.session.add(task)
+        set_task_workload(task, form.workload_percent.data)
         db.session.commit()
         flash('Task created successfully.', 'success')
         return redirect(url_for('task.list_tasks'))
     elif request.method == 'POST':
         flash('Please fill out all required fields before submitting.', 'danger')
 
-    return render_template('task/create.html', form=form, projects=projects, managers=managers, users=users, title='Create task')
+    return render_template('task/create.html', form=form, remote_users=remote_users, title='Create task')
 
 @bp.route('/<int:task_id>')
 @login_required
+@conditional('tasks', 'projects', 'users', 'task_assignments', 'task_reviews')
 def detail(task_id):
     task = Task.query.get_or_404(task_id)
     return render_template('task/detail.html', task=task)
@@ -75,18 +113,21 @@ def toggle_submission(task_id):
         return redirect(url_for('task.detail', task_id=task.id))
 
     task.submitted = not task.submitted
-    db.session.commit()
-
+    task.submitted_at = datetime.now(timezone.utc) if task.submitted else None
     if task.submitted and task.manager and task.manager.email:
-        text = render_template('email/task_completed.txt', task=task, user=current_user)
-        html = render_template('email/task_completed.html', task=task, user=current_user)
-        send_email(
+        queue_email(
+            'task_completed',
             subject=f"Task submitted: {task.name}",
             sender=current_user.email,
             recipients=[task.manager.email],
-            text_body=text,
-            html_body=html
+            dedup_key=f"task_completed:{task.id}",
+            task_id=task.id,
+            user_id=current_user.id
         )
+    elif not task.submitted:
+        # flipped back before the digest went out: the manager never needs to hear about it
+        cancel_email(f"task_completed:{task.id}")
+    db.session.commit()
     flash('Task status updated.', 'success')
     return redirect(url_for('task.detail', task_id=task.id))
 
@@ -99,19 +140,19 @@ def review(task_id):
     if form.validate_on_submit():
         review = TaskReview(task_id=task.id, reviewer_id=current_user.id, score=form.score.data, comments=form.comments.data, timestamp=datetime.now(timezone.utc))
         db.session.add(review)
-        db.session.commit()
+        db.session.flush()
 
         assignee_emails = [u.email for u in task.assignees if u.email]
         if assignee_emails:
-            text = render_template('email/task_reviewed.txt', task=task, review=review)
-            html = render_template('email/task_reviewed.html', task=task, review=review)
-            send_email(
+            queue_email(
+                'task_reviewed',
                 subject=f"Task reviewed: {task.name}",
                 sender=current_user.email,
                 recipients=assignee_emails,
-                text_body=text,
-                html_body=html
+                task_id=task.id,
+                review_id=review.id
             )
+        db.session.commit()
 
         flash('Review submitted and assignees notified.', 'success')
         return redirect(url_for('task.detail', task_id=task.id))
@@ -124,12 +165,10 @@ def review(task_id):
 def edit_task(task_id):
     task = Task.query.get_or_404(task_id)
     form = TaskForm()
-
-    projects = Project.query.order_by(Project.name).all()
-    users = User.query.order_by(User.name).all()
-    form.project_id.choices = [(p.id, p.name) for p in projects]
-    form.manager_id.choices = [(u.id, u.name) for u in users]
-    form.assignees.choices = [(u.id, u.name) for u in users]
+    form.project_id.choices = choices.projects()
+    remote_users = _remote_users()
+    _set_user_choices(form.manager_id, task.manager_id, remote=remote_users)
+    _set_user_choices(form.assignees, [u.id for u in task.assignees], remote=remote_users)
 
     if form.validate_on_submit():
         task.name = form.name.data
@@ -145,6 +184,7 @@ def edit_task(task_id):
         else:
             selected_users = []
         task.assignees = selected_users
+        set_task_workload(task, form.workload_percent.data)
 
         db.session.commit()
         flash('Task updated successfully.', 'success')
@@ -156,10 +196,13 @@ def edit_task(task_id):
         form.project_id.data = task.project_id
         form.manager_id.data = task.manager_id
         form.assignees.data = [u.id for u in task.assignees]
+        form.workload_percent.data = db.session.scalar(
+            db.select(db.func.max(task_assignments.c.workload_percent)).where(task_assignments.c.task_id == task.id)
+        )
         form.start_date.data = task.start_date
         form.end_date.data = task.end_date
 
-    return render_template('task/edit.html', form=form, task=task)
+    return render_template('task/edit.html', form=form, task=task, remote_users=remote_users)
 
 @bp.route('/<int:task_id>/delete', methods=['POST', 'GET'])
 @login_required
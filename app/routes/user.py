@@ -1,15 +1,22 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, abort
+from flask import Blueprint, render_template, redirect, url_for, flash, request, abort, jsonify, session
 from flask_login import login_required, current_user
 from app.forms.user_forms import (
     UserRoleAssignForm,
-    UserAssignmentEditForm,
+    BulkRoleUpdateForm,
     EditUserForm,
     DateRangeForm,
     MonthlyKPIForm
 )
-from app.models import User, UserAssignment, Department, Role, Task, MonthlyKPI
+from app.models import User, UserAssignment, Department, Role, Task, MonthlyKPI, MonthlyKPISummary
 from app.extensions import db
+from sqlalchemy.orm import selectinload, contains_eager
 from app.utils.access_control import role_required
+from app.utils import choices
+from app.utils.assignments import apply_role_changes, load_role_changes
+from app.utils.conditional import conditional
+from app.utils.replica import replica_reads
+from app.utils.streaming import render_listing
+from app.utils.user_detail import load_user_detail
 from datetime import date, datetime, timezone
 import calendar
 
@@ -17,16 +24,21 @@ bp = Blueprint('user', __name__)
 
 @bp.route('/')
 @login_required
+@replica_reads
+@conditional('users', 'user_assignments', 'departments', 'roles', vary=lambda: date.today().strftime('%Y-%m'))
 def list_users():
     # Departments this user manages (role >= 60)
-    managed_depts = [a.department_id for a in current_user.assignments if a.role.level >= 60]
+    managed_depts = current_user.auth.managed_department_ids
     if not managed_depts and current_user.max_role_level < 80:
         flash("You do not manage any departments.", "warning")
         return redirect(url_for('home.dashboard'))
 
     dept_id = request.args.get('department', type=int)
-    departments = Department.query.order_by(Department.name).all()
-    query = User.query.join(User.assignments)
+    departments = choices.departments()
+    query = User.query.join(User.assignments).options(
+        selectinload(User.assignments).joinedload(UserAssignment.role),
+        selectinload(User.assignments).joinedload(UserAssignment.department),
+    )
 
     # Restrict for managers
     if current_user.max_role_level < 80:
@@ -47,16 +59,32 @@ def list_users():
         current_time=datetime.now(timezone.utc)
     )
 
+@bp.route('/choices')
+@login_required
+@role_required(60)
+def user_choices():
+    """Paged user search for select fields too long to embed, e.g. task assignees.
+
+    Managers only see users of the departments they manage.
+    """
+    term = request.args.get('q', '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(request.args.get('per_page', 20, type=int), 100)
+    department_ids = None if current_user.max_role_level >= 80 else current_user.auth.managed_department_ids
+    rows, more = choices.search_users(term, page=page, per_page=per_page, department_ids=department_ids)
+    return jsonify({
+        'results': [{'id': row.id, 'text': f"{row.name} ({row.email})"} for row in rows],
+        'more': more,
+    })
+
 @bp.route('/assign', methods=['GET', 'POST'])
 @login_required
 def assign_role():
     form = UserRoleAssignForm()
     # Limit departments for non-admins
     if current_user.max_role_level < 80:
-        allowed = [a.department_id for a in current_user.assignments if a.role.level >= 60]
-        form.department_id.choices = [
-            (d.id, d.name) for d in Department.query.filter(Department.id.in_(allowed)).all()
-        ]
+        allowed = current_user.auth.managed_department_ids
+        form.department_id.choices = [option for option in choices.departments() if option.id in allowed]
 
     if form.validate_on_submit():
         ua = UserAssignment.query.filter_by(
@@ -82,37 +110,72 @@ def assign_role():
 @login_required
 def manage_roles():
     # Admins see all; managers only their depts
-    if current_user.max_role_level < 80:
-        allowed = [a.department_id for a in current_user.assignments if a.role.level >= 60]
-        assignments = UserAssignment.query.filter(
-            UserAssignment.department_id.in_(allowed)
-        ).all()
-    else:
-        assignments = UserAssignment.query.all()
-
-    forms = []
-    for ua in assignments:
-        form = UserAssignmentEditForm(obj=ua)
-        form.assignment_id.data = ua.id
-        forms.append((ua, form))
-
-    if request.method == 'POST':
-        for ua, form in forms:
-            if form.validate_on_submit() and int(form.assignment_id.data) == ua.id:
-                ua.role_id = form.role_id.data
+    allowed = None if current_user.max_role_level >= 80 else current_user.auth.managed_department_ids
+    form = BulkRoleUpdateForm()
+
+    if form.validate_on_submit():
+        requested = {}
+        for key, value in request.form.items():
+            if key.startswith('role-') and key[5:].isdigit() and value.isdigit():
+                requested[int(key[5:])] = int(value)
+        changes, unchanged = apply_role_changes(requested, allowed)
         db.session.commit()
-        flash("Roles updated successfully.", "success")
-        return redirect(url_for('user.manage_roles'))
+        flash(f"{len(changes)} role(s) updated.", "success")
+        # only ids and role names: the session lives in a cookie
+        session['role_changes'] = {
+            'changes': [(c.assignment_id, c.old_role, c.new_role) for c in changes],
+            'unchanged': unchanged,
+        }
+        return redirect(url_for('user.role_changes'))
+
+    filters = {
+        'department': request.args.get('department', type=int),
+        'role': request.args.get('role', type=int),
+        'q': request.args.get('q', '').strip(),
+    }
+    query = (
+        UserAssignment.query
+        .join(UserAssignment.user)
+        .join(UserAssignment.department)
+        .options(contains_eager(UserAssignment.user), contains_eager(UserAssignment.department))
+    )
+    if allowed is not None:
+        query = query.filter(UserAssignment.department_id.in_(allowed))
+    if filters['department']:
+        query = query.filter(UserAssignment.department_id == filters['department'])
+    if filters['role']:
+        query = query.filter(UserAssignment.role_id == filters['role'])
+    if filters['q']:
+        query = query.filter(User.name.ilike(f"%{filters['q']}%"))
+    page = request.args.get('page', 1, type=int)
+    query = query.order_by(Department.name, User.name, UserAssignment.id)
+
+    def departments():
+        options = choices.departments()
+        return options if allowed is None else [option for option in options if option.id in allowed]
 
-    roles = Role.query.order_by(Role.level).all()
-    return render_template('user/manage_user_roles.html', forms=forms, title='Manage user roles', roles=roles)
+    # the page and the department options are only fetched when their cached fragments are stale
+    return render_listing('user/manage_user_roles.html', form=form, filters=filters, page=page,
+                          scope=sorted(allowed) if allowed is not None else None,
+                          load_page=lambda: query.paginate(page=page, per_page=50, error_out=False),
+                          roles=list(reversed(choices.roles())), departments=departments, title='Manage user roles')
+
+@bp.route('/manage-roles/changes')
+@login_required
+def role_changes():
+    """What the last bulk update changed, shown after a redirect so a refresh cannot resubmit it."""
+    summary = session.get('role_changes')
+    if summary is None:
+        return redirect(url_for('user.manage_roles'))
+    return render_template('user/role_changes.html', changes=load_role_changes(summary['changes']),
+                           unchanged=summary['unchanged'], title='Role changes')
 
 @bp.route('/delete-assignment/<int:assignment_id>', methods=['POST'])
 @login_required
 def delete_assignment(assignment_id):
     ua = UserAssignment.query.get_or_404(assignment_id)
     if current_user.max_role_level < 80:
-        allowed = [a.department_id for a in current_user.assignments if a.role.level >= 60]
+        allowed = current_user.auth.managed_department_ids
         if ua.department_id not in allowed:
             abort(403)
     db.session.delete(ua)
@@ -134,10 +197,9 @@ def update_assignment(assignment_id):
 @login_required
 def edit_user(user_id):
     user = User.query.get_or_404(user_id)
-    managed_depts = [a.department_id for a in current_user.assignments if a.role.level >= 60]
     if current_user.max_role_level < 80:
         user_depts = [a.department_id for a in user.assignments]
-        if not any(d in managed_depts for d in user_depts):
+        if not current_user.auth.manages_any(user_depts):
             abort(403)
 
     form = EditUserForm(obj=user)
@@ -159,10 +221,9 @@ def edit_user(user_id):
 @login_required
 def delete_user(user_id):
     user = User.query.get_or_404(user_id)
-    managed_depts = [a.department_id for a in current_user.assignments if a.role.level >= 60]
     if current_user.max_role_level < 80:
         user_depts = [a.department_id for a in user.assignments]
-        if not any(d in managed_depts for d in user_depts):
+        if not current_user.auth.manages_any(user_depts):
             abort(403)
     db.session.delete(user)
     db.session.commit()
@@ -174,9 +235,8 @@ def _user_view_permission_or_403(target_user):
     # managers of departments they manage (role.level >= 60) or admins (>=80)
     if current_user.max_role_level >= 80:
         return True
-    managed_departments = [a.department_id for a in current_user.assignments if a.role.level >= 60]
     target_depts = [a.department_id for a in target_user.assignments]
-    if any(d in managed_departments for d in target_depts):
+    if current_user.auth.manages_any(target_depts):
         return True
     abort(403)
 
@@ -184,35 +244,21 @@ def _user_view_permission_or_403(target_user):
 @login_required
 @role_required(60)
 def user_detail(user_id):
-    user = User.query.get_or_404(user_id)
+    user = db.session.get(User, user_id, options=[selectinload(User.assignments).joinedload(UserAssignment.department)])
+    if user is None:
+        abort(404)
     _user_view_permission_or_403(user)
 
-    dr_form = DateRangeForm(request.form)
+    # the filter form submits with GET; default to the current month
+    dr_form = DateRangeForm(request.args, meta={'csrf': False})
     kpi_form = MonthlyKPIForm()
 
-    # defaults: show current month
     today = date.today()
-    if request.method == 'GET':
+    if 'start_date' not in request.args and 'end_date' not in request.args:
         dr_form.start_date.data = date(today.year, today.month, 1)
         last_day = calendar.monthrange(today.year, today.month)[1]
         dr_form.end_date.data = date(today.year, today.month, last_day)
 
-    # build query: tasks assigned to this user
-    query = Task.query.join(Task.assignees).filter(User.id == user.id)
-
-    if dr_form.start_date.data:
-        query = query.filter(Task.start_date >= dr_form.start_date.data)
-    if dr_form.end_date.data:
-        query = query.filter(Task.start_date <= dr_form.end_date.data)
-    if dr_form.completed_only.data:
-        query = query.filter(Task.submitted == True)
-
-    page = request.args.get('page', 1, type=int)
-    tasks = query.order_by(Task.start_date.desc()).paginate(page=page, per_page=10, error_out=False)
-    total = tasks.total
-    completed = sum(1 for t in tasks.items if t.submitted)
-    completed_all = query.filter(Task.submitted == True).count()
-
     # KPI submission handling
     if kpi_form.validate_on_submit():
         new_kpi = MonthlyKPI(
@@ -231,29 +277,46 @@ def user_detail(user_id):
     # display highest KPI for chosen (or current) month
     display_year = request.args.get('year', default=today.year, type=int)
     display_month = request.args.get('month', default=today.month, type=int)
-    highest_kpi_row = MonthlyKPI.query.filter_by(user_id=user.id, year=display_year, month=display_month).order_by(MonthlyKPI.score.desc()).first()
-    highest_kpi = highest_kpi_row.score if highest_kpi_row else None
+    detail = load_user_detail(
+        user.id,
+        start=dr_form.start_date.data,
+        end=dr_form.end_date.data,
+        completed_only=dr_form.completed_only.data,
+        page=request.args.get('page', 1, type=int),
+        per_page=10,
+        kpi_period=(display_year, display_month),
+    )
+    if request.method == 'GET' and detail.suggestion:
+        # start the manager from the precomputed suggestion for the month on display
+        kpi_form.year.data, kpi_form.month.data = display_year, display_month
+        kpi_form.score.data = detail.suggestion.score
 
-    return render_template('user/detail.html', user=user, tasks=tasks, total=total, completed=completed, completed_all=completed_all,
+    return render_template('user/detail.html', user=user, tasks=detail.tasks, total=detail.total,
+                           completed=detail.completed_on_page, completed_all=detail.completed,
                            dr_form=dr_form, kpi_form=kpi_form, display_year=display_year, display_month=display_month,
-                           highest_kpi=highest_kpi)
+                           highest_kpi=detail.summary.max_score if detail.summary else None, summary=detail.summary,
+                           suggestion=detail.suggestion)
 
 @bp.route('/<int:user_id>/kpi/<int:year>/<int:month>')
 @login_required
 @role_required(60)
+@replica_reads
+@conditional('users', 'user_assignments', 'monthly_kpis', 'tasks', 'projects', 'task_assignments')
 def user_kpi_detail(user_id, year, month):
     user = User.query.get_or_404(user_id)
     _user_view_permission_or_403(user)
 
-    kpis = MonthlyKPI.query.filter_by(user_id=user.id, year=year, month=month).order_by(MonthlyKPI.score.desc()).all()
+    summary = db.session.get(MonthlyKPISummary, (user.id, year, month))
+    kpage = request.args.get('kpage', 1, type=int)
+    kpis = MonthlyKPI.query.filter_by(user_id=user.id, year=year, month=month).order_by(MonthlyKPI.score.desc()).paginate(page=kpage, per_page=10, error_out=False)
 
     # tasks within that month (by start_date)
     month_start = date(year, month, 1)
     last_day = calendar.monthrange(year, month)[1]
     month_end = date(year, month, last_day)
-    page = request.args.get('page', 1, type=int)
-    tasks = Task.query.join(Task.assignees).filter(User.id == user.id, Task.start_date >= month_start, Task.start_date <= month_end).order_by(Task.start_date.desc()).paginate(page=page, per_page=10, error_out=False) 
+    tpage = request.args.get('tpage', 1, type=int)
+    tasks = Task.query.join(Task.assignees).filter(User.id == user.id, Task.start_date >= month_start, Task.start_date <= month_end).order_by(Task.start_date.desc()).paginate(page=tpage, per_page=10, error_out=False) 
 
-    highest = kpis[0].score if kpis else None
+    highest = summary.max_score if summary else None
 
-    return render_template('user/kpi_detail.html', user=user, year=year, month=month, kpis=kpis, highest=highest, tasks=tasks)
\ No newline at end of file
+    return render_template('user/kpi_detail.html', user=user, year=year, month=month, kpis=kpis, highest=highest, summary=summary, tasks=tasks)
\ No newline at end of file
@@ -0,0 +1,27 @@
+// Search-as-you-type for <select data-source="..."> fields whose options are too many to embed.
+// Matches are appended to the select; options the user already picked, and a blank "All", are kept.
+
+document.querySelectorAll('.remote-select-search').forEach(function(input) {
+  const select = document.getElementById(input.dataset.target);
+  let timer = null;
+
+  function load(term) {
+    const url = select.dataset.source + '?q=' + encodeURIComponent(term);
+    fetch(url, { credentials: 'same-origin' })
+      .then(function(response) { return response.json(); })
+      .then(function(data) {
+        Array.from(select.options).forEach(function(option) {
+          if (!option.selected && option.value !== '') option.remove();
+        });
+        const present = new Set(Array.from(select.options).map(function(option) { return option.value; }));
+        data.results.forEach(function(item) {
+          if (!present.has(String(item.id))) select.add(new Option(item.text, item.id));
+        });
+      });
+  }
+
+  input.addEventListener('input', function() {
+    clearTimeout(timer);
+    timer = setTimeout(function() { load(input.value.trim()); }, 250);
+  });
+});
\ No newline at end of file
@@ -0,0 +1,41 @@
+// Typeahead for the navbar search box: suggests projects and tasks by name as you type.
+// Enter without picking a suggestion submits the form to the full results page.
+
+document.querySelectorAll('.site-search').forEach(function(form) {
+  const input = form.querySelector('input[name="q"]');
+  const list = form.querySelector('.typeahead');
+  let timer = null;
+
+  function show(results) {
+    list.innerHTML = '';
+    results.forEach(function(item) {
+      const link = document.createElement('a');
+      link.href = item.url;
+      link.textContent = item.text + (item.context ? ' — ' + item.context : '');
+      link.dataset.kind = item.kind;
+      const entry = document.createElement('li');
+      entry.appendChild(link);
+      list.appendChild(entry);
+    });
+    list.hidden = results.length === 0;
+  }
+
+  input.addEventListener('input', function() {
+    clearTimeout(timer);
+    const term = input.value.trim();
+    if (term.length < 2) {
+      show([]);
+      return;
+    }
+    timer = setTimeout(function() {
+      fetch(form.dataset.typeahead + '?q=' + encodeURIComponent(term), { credentials: 'same-origin' })
+        .then(function(response) { return response.json(); })
+        .then(function(data) { show(data.results); });
+    }, 150);
+  });
+
+  input.addEventListener('blur', function() {
+    // late enough for a click on a suggestion to land first
+    setTimeout(function() { list.hidden = true; }, 200);
+  });
+});
\ No newline at end of file
@@ -1,7 +1,53 @@
 import functools
+from collections import namedtuple
 from flask import abort, flash, redirect, url_for, request
 from flask_login import current_user
 
+MANAGER_LEVEL = 60
+
+# One (department, role) pair of a user, flattened so it can be cached without ORM state
+DepartmentRole = namedtuple('DepartmentRole', ['department_id', 'department_name', 'role_name', 'level'])
+
+class AuthContext:
+    """Roles of a single user, resolved once and reused for every permission check in a request."""
+
+    def __init__(self, department_roles=()):
+        # keep only the highest role per department
+        self.department_roles = {}
+        for dr in department_roles:
+            best = self.department_roles.get(dr.department_id)
+            if best is None or dr.level > best.level:
+                self.department_roles[dr.department_id] = dr
+        self.max_level = max((dr.level for dr in self.department_roles.values()), default=0)
+        self.managed_department_ids = frozenset(
+            dept_id for dept_id, dr in self.department_roles.items() if dr.level >= MANAGER_LEVEL
+        )
+
+    @classmethod
+    def from_assignments(cls, assignments):
+        return cls(
+            DepartmentRole(a.department_id, a.department.name, a.role.name, a.role.level)
+            for a in assignments
+        )
+
+    def manages(self, department_id):
+        return department_id in self.managed_department_ids
+
+    def manages_any(self, department_ids):
+        return any(d in self.managed_department_ids for d in department_ids)
+
+def visible_department_ids():
+    """None for admins (everything), otherwise the subtrees of the departments the current user manages."""
+    # imported here: app.models imports this module
+    from app.extensions import db
+    from app.models import DepartmentClosure
+    if current_user.max_role_level >= 80:
+        return None
+    return set(db.session.scalars(
+        db.select(DepartmentClosure.descendant_id)
+        .where(DepartmentClosure.ancestor_id.in_(current_user.auth.managed_department_ids))
+    ))
+
 def role_required(min_level):
     def decorator(func):
         @functools.wraps(func)
@@ -17,12 +63,7 @@ def department_manager_required(func):
     @functools.wraps(func)
     def wrapped(*args, **kwargs):
         dept_id = kwargs.get('department_id') or request.form.get('department_id')
-        found = False
-        for assign in current_user.assignments:
-            if assign.department_id == int(dept_id) and assign.role.level >= 60:
-                found = True
-                break
-        if not found:
+        if not current_user.auth.manages(int(dept_id)):
             abort(403)
         return func(*args, **kwargs)
-    return wrapped
\ No newline at end of file
+    return wrapped
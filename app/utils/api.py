@@ -0,0 +1,440 @@
+from collections import namedtuple
+from datetime import date, datetime, timezone
+from sqlalchemy.orm import load_only, selectinload
+from flask import g
+from flask_login import current_user
+from app.extensions import db
+from app.models import (
+    Department, DepartmentClosure, MonthlyKPI, Project, Role, Task, TaskReview, User, UserAssignment
+)
+from app.utils.access_control import visible_department_ids
+from app.utils.outbox import queue_email
+from app.utils.pagination import decode_cursor, encode_cursor
+
+class ApiError(Exception):
+    def __init__(self, status, message, errors=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.errors = errors or []
+
+class ItemInvalid(ValueError):
+    def __init__(self, field, message):
+        super().__init__(message)
+        self.field = field
+
+# writable: clients may set it; required: on create; filter: usable as ?name=value;
+# ref: model the id must exist in; relation: many-to-many relationship exposed as a list of ids
+Field = namedtuple('Field', 'writable required filter ref minimum maximum relation',
+                   defaults=(False, False, False, None, None, None, None))
+
+def _parse(kind, value, field_name, max_length=None):
+    if value is None:
+        return None
+    try:
+        if kind is bool:
+            if not isinstance(value, bool):
+                raise ValueError
+            return value
+        if kind is int:
+            if isinstance(value, bool) or not isinstance(value, (int, str)):
+                raise ValueError
+            return int(value)
+        if kind is str:
+            if not isinstance(value, str):
+                raise ValueError
+            if max_length and len(value) > max_length:
+                raise ItemInvalid(field_name, f"longer than {max_length} characters")
+            return value
+        if kind is date:
+            return date.fromisoformat(value)
+        if kind is datetime:
+            return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ItemInvalid(field_name, f"expected {kind.__name__}, got {value!r}") from None
+    raise ItemInvalid(field_name, "not writable")
+
+def _dump(value):
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+class Resource:
+    """One model exposed under /api/v1: which fields exist, who may read and write, and row scoping.
+
+    ``scope(select)`` narrows reads and updates to what the current user may see; ``check(values)``
+    and ``check_update(obj, values)`` raise ItemInvalid for an item the current user may not write;
+    ``prepare(obj, values, created)`` sets server-side fields; ``on_create(objects)`` runs after the
+    new rows are flushed, in the same transaction.
+    """
+
+    def __init__(self, model, fields, read_level=0, write_level=None, scope=None, check=None,
+                 check_update=None, prepare=None, on_create=None):
+        self.model = model
+        self.fields = fields
+        self.read_level = read_level
+        self.write_level = write_level
+        self.scope = scope
+        self.check = check
+        self.check_update = check_update
+        self.prepare = prepare
+        self.on_create = on_create
+
+    def _kind(self, name):
+        return self.model.__table__.c[name].type.python_type
+
+    def parse_fields(self, value):
+        """Requested ``?fields=`` as a list (always including id), or every field."""
+        if not value:
+            return list(self.fields)
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ApiError(400, f"Unknown fields: {', '.join(unknown)}")
+        return ['id'] + [name for name in names if name != 'id']
+
+    def parse_filters(self, args):
+        """Equality conditions for the filterable fields present in the query string."""
+        conditions = []
+        for name, field in self.fields.items():
+            if not field.filter or name not in args:
+                continue
+            kind, raw = self._kind(name), args[name]
+            if kind is bool:
+                if raw not in ('true', 'false'):
+                    raise ApiError(400, f"{name} must be true or false")
+                value = raw == 'true'
+            else:
+                try:
+                    value = _parse(kind, raw, name)
+                except ItemInvalid as e:
+                    raise ApiError(400, f"{name}: {e}") from None
+            conditions.append(getattr(self.model, name) == value)
+        return conditions
+
+    def select(self, fields):
+        columns = [getattr(self.model, name) for name in fields if not self.fields[name].relation]
+        query = db.select(self.model).options(load_only(*columns))
+        return self.scope(query) if self.scope else query
+
+    def _relation_ids(self, name, ids):
+        """``{id: [related ids]}`` for a many-to-many field, from its association table in one query."""
+        relationship = db.inspect(self.model).relationships[self.fields[name].relation]
+        (_, local), = relationship.synchronize_pairs
+        (_, remote), = relationship.secondary_synchronize_pairs
+        related = {id_: [] for id_ in ids}
+        for owner, other in db.session.execute(
+            db.select(local, remote).where(local.in_(ids)).order_by(local, remote)
+        ):
+            related[owner].append(other)
+        return related
+
+    def dump(self, objects, fields):
+        relations = {
+            name: self._relation_ids(name, [obj.id for obj in objects])
+            for name in fields if self.fields[name].relation
+        }
+        return [
+            {name: relations[name][obj.id] if name in relations else _dump(getattr(obj, name)) for name in fields}
+            for obj in objects
+        ]
+
+    # --- reads ---
+
+    def page(self, fields, conditions=(), after=None, limit=100):
+        """One page ordered by id, with an opaque cursor for the next one (None at the end)."""
+        query = self.select(fields).where(*conditions).order_by(self.model.id).limit(limit + 1)
+        if after:
+            key = decode_cursor(after, self.model.id)
+            if key is None:
+                raise ApiError(400, "Malformed cursor")
+            query = query.where(self.model.id > key[1])
+        objects = db.session.scalars(query).all()
+        more = len(objects) > limit
+        objects = objects[:limit]
+        cursor = encode_cursor(objects[-1].id, objects[-1].id) if more else None
+        return self.dump(objects, fields), cursor
+
+    def by_ids(self, ids, fields):
+        objects = db.session.scalars(self.select(fields).where(self.model.id.in_(ids))).all()
+        found = {obj.id: obj for obj in objects}
+        return self.dump([found[id_] for id_ in ids if id_ in found], fields), [id_ for id_ in ids if id_ not in found]
+
+    # --- writes ---
+
+    def clean(self, item, partial):
+        if not isinstance(item, dict):
+            raise ItemInvalid(None, "expected an object")
+        values = {}
+        for name, raw in item.items():
+            if name == 'id':
+                continue
+            field = self.fields.get(name)
+            if field is None or not field.writable:
+                raise ItemInvalid(name, "unknown or read-only field")
+            if field.relation:
+                if not isinstance(raw, list):
+                    raise ItemInvalid(name, "expected a list of ids")
+                values[name] = list(dict.fromkeys(_parse(int, v, name) for v in raw))
+                continue
+            column = self.model.__table__.c[name]
+            value = _parse(self._kind(name), raw, name, getattr(column.type, 'length', None))
+            if value is None and not column.nullable:
+                raise ItemInvalid(name, "may not be null")
+            if value is not None and field.minimum is not None and value < field.minimum:
+                raise ItemInvalid(name, f"must be at least {field.minimum}")
+            if value is not None and field.maximum is not None and value > field.maximum:
+                raise ItemInvalid(name, f"must be at most {field.maximum}")
+            values[name] = value
+        if not partial:
+            missing = [name for name, field in self.fields.items() if field.required and values.get(name) is None]
+            if missing:
+                raise ItemInvalid(missing[0], "is required")
+        return values
+
+    def _check_refs(self, cleaned, errors):
+        # one query per referenced table for the whole batch
+        for name, field in self.fields.items():
+            if field.ref is None:
+                continue
+            wanted = set()
+            for _, values in cleaned:
+                value = values.get(name)
+                wanted.update(value if isinstance(value, list) else [value] if value is not None else [])
+            if not wanted:
+                continue
+            existing = set(db.session.scalars(db.select(field.ref.id).where(field.ref.id.in_(wanted))))
+            for index, values in cleaned:
+                value = values.get(name)
+                missing = [v for v in (value if isinstance(value, list) else [value]) if v is not None and v not in existing]
+                if missing:
+                    errors.append({'index': index, 'field': name, 'message': f"no {field.ref.__tablename__} with id {missing[0]}"})
+
+    def _validate(self, items, partial):
+        cleaned, errors = [], []
+        for index, item in enumerate(items):
+            try:
+                values = self.clean(item, partial)
+                if self.check:
+                    self.check(values)
+                cleaned.append((index, values))
+            except ItemInvalid as e:
+                errors.append({'index': index, 'field': e.field, 'message': str(e)})
+        self._check_refs(cleaned, errors)
+        return cleaned, errors
+
+    def _relation_targets(self, cleaned):
+        """``{relationship: {id: object}}`` for every id the batch links to, one query per relationship."""
+        targets = {}
+        for name, field in self.fields.items():
+            if not field.relation:
+                continue
+            ids = {id_ for _, values in cleaned for id_ in values.get(name, ())}
+            target = db.inspect(self.model).relationships[field.relation].mapper.class_
+            targets[field.relation] = (
+                {obj.id: obj for obj in db.session.scalars(db.select(target).where(target.id.in_(ids)))} if ids else {}
+            )
+        return targets
+
+    def _assign(self, obj, values, created, targets):
+        for name, value in values.items():
+            relation = self.fields[name].relation
+            if relation:
+                setattr(obj, relation, [targets[relation][id_] for id_ in value])
+            else:
+                setattr(obj, name, value)
+        if self.prepare:
+            self.prepare(obj, values, created)
+
+    def create(self, items):
+        """Validate every item, then insert them all; nothing is written if any item is invalid."""
+        cleaned, errors = self._validate(items, partial=False)
+        if errors:
+            raise ApiError(422, "Validation failed; nothing was created", errors)
+        objects = []
+        with db.session.no_autoflush:
+            targets = self._relation_targets(cleaned)
+            for _, values in cleaned:
+                obj = self.model()
+                self._assign(obj, values, True, targets)
+                objects.append(obj)
+            db.session.add_all(objects)
+        db.session.flush()
+        if self.on_create:
+            self.on_create(objects)
+        return objects
+
+    def update(self, items):
+        """Apply partial updates to existing items by id, all or nothing."""
+        ids = []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict) or not isinstance(item.get('id'), int) or isinstance(item.get('id'), bool):
+                raise ApiError(422, "Validation failed; nothing was updated",
+                               [{'index': index, 'field': 'id', 'message': "every item needs an integer id"}])
+            ids.append(item['id'])
+        cleaned, errors = self._validate(items, partial=True)
+        scoped = self.scope(db.select(self.model)) if self.scope else db.select(self.model)
+        # collections being replaced are loaded up front, instead of lazily per object
+        replaced = {self.fields[name].relation for _, values in cleaned for name in values if self.fields[name].relation}
+        scoped = scoped.options(*(selectinload(getattr(self.model, relation)) for relation in replaced))
+        found = {obj.id: obj for obj in db.session.scalars(scoped.where(self.model.id.in_(ids)))}
+        errors += [
+            {'index': index, 'field': 'id', 'message': f"no {self.model.__tablename__} with id {id_}"}
+            for index, id_ in enumerate(ids) if id_ not in found
+        ]
+        if self.check_update:
+            for index, values in cleaned:
+                if ids[index] not in found:
+                    continue
+                try:
+                    self.check_update(found[ids[index]], values)
+                except ItemInvalid as e:
+                    errors.append({'index': index, 'field': e.field, 'message': str(e)})
+        if errors:
+            raise ApiError(422, "Validation failed; nothing was updated", sorted(errors, key=lambda e: e['index']))
+        objects = []
+        with db.session.no_autoflush:
+            targets = self._relation_targets(cleaned)
+            for index, values in cleaned:
+                obj = found[ids[index]]
+                self._assign(obj, values, False, targets)
+                objects.append(obj)
+        db.session.flush()
+        return objects
+
+# --- per-resource rules ---
+
+def _visible_departments():
+    # once per request: every item of a batch is checked against it
+    if 'api_visible_departments' not in g:
+        g.api_visible_departments = visible_department_ids()
+    return g.api_visible_departments
+
+def _visible_member_ids():
+    departments = _visible_departments()
+    if departments is None:
+        return None
+    return db.select(UserAssignment.user_id).where(UserAssignment.department_id.in_(departments))
+
+def _scope_to_members(column):
+    def scope(query):
+        members = _visible_member_ids()
+        return query if members is None else query.where(column.in_(members))
+    return scope
+
+def _scope_assignments(query):
+    departments = _visible_departments()
+    return query if departments is None else query.where(UserAssignment.department_id.in_(departments))
+
+def _check_department_id(values):
+    departments = _visible_departments()
+    if departments is not None and 'department_id' in values and values['department_id'] not in departments:
+        raise ItemInvalid('department_id', "not a department you manage")
+
+def _check_project_update(obj, values):
+    departments = _visible_departments()
+    if departments is not None and obj.department_id not in departments:
+        raise ItemInvalid('id', "in a department you don't manage")
+
+def _project_visible(project_id, departments):
+    return db.session.scalar(
+        db.select(db.literal(True)).where(Project.id == project_id, Project.department_id.in_(departments))
+    )
+
+def _check_task(values):
+    departments = _visible_departments()
+    if departments is not None and values.get('project_id') is not None and not _project_visible(values['project_id'], departments):
+        raise ItemInvalid('project_id', "not a project of a department you manage")
+
+def _check_task_update(obj, values):
+    departments = _visible_departments()
+    if departments is not None and not _project_visible(obj.project_id, departments):
+        raise ItemInvalid('id', "in a project of a department you don't manage")
+
+def _check_kpi(values):
+    members = _visible_member_ids()
+    if members is not None and 'user_id' in values and not db.session.scalar(
+        db.select(db.literal(True)).where(db.literal(values['user_id']).in_(members))
+    ):
+        raise ItemInvalid('user_id', "not a member of a department you manage")
+
+def _check_department_move(obj, values):
+    if values.get('parent_id') is not None and db.session.get(DepartmentClosure, (obj.id, values['parent_id'])):
+        raise ItemInvalid('parent_id', f"department {obj.id} can't move under its own subtree")
+
+def _set_creator(attribute):
+    def prepare(obj, values, created):
+        if created:
+            setattr(obj, attribute, current_user.id)
+    return prepare
+
+def _prepare_task(obj, values, created):
+    if created:
+        obj.created_by = current_user.id
+        obj.submitted = bool(obj.submitted)
+    if 'submitted' in values:
+        obj.submitted_at = datetime.now(timezone.utc) if obj.submitted else None
+
+def _notify_reviewed(reviews):
+    # the same mail the review form sends, with every task and its assignees loaded in one query
+    tasks = {task.id: task for task in db.session.scalars(
+        db.select(Task).options(selectinload(Task.assignees)).where(Task.id.in_({r.task_id for r in reviews}))
+    )}
+    for review in reviews:
+        task = tasks[review.task_id]
+        assignee_emails = [u.email for u in task.assignees if u.email]
+        if assignee_emails:
+            queue_email('task_reviewed', subject=f"Task reviewed: {task.name}", sender=current_user.email,
+                        recipients=assignee_emails, task_id=task.id, review_id=review.id)
+
+RESOURCES = {
+    'departments': Resource(Department, {
+        'id': Field(),
+        'name': Field(writable=True, required=True),
+        'parent_id': Field(writable=True, filter=True, ref=Department),
+    }, read_level=70, write_level=70, check_update=_check_department_move),
+    'projects': Resource(Project, {
+        'id': Field(),
+        'name': Field(writable=True, required=True),
+        'description': Field(writable=True),
+        'department_id': Field(writable=True, required=True, filter=True, ref=Department),
+        'creator_id': Field(filter=True),
+    }, write_level=50, check=_check_department_id, check_update=_check_project_update,
+       prepare=_set_creator('creator_id')),
+    'tasks': Resource(Task, {
+        'id': Field(),
+        'name': Field(writable=True, required=True),
+        'description': Field(writable=True),
+        'project_id': Field(writable=True, required=True, filter=True, ref=Project),
+        'manager_id': Field(writable=True, filter=True, ref=User),
+        'created_by': Field(filter=True),
+        'start_date': Field(writable=True),
+        'end_date': Field(writable=True),
+        'submitted': Field(writable=True, filter=True),
+        'submitted_at': Field(),
+        'assignee_ids': Field(writable=True, ref=User, relation='assignees'),
+    }, write_level=60, check=_check_task, check_update=_check_task_update, prepare=_prepare_task),
+    'reviews': Resource(TaskReview, {
+        'id': Field(),
+        'task_id': Field(writable=True, required=True, filter=True, ref=Task),
+        'reviewer_id': Field(filter=True),
+        'score': Field(writable=True, required=True, minimum=0, maximum=100),
+        'comments': Field(writable=True),
+        'timestamp': Field(),
+    }, write_level=60, prepare=_set_creator('reviewer_id'), on_create=_notify_reviewed),
+    'assignments': Resource(UserAssignment, {
+        'id': Field(),
+        'user_id': Field(writable=True, required=True, filter=True, ref=User),
+        'department_id': Field(writable=True, required=True, filter=True, ref=Department),
+        'role_id': Field(writable=True, required=True, filter=True, ref=Role),
+    }, read_level=60, write_level=60, scope=_scope_assignments, check=_check_department_id),
+    'kpis': Resource(MonthlyKPI, {
+        'id': Field(),
+        'user_id': Field(writable=True, required=True, filter=True, ref=User),
+        'reviewer_id': Field(filter=True),
+        'year': Field(writable=True, required=True, filter=True, minimum=2000, maximum=2100),
+        'month': Field(writable=True, required=True, filter=True, minimum=1, maximum=12),
+        'score': Field(writable=True, required=True, minimum=0, maximum=100),
+        'comments': Field(writable=True),
+        'timestamp': Field(),
+    }, read_level=60, write_level=60, scope=_scope_to_members(MonthlyKPI.user_id), check=_check_kpi,
+       prepare=_set_creator('reviewer_id')),
+}
\ No newline at end of file
@@ -0,0 +1,55 @@
+from collections import namedtuple
+from app.extensions import db
+from app.models import Department, User, UserAssignment
+from app.utils import choices
+
+RoleChange = namedtuple('RoleChange', 'assignment_id user_name department_name old_role new_role')
+
+def apply_role_changes(requested, department_ids=None):
+    """Set ``role_id`` for every ``{assignment_id: role_id}`` in ``requested`` with one UPDATE.
+
+    Assignments outside ``department_ids`` (when given), unknown roles and unchanged rows are
+    skipped. Returns ``(changes, skipped)`` where ``changes`` is a list of ``RoleChange``; the
+    caller commits.
+    """
+    role_names = {role.id: role.name for role in choices.roles()}
+    submitted = len(requested)
+    requested = {aid: rid for aid, rid in requested.items() if rid in role_names}
+
+    query = (
+        db.select(UserAssignment.id, UserAssignment.role_id, User.name, Department.name)
+        .join(User, User.id == UserAssignment.user_id)
+        .join(Department, Department.id == UserAssignment.department_id)
+        .where(UserAssignment.id.in_(list(requested)))
+    )
+    if department_ids is not None:
+        query = query.where(UserAssignment.department_id.in_(list(department_ids)))
+    changes = [
+        RoleChange(aid, user_name, department_name, role_names.get(role_id), role_names[requested[aid]])
+        for aid, role_id, user_name, department_name in db.session.execute(query)
+        if requested[aid] != role_id
+    ]
+
+    if changes:
+        new_roles = {change.assignment_id: requested[change.assignment_id] for change in changes}
+        db.session.execute(
+            db.update(UserAssignment)
+            .where(UserAssignment.id.in_(list(new_roles)))
+            .values(role_id=db.case(new_roles, value=UserAssignment.id))
+            .execution_options(synchronize_session='fetch')
+        )
+    return sorted(changes, key=lambda c: (c.department_name, c.user_name)), submitted - len(changes)
+
+def load_role_changes(summary):
+    """Rebuild ``RoleChange`` rows from ``[(assignment_id, old_role, new_role)]``, as kept across a redirect."""
+    roles = {aid: (old_role, new_role) for aid, old_role, new_role in summary}
+    if not roles:
+        return []
+    rows = db.session.execute(
+        db.select(UserAssignment.id, User.name, Department.name)
+        .join(User, User.id == UserAssignment.user_id)
+        .join(Department, Department.id == UserAssignment.department_id)
+        .where(UserAssignment.id.in_(list(roles)))
+    )
+    changes = [RoleChange(aid, user_name, department_name, *roles[aid]) for aid, user_name, department_name in rows]
+    return sorted(changes, key=lambda c: (c.department_name, c.user_name))
\ No newline at end of file
@@ -0,0 +1,276 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from markupsafe import Markup
+from sqlalchemy import inspect as sa_inspect
+from app.utils.replica import primary_reads
+
+_MISSING = object()
+
+class LRUBackend:
+    """In-process store with LRU eviction and a TTL. Only visible to the current worker.
+
+    The TTL is required: keys carry their data versions, so a stale entry is never looked up
+    again, but one that stops being requested would otherwise sit in memory until evicted.
+    """
+
+    def __init__(self, ttl, maxsize=1024):
+        if not ttl or ttl <= 0:
+            raise ValueError("LRUBackend needs a positive ttl")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                return _MISSING
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+class FileBackend:
+    """Pickle-per-key store in a local directory, shared by every worker on the host."""
+
+    def __init__(self, directory, ttl=None):
+        self.directory = directory
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(str(key).encode()).hexdigest())
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'rb') as f:
+                expires, value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return _MISSING
+        if expires is not None and expires < time.time():
+            self.delete(key)
+            return _MISSING
+        return value
+
+    def set(self, key, value):
+        expires = time.time() + self.ttl if self.ttl else None
+        # write to a temp file and rename so readers never see a partial pickle
+        fd, tmp = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump((expires, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self._path(key))
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+class Cache:
+    """Key/value cache for one namespace, keyed by the committed versions of the data it is built from.
+
+    ``track(versions, *sources)`` names the tables an entry depends on; ``get``/``set`` can add
+    finer-grained version names per key (``depends_on``). ``versions(names)`` reads the counters
+    from shared, transactional state (``DataVersion`` rows), so a commit in any worker changes
+    the key every worker looks up, and entries for older versions are never read again and age
+    out. While the current transaction has written to something a key depends on and not yet
+    committed, that key bypasses the cache entirely. Backend and size come from the ``CACHE_*``
+    config keys; ``maxsize`` overrides ``CACHE_MAXSIZE`` for namespaces with many small entries.
+    """
+
+    def __init__(self, namespace, app=None, maxsize=None):
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.backend = None
+        self.versions = None
+        self.tables = ()
+        self.hits = 0
+        self.misses = 0
+        # request threads share the counters
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        cache_type = app.config.get('CACHE_TYPE', 'memory')
+        ttl = app.config.get('CACHE_DEFAULT_TIMEOUT')
+        if cache_type == 'filesystem':
+            directory = os.path.join(app.config.get('CACHE_DIR') or os.path.join(app.instance_path, 'cache'), self.namespace)
+            self.backend = FileBackend(directory, ttl=ttl)
+        elif cache_type == 'memory':
+            self.backend = LRUBackend(ttl, maxsize=self.maxsize or app.config.get('CACHE_MAXSIZE', 1024))
+        else:
+            raise ValueError(f"Unknown CACHE_TYPE {cache_type!r}")
+        app.extensions.setdefault('caches', {})[self.namespace] = self
+
+    def track(self, versions, *sources):
+        """Key every entry by the versions of the tables of ``sources`` (models or ``Table`` objects).
+
+        ``versions(names)`` returns ``{name: version}`` as last committed, or None while the
+        current transaction has uncommitted writes to any of ``names``.
+        """
+        self.versions = versions
+        self.tables = tuple(sorted({getattr(source, '__table__', source).name for source in sources}))
+
+    def _stamp(self, depends_on=()):
+        names = (*self.tables, *depends_on)
+        # cached values outlive replica lag, so they're keyed (and built) from the primary
+        with primary_reads():
+            versions = self.versions(names)
+        if versions is None:
+            return None
+        return '.'.join(str(versions[name]) for name in names)
+
+    def preload(self, depends_on):
+        """Read the versions of ``depends_on`` in one query, ahead of many ``get`` calls naming them one by one."""
+        with primary_reads():
+            self.versions((*self.tables, *depends_on))
+
+    def get(self, key, default=None, depends_on=()):
+        stamp = self._stamp(depends_on)
+        value = _MISSING if stamp is None else self.backend.get(f"{stamp}:{key}")
+        self._count(value is not _MISSING, 1)
+        return default if value is _MISSING else value
+
+    def set(self, key, value, depends_on=()):
+        stamp = self._stamp(depends_on)
+        if stamp is not None:
+            self.backend.set(f"{stamp}:{key}", value)
+
+    def get_many(self, keys, default=None, depends_on=()):
+        """``get`` for several keys with the same dependencies, working out their versions once."""
+        stamp = self._stamp(depends_on)
+        values = [_MISSING if stamp is None else self.backend.get(f"{stamp}:{key}") for key in keys]
+        self._count(sum(value is not _MISSING for value in values), len(values))
+        return [default if value is _MISSING else value for value in values]
+
+    def set_many(self, items, depends_on=()):
+        stamp = self._stamp(depends_on)
+        if stamp is not None:
+            for key, value in items:
+                self.backend.set(f"{stamp}:{key}", value)
+
+    def get_or_set(self, key, factory, depends_on=()):
+        value = self.get(key, _MISSING, depends_on)
+        if value is _MISSING:
+            with primary_reads():
+                value = factory()
+            self.set(key, value, depends_on)
+        return value
+
+    def _count(self, hits, lookups):
+        with self._lock:
+            self.hits += hits
+            self.misses += lookups - hits
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            'namespace': self.namespace,
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': hits / total if total else 0.0,
+        }
+
+def flushed_tables(session):
+    """Names of the tables the flush in progress wrote to, for use in ``after_flush`` hooks.
+
+    Many-to-many collection changes count for their association table too.
+    """
+    tables = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if obj in session.dirty and not session.is_modified(obj):
+            continue
+        state = sa_inspect(obj)
+        tables.add(state.mapper.local_table.name)
+        for relationship in state.mapper.relationships:
+            if relationship.secondary is not None and (
+                obj in session.deleted or state.attrs[relationship.key].history.has_changes()
+            ):
+                tables.add(relationship.secondary.name)
+    return tables
+
+def statement_table(orm_execute_state):
+    """Name of the table a bulk insert/update/delete targets, or None for anything else."""
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return None
+    mapper = orm_execute_state.bind_mapper
+    table = mapper.local_table if mapper is not None else getattr(orm_execute_state.statement, 'table', None)
+    return getattr(table, 'name', None)
+
+class FragmentCache(Cache):
+    """Rendered HTML keyed by name, the committed versions of the tables it was built from, and ``vary`` values.
+
+    The versions are the same ``DataVersion`` counters every other namespace is keyed by, so a
+    commit in any worker changes the key of every fragment built from the tables it wrote, and a
+    fragment depending on a table the current transaction has written but not committed is
+    rendered afresh and not stored. In templates::
+
+        {% call cached('project-list', 'projects', 'departments') %} ... {% endcall %}
+
+    and in views ``fragment_cache.render(name, tables, factory, **vary)``. Anything per-user
+    (CSRF tokens, role checks) must stay outside the fragment or be passed in ``vary``.
+    """
+
+    def __init__(self, namespace='fragments', app=None, maxsize=None):
+        super().__init__(namespace, app=app, maxsize=maxsize)
+        self.trackable = frozenset()
+
+    def init_app(self, app):
+        # rendered pages are far bigger than the other caches' entries
+        self.maxsize = self.maxsize or app.config.get('FRAGMENT_CACHE_MAXSIZE')
+        super().init_app(app)
+        app.jinja_env.globals['cached'] = self._jinja_call
+
+    def track(self, versions, *sources):
+        """Allow fragments to depend on the tables of ``sources``; each fragment names its own."""
+        super().track(versions)
+        self.trackable = frozenset(getattr(source, '__table__', source).name for source in sources)
+
+    def render(self, name, tables, factory, **vary):
+        """Return the cached HTML for ``name``, calling ``factory()`` (queries and all) only on a miss."""
+        unknown = set(tables) - self.trackable
+        if unknown:
+            raise ValueError(f"Fragment {name!r} depends on untracked tables: {', '.join(sorted(unknown))}")
+        params = hashlib.sha1(repr(sorted(vary.items())).encode()).hexdigest() if vary else ''
+        return Markup(self.get_or_set(f"{name}:{params}", lambda: str(factory()), depends_on=tuple(sorted(tables))))
+
+    def _jinja_call(self, name, *tables, caller, **vary):
+        return self.render(name, tables, caller, **vary)
\ No newline at end of file
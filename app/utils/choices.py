@@ -0,0 +1,81 @@
+from collections import namedtuple
+from flask import g
+from app.extensions import db, choices_cache
+from app.models import Department, Project, Role, User, UserAssignment
+
+Option = namedtuple('Option', 'id name')
+RoleOption = namedtuple('RoleOption', 'id name level')
+
+def _memoized(key, factory):
+    """Return ``key`` from this request's memo, else the shared cache, else ``factory()``.
+
+    Forms call these from ``__init__``, and a page may build dozens of them (manage_roles builds
+    one per assignment), so the cache itself is only consulted once per request.
+    """
+    memo = g.setdefault('_choices', {})
+    if key not in memo:
+        memo[key] = choices_cache.get_or_set(key, factory)
+    return memo[key]
+
+def departments():
+    """``[Option(id, name)]`` for every department, by name."""
+    return _memoized('departments', lambda: [
+        Option(*row) for row in db.session.execute(db.select(Department.id, Department.name).order_by(Department.name))
+    ])
+
+def roles():
+    """``[RoleOption(id, name, level)]`` for every role, highest level first."""
+    return _memoized('roles', lambda: [
+        RoleOption(*row) for row in db.session.execute(db.select(Role.id, Role.name, Role.level).order_by(Role.level.desc()))
+    ])
+
+def projects():
+    """``[Option(id, name)]`` for every project, by name."""
+    return _memoized('projects', lambda: [
+        Option(*row) for row in db.session.execute(db.select(Project.id, Project.name).order_by(Project.name))
+    ])
+
+def users():
+    """``[Option(id, name)]`` for every user, by name."""
+    return _memoized('users', lambda: [
+        Option(*row) for row in db.session.execute(db.select(User.id, User.name).order_by(User.name))
+    ])
+
+def user_count():
+    return _memoized('user_count', lambda: db.session.scalar(db.select(db.func.count(User.id))))
+
+def managers(min_level=60):
+    """``[Option(id, name)]`` for users holding a role of at least ``min_level`` somewhere."""
+    return _memoized(f'managers:{min_level}', lambda: [
+        Option(*row) for row in db.session.execute(
+            db.select(User.id, User.name)
+            .join(UserAssignment, UserAssignment.user_id == User.id)
+            .join(Role, Role.id == UserAssignment.role_id)
+            .where(Role.level >= min_level)
+            .distinct()
+            .order_by(User.name)
+        )
+    ])
+
+def users_by_id(ids):
+    """``[Option(id, name)]`` for just ``ids``; what a remote-search select needs to validate and re-render."""
+    if not ids:
+        return []
+    return [Option(*row) for row in db.session.execute(
+        db.select(User.id, User.name).where(User.id.in_(ids)).order_by(User.name)
+    )]
+
+def search_users(term=None, page=1, per_page=20, department_ids=None):
+    """One page of users whose name or email contains ``term``, plus whether there are more.
+
+    ``department_ids`` limits the search to users assigned to one of those departments.
+    """
+    query = db.select(User.id, User.name, User.email).order_by(User.name, User.id)
+    if term:
+        pattern = f"%{term}%"
+        query = query.where(db.or_(User.name.ilike(pattern), User.email.ilike(pattern)))
+    if department_ids is not None:
+        members = db.select(UserAssignment.user_id).where(UserAssignment.department_id.in_(list(department_ids)))
+        query = query.where(User.id.in_(members))
+    rows = db.session.execute(query.offset((page - 1) * per_page).limit(per_page + 1)).all()
+    return rows[:per_page], len(rows) > per_page
\ No newline at end of file
@@ -0,0 +1,74 @@
+import functools
+import hashlib
+from datetime import datetime, timedelta, timezone
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+from app.extensions import db
+from app.models import DataVersion
+
+def validators(tables, vary=None):
+    """``(etag, last_modified)`` for a page built from ``tables``, from one primary-key query.
+
+    The ETag also covers the current user and role level, since every page carries the
+    user's navigation, plus ``vary`` for anything else the page depends on (e.g. today's date).
+    ``last_modified`` is None until every table has recorded a write, and within a second of
+    the latest one: HTTP dates have whole seconds, so a second write in the same second would
+    otherwise look unmodified.
+    """
+    rows = db.session.execute(
+        db.select(DataVersion.table_name, DataVersion.version, DataVersion.changed_at)
+        .where(DataVersion.table_name.in_(sorted(tables)))
+    ).all()
+    versions = {name: version for name, version, _ in rows}
+    parts = [f"{table}={versions.get(table, 0)}" for table in sorted(tables)]
+    parts += [f"user={current_user.get_id()}", f"level={current_user.max_role_level}", f"vary={vary!r}"]
+    etag = hashlib.sha1('|'.join(parts).encode()).hexdigest()
+    last_modified = None
+    if len(rows) == len(set(tables)):
+        last_modified = max(changed_at for _, _, changed_at in rows).replace(tzinfo=timezone.utc)
+        if last_modified > datetime.now(timezone.utc) - timedelta(seconds=1):
+            last_modified = None
+    return etag, last_modified
+
+def _not_modified(etag, last_modified):
+    # If-None-Match wins over If-Modified-Since when a client sends both (RFC 9110 13.2.2)
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+def conditional(*tables, vary=None):
+    """Answer GETs of the decorated read-only view with 304 while ``tables`` are unchanged.
+
+    Place it below ``login_required``/``role_required``. The validators are checked before the
+    view runs, so a repeat visit costs one indexed query and no rendering; ``vary`` is an
+    optional callable whose result is folded into the ETag. Responses are ``private`` and must
+    be revalidated on every use.
+    """
+    unknown = set(tables) - DataVersion.TRACKED
+    if unknown:
+        raise ValueError(f"No data version is kept for: {', '.join(sorted(unknown))}")
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapped(*args, **kwargs):
+            # pending flash messages have to be rendered, whatever the data says
+            if request.method != 'GET' or session.get('_flashes'):
+                return view(*args, **kwargs)
+            etag, last_modified = validators(tables, vary() if vary else None)
+            if _not_modified(etag, last_modified):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            if last_modified:
+                response.last_modified = last_modified
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            response.vary.add('Cookie')
+            return response
+        return wrapped
+    return decorator
\ No newline at end of file
@@ -0,0 +1,54 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+def _is_sqlite(url):
+    return make_url(url).get_backend_name() == 'sqlite'
+
+def _is_memory(url):
+    return make_url(url).database in (None, '', ':memory:')
+
+def engine_options(config):
+    """``SQLALCHEMY_ENGINE_OPTIONS`` with pool settings suited to the configured backend.
+
+    Anything already in ``SQLALCHEMY_ENGINE_OPTIONS`` wins. A SQLite file only gets a sized pool,
+    since local connections never go stale; in-memory SQLite keeps Flask-SQLAlchemy's single
+    shared connection. Servers also check connections on checkout and replace them before the
+    server's idle timeout drops them.
+    """
+    options = dict(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    url = config['SQLALCHEMY_DATABASE_URI']
+    if _is_sqlite(url):
+        if not _is_memory(url):
+            options.setdefault('pool_size', config['DATABASE_POOL_SIZE'])
+            options.setdefault('max_overflow', config['DATABASE_MAX_OVERFLOW'])
+        return options
+    options.setdefault('pool_pre_ping', True)
+    options.setdefault('pool_size', config['DATABASE_POOL_SIZE'])
+    options.setdefault('max_overflow', config['DATABASE_MAX_OVERFLOW'])
+    options.setdefault('pool_recycle', config['DATABASE_POOL_RECYCLE'])
+    options.setdefault('pool_timeout', config['DATABASE_POOL_TIMEOUT'])
+    return options
+
+def sqlite_pragmas(engine, pragmas):
+    """Run ``PRAGMA name = value`` for each of ``pragmas`` on every new connection of ``engine``."""
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+    if _is_memory(engine.url):
+        # WAL and mmap mean nothing for a private in-memory database
+        pragmas = {name: value for name, value in pragmas.items() if name not in ('journal_mode', 'mmap_size')}
+
+    @event.listens_for(engine, 'connect')
+    def _apply(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            # busy_timeout first, so switching journal_mode waits out another writer instead of failing
+            for name in sorted(pragmas, key=lambda name: name != 'busy_timeout'):
+                cursor.execute(f"PRAGMA {name} = {pragmas[name]}")
+        finally:
+            cursor.close()
+
+def init_app(app, db):
+    """Apply ``SQLITE_PRAGMAS`` to every engine ``db`` created for ``app``."""
+    with app.app_context():
+        for engine in db.engines.values():
+            sqlite_pragmas(engine, app.config['SQLITE_PRAGMAS'])
\ No newline at end of file
@@ -0,0 +1,109 @@
+import multiprocessing
+import os
+import random
+import time
+from collections import namedtuple
+from datetime import date, timedelta
+from sqlalchemy.exc import OperationalError
+
+Result = namedtuple('Result', 'workers readers seconds writes reads locked write_rate read_rate')
+
+def _app(uri, pragmas):
+    # imported here: spawned workers build their own app from scratch
+    from config import Config
+    from app import create_app
+    return create_app(type('BenchConfig', (Config,), {
+        'SQLALCHEMY_DATABASE_URI': uri, 'SQLITE_PRAGMAS': pragmas, 'CACHE_TYPE': 'memory',
+    }))
+
+def seed(uri, pragmas, tasks=500):
+    """A fresh database at ``uri`` with one project of ``tasks`` tasks and a reviewer."""
+    from app.extensions import db
+    from app.models import Department, Project, Role, Task, User, UserAssignment
+    app = _app(uri, pragmas)
+    with app.app_context():
+        db.create_all()
+        department = Department(name='Benchmark')
+        role = Role(name='Manager', level=60)
+        reviewer = User(name='Reviewer', email='reviewer@example.com', password_hash='!')
+        db.session.add_all([department, role, reviewer])
+        db.session.flush()
+        db.session.add(UserAssignment(user_id=reviewer.id, department_id=department.id, role_id=role.id))
+        project = Project(name='Benchmark', department_id=department.id, creator_id=reviewer.id)
+        db.session.add(project)
+        db.session.flush()
+        today = date.today()
+        db.session.add_all([
+            Task(name=f"Task {i}", project_id=project.id, start_date=today + timedelta(days=i % 30),
+                 end_date=today + timedelta(days=i % 30 + 5), created_by=reviewer.id, submitted=False)
+            for i in range(tasks)
+        ])
+        db.session.commit()
+        db.session.remove()
+        db.engine.dispose()
+
+def _write(db, rng, task_ids, reviewer_id):
+    # what a task toggle or review costs: read a listing page, then change a task and review
+    # another in one transaction
+    from app.models import Task, TaskReview
+    db.session.scalars(db.select(Task).order_by(Task.start_date, Task.id).limit(20)).all()
+    task = db.session.get(Task, rng.choice(task_ids))
+    task.submitted = not task.submitted
+    db.session.add(TaskReview(task_id=rng.choice(task_ids), reviewer_id=reviewer_id, score=rng.randint(0, 100)))
+    db.session.commit()
+
+def _read(db, rng, task_ids, reviewer_id):
+    # a report-style page: aggregate every review written so far
+    from app.models import TaskReview
+    db.session.execute(
+        db.select(TaskReview.task_id, db.func.avg(TaskReview.score), db.func.count()).group_by(TaskReview.task_id)
+    ).all()
+    db.session.rollback()
+
+def _worker(uri, pragmas, role, worker_id, barrier, seconds, results):
+    from app.extensions import db
+    from app.models import Task, User
+    app = _app(uri, pragmas)
+    action = _write if role == 'writer' else _read
+    rng = random.Random(worker_id)
+    done = locked = 0
+    with app.app_context():
+        task_ids = db.session.scalars(db.select(Task.id)).all()
+        reviewer_id = db.session.scalar(db.select(User.id))
+        db.session.rollback()
+        barrier.wait()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            try:
+                action(db, rng, task_ids, reviewer_id)
+                done += 1
+            except OperationalError as e:
+                db.session.rollback()
+                if 'locked' not in str(e.orig) and 'busy' not in str(e.orig):
+                    raise
+                locked += 1
+    results.put((role, done, locked))
+
+def run(pragmas, workers, seconds, directory, name, readers=0):
+    """Commits per second from ``workers`` writer processes on a scratch database in ``directory``,
+    while ``readers`` more processes run report queries against it."""
+    uri = 'sqlite:///' + os.path.join(directory, f"bench-{name}-{workers}-{readers}.db")
+    seed(uri, pragmas)
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    # every process imports the app and connects before the clock starts
+    barrier = context.Barrier(workers + readers)
+    roles = ['writer'] * workers + ['reader'] * readers
+    processes = [
+        context.Process(target=_worker, args=(uri, pragmas, role, i, barrier, seconds, results))
+        for i, role in enumerate(roles)
+    ]
+    for process in processes:
+        process.start()
+    counts = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    writes = sum(done for role, done, _ in counts if role == 'writer')
+    reads = sum(done for role, done, _ in counts if role == 'reader')
+    locked = sum(l for _, _, l in counts)
+    return Result(workers, readers, seconds, writes, reads, locked, writes / seconds, reads / seconds)
\ No newline at end of file
@@ -1,11 +1,5 @@
-from threading import Thread
-from flask import current_app
 from flask_mail import Message
-from app.extensions import mail
-
-def send_async_email(app, msg):
-    with app.app_context():
-        mail.send(msg)
+from app.extensions import mail, mail_dispatcher
 
 def send_email(subject, sender, recipients, text_body, html_body, attachments=None, sync=False):
     msg = Message(subject, sender=sender, recipients=recipients)
@@ -17,4 +11,4 @@ def send_email(subject, sender, recipients, text_body, html_body, attachments=No
     if sync:
         mail.send(msg)
     else:
-        Thread(target=send_async_email, args=(current_app._get_current_object(), msg)).start()
+        mail_dispatcher.enqueue(msg)
\ No newline at end of file
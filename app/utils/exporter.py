@@ -0,0 +1,172 @@
+import csv
+import io
+from collections import namedtuple
+from sqlalchemy.orm import aliased
+from app.extensions import db
+from app.models import (
+    Department, MonthlyKPI, Project, Task, TaskReview, User, UserAssignment, task_assignments
+)
+
+# rows fetched per round trip; with stream_results the driver keeps a server-side cursor open
+# instead of buffering the whole result
+YIELD_PER = 2000
+
+Export = namedtuple('Export', 'columns statement')
+
+def _subtree(column, department_id):
+    return column.in_(Department.subtree_ids(department_id))
+
+def _tasks(department_id, start, end):
+    manager = aliased(User)
+    query = (
+        db.select(Task.id, Task.name, Project.name, Department.name, manager.email,
+                  Task.start_date, Task.end_date, Task.submitted)
+        .join(Project, Project.id == Task.project_id)
+        .join(Department, Department.id == Project.department_id)
+        .outerjoin(manager, manager.id == Task.manager_id)
+        .order_by(Task.id)
+    )
+    if department_id is not None:
+        query = query.where(_subtree(Project.department_id, department_id))
+    if start:
+        query = query.where(Task.start_date >= start)
+    if end:
+        query = query.where(Task.start_date < end)
+    return Export([('task_id', 'int'), ('task', 'str'), ('project', 'str'), ('department', 'str'),
+                   ('manager_email', 'str'), ('start_date', 'date'), ('end_date', 'date'), ('submitted', 'bool')], query)
+
+def _assignments(department_id, start, end):
+    query = (
+        db.select(Task.id, Task.name, Project.name, User.email, User.name,
+                  task_assignments.c.workload_percent, Task.start_date, Task.end_date, Task.submitted)
+        .select_from(task_assignments)
+        .join(Task, Task.id == task_assignments.c.task_id)
+        .join(User, User.id == task_assignments.c.user_id)
+        .join(Project, Project.id == Task.project_id)
+        .order_by(Task.id, User.id)
+    )
+    if department_id is not None:
+        query = query.where(_subtree(Project.department_id, department_id))
+    if start:
+        query = query.where(Task.start_date >= start)
+    if end:
+        query = query.where(Task.start_date < end)
+    return Export([('task_id', 'int'), ('task', 'str'), ('project', 'str'), ('user_email', 'str'), ('user', 'str'),
+                   ('workload_percent', 'int'), ('start_date', 'date'), ('end_date', 'date'), ('submitted', 'bool')], query)
+
+def _reviews(department_id, start, end):
+    reviewer = aliased(User)
+    query = (
+        db.select(TaskReview.id, Task.id, Task.name, Project.name, reviewer.email,
+                  TaskReview.score, TaskReview.comments, TaskReview.timestamp)
+        .join(Task, Task.id == TaskReview.task_id)
+        .join(Project, Project.id == Task.project_id)
+        .join(reviewer, reviewer.id == TaskReview.reviewer_id)
+        .order_by(TaskReview.id)
+    )
+    if department_id is not None:
+        query = query.where(_subtree(Project.department_id, department_id))
+    if start:
+        query = query.where(TaskReview.timestamp >= start)
+    if end:
+        query = query.where(TaskReview.timestamp < end)
+    return Export([('review_id', 'int'), ('task_id', 'int'), ('task', 'str'), ('project', 'str'),
+                   ('reviewer_email', 'str'), ('score', 'int'), ('comments', 'str'), ('timestamp', 'datetime')], query)
+
+def _kpis(department_id, start, end):
+    reviewer = aliased(User)
+    query = (
+        db.select(MonthlyKPI.id, User.email, User.name, MonthlyKPI.year, MonthlyKPI.month,
+                  MonthlyKPI.score, reviewer.email, MonthlyKPI.comments, MonthlyKPI.timestamp)
+        .join(User, User.id == MonthlyKPI.user_id)
+        .join(reviewer, reviewer.id == MonthlyKPI.reviewer_id)
+        .order_by(MonthlyKPI.year, MonthlyKPI.month, User.email, MonthlyKPI.id)
+    )
+    if department_id is not None:
+        members = db.select(UserAssignment.user_id).where(_subtree(UserAssignment.department_id, department_id))
+        query = query.where(MonthlyKPI.user_id.in_(members))
+    # a KPI belongs to the month it scores; include months starting inside [start, end)
+    period = MonthlyKPI.year * 100 + MonthlyKPI.month
+    if start:
+        query = query.where(period >= start.year * 100 + start.month + (start.day > 1))
+    if end:
+        query = query.where(period < end.year * 100 + end.month + (end.day > 1))
+    return Export([('kpi_id', 'int'), ('user_email', 'str'), ('user', 'str'), ('year', 'int'), ('month', 'int'),
+                   ('score', 'int'), ('reviewer_email', 'str'), ('comments', 'str'), ('timestamp', 'datetime')], query)
+
+EXPORTS = {
+    'tasks': _tasks,
+    'assignments': _assignments,
+    'reviews': _reviews,
+    'kpis': _kpis,
+}
+
+FORMATS = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet'}
+
+def _partitions(statement):
+    result = db.session.execute(statement.execution_options(stream_results=True, yield_per=YIELD_PER))
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
+
+def stream_csv(export):
+    """Yield the CSV header, then one encoded chunk per ``YIELD_PER`` rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in export.columns])
+    yield buffer.getvalue().encode()
+    for rows in _partitions(export.statement):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands everything written to it back out in pieces."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data, self.chunks = b''.join(self.chunks), []
+        return data
+
+def stream_parquet(export):
+    """Yield a Parquet file one row group (``YIELD_PER`` rows) at a time."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    types = {'int': pa.int64(), 'str': pa.string(), 'date': pa.date32(), 'datetime': pa.timestamp('us'),
+             'bool': pa.bool_(), 'float': pa.float64()}
+    schema = pa.schema([(name, types[kind]) for name, kind in export.columns])
+    sink = _ChunkSink()
+    with pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema) as writer:
+        for rows in _partitions(export.statement):
+            columns = list(zip(*rows))
+            writer.write_batch(pa.record_batch(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema
+            ))
+            yield sink.drain()
+    yield sink.drain()
+
+def stream_export(kind, fmt='csv', department_id=None, start=None, end=None):
+    """Stream ``kind`` rows for ``department_id``'s subtree (None: everything) with dates in ``[start, end)``.
+
+    Nothing is read until the first chunk is requested, and at most ``YIELD_PER`` rows are held
+    at a time, so memory stays flat whatever the row count.
+    """
+    if fmt == 'parquet':
+        # checked up front so callers can report it before any response has started
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)") from None
+    export = EXPORTS[kind](department_id, start, end)
+    return stream_parquet(export) if fmt == 'parquet' else stream_csv(export)
\ No newline at end of file
@@ -0,0 +1,296 @@
+import codecs
+import csv
+import os
+from collections import namedtuple
+from datetime import date
+from itertools import islice
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import generate_password_hash
+from app.extensions import db
+from app.models import Department, DepartmentClosure, Project, Role, Task, User, UserAssignment, task_assignments
+
+RowError = namedtuple('RowError', 'line message')
+
+# imported users without a password column can't log in until they reset it
+UNUSABLE_PASSWORD = '!'
+
+# file extensions read_rows understands; the upload form accepts exactly these
+XLSX_EXTENSIONS = ('xlsx', 'xlsm')
+EXTENSIONS = ('csv',) + XLSX_EXTENSIONS
+
+_AMBIGUOUS = object()
+
+class ImportResult:
+    def __init__(self, kind, dry_run):
+        self.kind = kind
+        self.dry_run = dry_run
+        self.rows = 0
+        self.imported = 0
+        self.errors = []
+
+    def error(self, line, message):
+        self.errors.append(RowError(line, message))
+
+class RowInvalid(ValueError):
+    pass
+
+def read_rows(stream, filename):
+    """Yield ``(line, {column: value})`` from a binary CSV or XLSX stream without loading it whole.
+
+    Header names are lower-cased; blank rows are skipped. XLSX support needs openpyxl.
+    """
+    if os.path.splitext(filename)[1].lower().lstrip('.') in XLSX_EXTENSIONS:
+        # checked up front so callers can report it before any row is read
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise RuntimeError("Importing .xlsx files needs openpyxl (pip install openpyxl)") from None
+        return _xlsx_rows(load_workbook(stream, read_only=True, data_only=True).active)
+    return _csv_rows(stream)
+
+def _xlsx_rows(sheet):
+    rows = sheet.iter_rows(values_only=True)
+    header = [str(h or '').strip().lower() for h in next(rows, ())]
+    for line, values in enumerate(rows, start=2):
+        if any(v not in (None, '') for v in values):
+            yield line, {h: '' if v is None else v for h, v in zip(header, values)}
+
+def _csv_rows(stream):
+    reader = csv.reader(codecs.iterdecode(stream, 'utf-8-sig'))
+    header = [h.strip().lower() for h in next(reader, [])]
+    for line, values in enumerate(reader, start=2):
+        if any(v.strip() for v in values):
+            yield line, dict(zip(header, values))
+
+def _text(row, column, required=False, max_length=None):
+    value = row.get(column)
+    value = '' if value is None else str(value).strip()
+    if required and not value:
+        raise RowInvalid(f"{column} is required")
+    if max_length and len(value) > max_length:
+        raise RowInvalid(f"{column} is longer than {max_length} characters")
+    return value or None
+
+def _date(row, column):
+    value = row.get(column)
+    if value in (None, ''):
+        return None
+    if isinstance(value, date):
+        return value if type(value) is date else value.date()
+    try:
+        return date.fromisoformat(str(value).strip())
+    except ValueError:
+        raise RowInvalid(f"{column} must be a YYYY-MM-DD date, got {value!r}") from None
+
+def _percent(row, column):
+    value = row.get(column)
+    if value in (None, ''):
+        return None
+    try:
+        value = int(str(value).strip())
+    except ValueError:
+        raise RowInvalid(f"{column} must be a whole number, got {value!r}") from None
+    if not 0 <= value <= 100:
+        raise RowInvalid(f"{column} must be between 0 and 100")
+    return value
+
+def _lookup(mapping, key, what):
+    if key is None:
+        return None
+    found = mapping.get(key.lower())
+    if found is None:
+        raise RowInvalid(f"unknown {what} {key!r}")
+    if found is _AMBIGUOUS:
+        raise RowInvalid(f"{what} {key!r} is ambiguous; names must be unique")
+    return found
+
+def _name_map(rows):
+    mapping = {}
+    for id_, name in rows:
+        key = name.lower()
+        mapping[key] = _AMBIGUOUS if key in mapping else id_
+    return mapping
+
+_MISSING = object()
+
+class Lookups:
+    """Name/email -> id maps, built with one query per table and extended as rows are inserted.
+
+    Additions since the last ``commit()`` are journaled, so ``rollback()`` can forget the ids of a
+    chunk whose transaction was rolled back.
+    """
+
+    def __init__(self):
+        self.departments = _name_map(db.session.execute(db.select(Department.id, Department.name)))
+        self.projects = _name_map(db.session.execute(db.select(Project.id, Project.name)))
+        self.roles = _name_map(db.session.execute(db.select(Role.id, Role.name)))
+        self.users = {email.lower(): id_ for id_, email in db.session.execute(db.select(User.id, User.email))}
+        self._journal = []
+
+    def add(self, mapping, key, id_):
+        key = key.lower()
+        previous = mapping.get(key, _MISSING)
+        self._journal.append((mapping, key, previous))
+        mapping[key] = id_ if previous is _MISSING else _AMBIGUOUS
+
+    def commit(self):
+        self._journal.clear()
+
+    def rollback(self):
+        while self._journal:
+            mapping, key, previous = self._journal.pop()
+            if previous is _MISSING:
+                del mapping[key]
+            else:
+                mapping[key] = previous
+
+# --- per-kind validation: row -> mapping, raising RowInvalid; insert: [(line, mapping)] -> None ---
+
+def _validate_user(row, lookups, seen):
+    name = _text(row, 'name', required=True, max_length=128)
+    email = _text(row, 'email', required=True, max_length=120)
+    if email.lower() in lookups.users or email.lower() in seen:
+        raise RowInvalid(f"a user with email {email!r} already exists")
+    department_id = _lookup(lookups.departments, _text(row, 'department'), 'department')
+    role_id = _lookup(lookups.roles, _text(row, 'role'), 'role')
+    if (department_id is None) != (role_id is None):
+        raise RowInvalid("department and role must be given together")
+    seen.add(email.lower())
+    return {
+        'name': name,
+        'email': email,
+        'password': _text(row, 'password'),
+        'department_id': department_id,
+        'role_id': role_id,
+    }
+
+def _insert_users(batch, lookups, importer_id):
+    rows = [
+        {'name': m['name'], 'email': m['email'],
+         'password_hash': generate_password_hash(m['password']) if m['password'] else UNUSABLE_PASSWORD}
+        for _, m in batch
+    ]
+    ids = db.session.scalars(db.insert(User).returning(User.id, sort_by_parameter_order=True), rows).all()
+    assignments = []
+    for id_, (_, m) in zip(ids, batch):
+        lookups.add(lookups.users, m['email'], id_)
+        if m['department_id'] is not None:
+            assignments.append({'user_id': id_, 'department_id': m['department_id'], 'role_id': m['role_id']})
+    if assignments:
+        db.session.execute(db.insert(UserAssignment), assignments)
+
+def _validate_department(row, lookups, seen):
+    name = _text(row, 'name', required=True, max_length=128)
+    if name.lower() in lookups.departments or name.lower() in seen:
+        raise RowInvalid(f"department {name!r} already exists")
+    parent = _text(row, 'parent')
+    # the parent may be a row earlier in this chunk, which isn't in the lookups until inserted
+    if parent is not None and parent.lower() not in seen:
+        _lookup(lookups.departments, parent, 'parent department')
+    seen.add(name.lower())
+    return {'name': name, 'parent': parent}
+
+def _insert_departments(batch, lookups, importer_id):
+    # one at a time: a row may name a parent from earlier in the same file, and the closure
+    # table needs each new id
+    connection = db.session.connection()
+    for line, m in batch:
+        parent_id = _lookup(lookups.departments, m['parent'], 'parent department')
+        id_ = db.session.scalar(db.insert(Department).returning(Department.id), {'name': m['name'], 'parent_id': parent_id})
+        DepartmentClosure.insert_node(connection, id_, parent_id)
+        lookups.add(lookups.departments, m['name'], id_)
+
+def _validate_project(row, lookups, seen):
+    return {
+        'name': _text(row, 'name', required=True, max_length=128),
+        'department_id': _lookup(lookups.departments, _text(row, 'department', required=True), 'department'),
+        'description': _text(row, 'description'),
+    }
+
+def _insert_projects(batch, lookups, importer_id):
+    rows = [dict(m, creator_id=importer_id) for _, m in batch]
+    ids = db.session.scalars(db.insert(Project).returning(Project.id, sort_by_parameter_order=True), rows).all()
+    for id_, (_, m) in zip(ids, batch):
+        lookups.add(lookups.projects, m['name'], id_)
+
+def _validate_task(row, lookups, seen):
+    start, end = _date(row, 'start_date'), _date(row, 'end_date')
+    if start and end and end < start:
+        raise RowInvalid("end_date is before start_date")
+    assignees = []
+    for email in (_text(row, 'assignees') or '').replace(',', ';').split(';'):
+        if email.strip():
+            assignees.append(_lookup(lookups.users, email.strip(), 'assignee'))
+    return {
+        'name': _text(row, 'name', required=True, max_length=128),
+        'description': _text(row, 'description'),
+        'project_id': _lookup(lookups.projects, _text(row, 'project', required=True), 'project'),
+        'manager_id': _lookup(lookups.users, _text(row, 'manager'), 'manager'),
+        'start_date': start,
+        'end_date': end,
+        'assignees': list(dict.fromkeys(assignees)),
+        'workload_percent': _percent(row, 'workload_percent'),
+    }
+
+def _insert_tasks(batch, lookups, importer_id):
+    rows = [
+        {k: v for k, v in m.items() if k not in ('assignees', 'workload_percent')} | {'created_by': importer_id, 'submitted': False}
+        for _, m in batch
+    ]
+    ids = db.session.scalars(db.insert(Task).returning(Task.id, sort_by_parameter_order=True), rows).all()
+    links = [
+        {'task_id': id_, 'user_id': user_id, 'workload_percent': m['workload_percent']}
+        for id_, (_, m) in zip(ids, batch) for user_id in m['assignees']
+    ]
+    if links:
+        db.session.execute(task_assignments.insert(), links)
+
+KINDS = {
+    'users': (_validate_user, _insert_users),
+    'departments': (_validate_department, _insert_departments),
+    'projects': (_validate_project, _insert_projects),
+    'tasks': (_validate_task, _insert_tasks),
+}
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+def import_rows(kind, rows, importer_id=None, dry_run=False, chunk_size=1000):
+    """Validate and insert ``(line, row)`` pairs of ``kind`` in chunks of ``chunk_size``.
+
+    Each chunk is inserted with executemany statements and committed on its own, so memory stays
+    flat and a bad row only costs that row. ``dry_run`` validates every row and inserts nothing;
+    rows may only refer to earlier rows of the same file by name, which validation tracks itself.
+    """
+    validate, insert = KINDS[kind]
+    result = ImportResult(kind, dry_run)
+    lookups = Lookups()
+    seen = set()
+    for chunk in _chunks(rows, chunk_size):
+        if not dry_run:
+            # committed chunks are in the lookups, so only this chunk's names need remembering, and
+            # a chunk that fails to insert takes its names with it
+            seen = set()
+        batch = []
+        for line, row in chunk:
+            result.rows += 1
+            try:
+                batch.append((line, validate(row, lookups, seen)))
+            except RowInvalid as e:
+                result.error(line, str(e))
+        if dry_run or not batch:
+            result.imported += len(batch)
+            continue
+        try:
+            insert(batch, lookups, importer_id)
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            lookups.rollback()
+            result.error(batch[0][0], f"lines {batch[0][0]}-{batch[-1][0]} not imported: {e.orig}")
+            continue
+        lookups.commit()
+        result.imported += len(batch)
+    return result
\ No newline at end of file
@@ -0,0 +1,229 @@
+from collections import namedtuple
+from datetime import date, datetime, timedelta, timezone
+from flask import current_app
+from app.extensions import db
+from app.models import KPISuggestion, Task, TaskReview, task_assignments
+from app.utils.replica import primary_reads
+from app.utils.reports import period_bounds
+from app.utils.workload import daily_loads
+
+try:
+    import numpy as np
+except ImportError:  # optional: the weighting falls back to a plain loop
+    np = None
+
+# per (user, month) inputs; a task counts towards the month of its end_date (start_date if it has none)
+Metrics = namedtuple('Metrics', 'user_id year month tasks submitted due on_time review_avg load')
+
+FACTORS = {}
+
+def factor(name):
+    """Register ``fn(metrics) -> 0..1 or None`` as a scoring factor, weighted by ``KPI_SUGGESTION_WEIGHTS[name]``.
+
+    None means the factor has nothing to say for that user and month; the remaining weights
+    are rescaled so it neither helps nor hurts.
+    """
+    def register(fn):
+        FACTORS[name] = fn
+        return fn
+    return register
+
+@factor('reviews')
+def _reviews(m):
+    return None if m.review_avg is None else m.review_avg / 100
+
+@factor('completion')
+def _completion(m):
+    return m.submitted / m.tasks if m.tasks else None
+
+@factor('punctuality')
+def _punctuality(m):
+    # submitted on or before end_date, out of everything submitted with a timestamp or already overdue
+    return m.on_time / m.due if m.due else None
+
+@factor('workload')
+def _workload(m):
+    return None if m.load is None else min(m.load, 1.0)
+
+def _months(first, last):
+    year, month = first
+    while (year, month) <= last:
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+def collect_metrics(first, last, user_ids=None, with_load=False):
+    """``Metrics`` for every user with a task due in the inclusive ``(year, month)`` range, in one query.
+
+    ``with_load`` adds each user's average daily load as a fraction of WORKLOAD_CAPACITY_PERCENT,
+    which costs a second query over the same window.
+    """
+    first_day, end_day = (d.date() for d in period_bounds(first, last))
+    due_on = db.func.coalesce(Task.end_date, Task.start_date)
+    reviews = (
+        db.select(TaskReview.task_id, db.func.avg(TaskReview.score).label('score'))
+        .group_by(TaskReview.task_id)
+        .subquery()
+    )
+    timed = db.and_(Task.submitted == True, Task.submitted_at.is_not(None))
+    overdue = db.and_(db.or_(Task.submitted == False, Task.submitted.is_(None)), Task.end_date < date.today())
+    on_time = db.and_(timed, db.func.date(Task.submitted_at) <= Task.end_date)
+    year, month = db.extract('year', due_on), db.extract('month', due_on)
+    query = (
+        db.select(
+            task_assignments.c.user_id, year, month,
+            db.func.count(),
+            db.func.sum(db.case((Task.submitted == True, 1), else_=0)),
+            db.func.sum(db.case((db.and_(Task.end_date.is_not(None), db.or_(timed, overdue)), 1), else_=0)),
+            db.func.sum(db.case((db.and_(Task.end_date.is_not(None), on_time), 1), else_=0)),
+            db.func.avg(reviews.c.score),
+        )
+        .select_from(task_assignments)
+        .join(Task, Task.id == task_assignments.c.task_id)
+        .outerjoin(reviews, reviews.c.task_id == Task.id)
+        .where(due_on >= first_day, due_on < end_day)
+        .group_by(task_assignments.c.user_id, year, month)
+    )
+    if user_ids is not None:
+        query = query.where(task_assignments.c.user_id.in_(list(user_ids)))
+    rows = [
+        Metrics(user_id, int(y), int(m), tasks, submitted or 0, due or 0, on_time or 0,
+                None if review_avg is None else float(review_avg), None)
+        for user_id, y, m, tasks, submitted, due, on_time, review_avg in db.session.execute(query)
+    ]
+    if not with_load or not rows:
+        return rows
+
+    loads = daily_loads({m.user_id for m in rows}, first_day, (end_day - first_day).days)
+    capacity = current_app.config['WORKLOAD_CAPACITY_PERCENT']
+    offsets = {}
+    for year_, month_ in _months(first, last):
+        start = date(year_, month_, 1)
+        next_month = (start + timedelta(days=31)).replace(day=1)
+        offsets[year_, month_] = ((start - first_day).days, (next_month - first_day).days)
+    result = []
+    for m in rows:
+        begin, end = offsets[m.year, m.month]
+        days = loads[m.user_id][begin:end]
+        result.append(m._replace(load=sum(days) / len(days) / capacity))
+    return result
+
+def _combine(values, weights):
+    """Weighted mean of each row of ``values`` (None entries skipped), scaled to 0-100; None if nothing applies."""
+    if np is not None:
+        matrix = np.array(values, dtype=float).reshape(len(values), len(weights))
+        weights = np.array(weights, dtype=float)
+        present = ~np.isnan(matrix)
+        total = present @ weights
+        weighted = np.where(present, matrix, 0.0) @ weights
+        scores = np.rint(100 * weighted / np.where(total > 0, total, 1))
+        return [int(s) if t > 0 else None for s, t in zip(scores.tolist(), total.tolist())]
+
+    scores = []
+    for row in values:
+        total = sum(w for v, w in zip(row, weights) if v is not None)
+        weighted = sum(v * w for v, w in zip(row, weights) if v is not None)
+        scores.append(round(100 * weighted / total) if total > 0 else None)
+    return scores
+
+def suggest(first, last, user_ids=None, weights=None):
+    """``[(Metrics, score, {factor: value})]`` for the inclusive ``(year, month)`` range.
+
+    ``weights`` defaults to ``KPI_SUGGESTION_WEIGHTS``; factors with no weight are not evaluated.
+    """
+    weights = {name: w for name, w in (weights or current_app.config['KPI_SUGGESTION_WEIGHTS']).items() if w}
+    unknown = set(weights) - set(FACTORS)
+    if unknown:
+        raise ValueError(f"Unknown KPI factors: {', '.join(sorted(unknown))}")
+    names = sorted(weights)
+    metrics = collect_metrics(first, last, user_ids, with_load='workload' in weights)
+    values = [[FACTORS[name](m) for name in names] for m in metrics]
+    scores = _combine(values, [weights[name] for name in names])
+    return [
+        (m, score, {name: round(v, 4) for name, v in zip(names, row) if v is not None})
+        for m, row, score in zip(metrics, values, scores)
+        if score is not None
+    ]
+
+def _rows(results, now):
+    return [
+        {'user_id': m.user_id, 'year': m.year, 'month': m.month, 'score': score,
+         'factors': factors, 'task_count': m.tasks, 'computed_at': now}
+        for m, score, factors in results
+    ]
+
+def precompute(first, last, weights=None):
+    """Replace the stored suggestions for the inclusive ``(year, month)`` range; returns the row count.
+
+    The caller commits.
+    """
+    rows = _rows(suggest(first, last, weights=weights), datetime.now(timezone.utc))
+    period = KPISuggestion.year * 100 + KPISuggestion.month
+    db.session.execute(db.delete(KPISuggestion).where(
+        period.between(first[0] * 100 + first[1], last[0] * 100 + last[1])
+    ))
+    if rows:
+        db.session.execute(db.insert(KPISuggestion), rows)
+    return len(rows)
+
+def refresh(stale):
+    """Recompute the stored suggestions of ``{(user_id, year, month)}``; the caller commits.
+
+    Only months that have been precomputed are touched; the others are left to the nightly run.
+    """
+    by_month = {}
+    for user_id, year, month in stale:
+        by_month.setdefault((year, month), set()).add(user_id)
+    period = KPISuggestion.year * 100 + KPISuggestion.month
+    stored = db.session.execute(
+        db.select(KPISuggestion.year, KPISuggestion.month)
+        .where(period.in_([year * 100 + month for year, month in by_month]))
+        .distinct()
+    ).all()
+    now = datetime.now(timezone.utc)
+    for year, month in stored:
+        user_ids = by_month[year, month]
+        rows = _rows(suggest((year, month), (year, month), user_ids=user_ids), now)
+        db.session.execute(db.delete(KPISuggestion).where(
+            KPISuggestion.year == year, KPISuggestion.month == month, KPISuggestion.user_id.in_(list(user_ids))
+        ))
+        if rows:
+            db.session.execute(db.insert(KPISuggestion), rows)
+
+# --- keeping stored suggestions current ---
+
+def _task_months(task):
+    """``(user_id, year, month)`` that ``task`` counted towards before this flush or will after it."""
+    state = db.inspect(task)
+    days = {task.start_date, task.end_date}
+    for attr in ('start_date', 'end_date'):
+        days.update(state.attrs[attr].history.deleted)
+    history = state.attrs.assignees.history
+    assignees = task.assignees if history.empty() else (*history.added, *history.unchanged, *history.deleted)
+    return {(user.id, day.year, day.month) for user in assignees if user.id is not None for day in days if day}
+
+@db.event.listens_for(db.session, 'before_flush')
+def _collect_stale_suggestions(session, flush_context, instances):
+    stale = set()
+    with session.no_autoflush:
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            if isinstance(obj, Task) and (obj not in session.dirty or session.is_modified(obj)):
+                stale |= _task_months(obj)
+            elif isinstance(obj, TaskReview):
+                task = obj.task if obj.task is not None else session.get(Task, obj.task_id)
+                if task is not None:
+                    stale |= _task_months(task)
+    if stale:
+        session.info.setdefault('kpi_suggestions_stale', set()).update(stale)
+
+@db.event.listens_for(db.session, 'before_commit')
+def _refresh_stale_suggestions(session):
+    # the commit's own flush comes after this hook; it may still have reviews to collect
+    session.flush()
+    stale = session.info.pop('kpi_suggestions_stale', None)
+    if stale:
+        with primary_reads():
+            refresh(stale)
+
+@db.event.listens_for(db.session, 'after_rollback')
+def _forget_stale_suggestions(session):
+    session.info.pop('kpi_suggestions_stale', None)
\ No newline at end of file
@@ -0,0 +1,157 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+class MailDispatcher:
+    """Bounded outbound mail queue drained by a fixed pool of worker threads.
+
+    Each worker takes whatever is queued (up to ``MAIL_BATCH_SIZE`` messages) and sends it over a
+    single SMTP connection from ``mail.connect()``. Failed sends are retried with exponential
+    backoff on a fresh connection. When the queue is full, ``enqueue`` blocks for up to
+    ``MAIL_ENQUEUE_TIMEOUT`` seconds and then sends inline, so a burst slows its producer instead
+    of growing memory without bound.
+    """
+
+    def __init__(self, mail, app=None):
+        self.mail = mail
+        self.app = None
+        self._queue = None
+        self._workers = []
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.inline = 0
+        self._latency_total = 0.0
+        self.max_latency = 0.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.queue_size = app.config.get('MAIL_QUEUE_SIZE', 1000)
+        self.worker_count = app.config.get('MAIL_WORKERS', 2)
+        self.batch_size = app.config.get('MAIL_BATCH_SIZE', 50)
+        self.max_retries = app.config.get('MAIL_MAX_RETRIES', 3)
+        self.backoff = app.config.get('MAIL_RETRY_BACKOFF', 1.0)
+        self.enqueue_timeout = app.config.get('MAIL_ENQUEUE_TIMEOUT', 5.0)
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        app.extensions['mail_dispatcher'] = self
+
+    def _ensure_workers(self):
+        # started lazily and per process: threads don't survive a gunicorn fork
+        if self._pid == os.getpid() and self._workers:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._workers:
+                return
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            self._workers = [
+                threading.Thread(target=self._run, name=f'mail-worker-{i}', daemon=True)
+                for i in range(self.worker_count)
+            ]
+            for worker in self._workers:
+                worker.start()
+            self._pid = os.getpid()
+            atexit.register(self.shutdown)
+
+    def enqueue(self, msg):
+        self._ensure_workers()
+        try:
+            self._queue.put((msg, time.monotonic()), timeout=self.enqueue_timeout)
+        except queue.Full:
+            logger.warning("Mail queue full (%d messages); sending inline", self._queue.qsize())
+            with self._stats_lock:
+                self.inline += 1
+            self.mail.send(msg)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                return
+            batch = [item]
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    extra = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if extra is _STOP:
+                    stop = True
+                    break
+                batch.append(extra)
+            try:
+                with self.app.app_context():
+                    self._send_batch(batch)
+            finally:
+                for _ in range(len(batch) + stop):
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _send_batch(self, batch):
+        pending = list(batch)
+        attempt = 0
+        while pending:
+            try:
+                with self.mail.connect() as conn:
+                    while pending:
+                        msg, enqueued_at = pending[0]
+                        conn.send(msg)
+                        pending.pop(0)
+                        attempt = 0
+                        self._record_sent(time.monotonic() - enqueued_at)
+            except Exception:
+                attempt += 1
+                if attempt > self.max_retries:
+                    msg, _ = pending.pop(0)
+                    logger.exception("Giving up on mail %r to %s", msg.subject, msg.recipients)
+                    with self._stats_lock:
+                        self.failed += 1
+                    attempt = 0
+                    continue
+                with self._stats_lock:
+                    self.retries += 1
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+
+    def _record_sent(self, latency):
+        with self._stats_lock:
+            self.sent += 1
+            self._latency_total += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def shutdown(self, timeout=30):
+        """Let the workers drain everything already queued, then stop them."""
+        if self._pid != os.getpid() or not self._workers:
+            return
+        for _ in self._workers:
+            self._queue.put(_STOP)
+        deadline = time.monotonic() + timeout
+        for worker in self._workers:
+            worker.join(max(0, deadline - time.monotonic()))
+        self._workers = []
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'queue_depth': self._queue.qsize() if self._queue else 0,
+                'queue_size': self.queue_size,
+                'workers': len(self._workers),
+                'sent': self.sent,
+                'failed': self.failed,
+                'retries': self.retries,
+                'sent_inline': self.inline,
+                'avg_latency': self._latency_total / self.sent if self.sent else 0.0,
+                'max_latency': self.max_latency,
+            }
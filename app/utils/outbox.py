@@ -0,0 +1,207 @@
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from flask import current_app, render_template
+from flask_mail import Message
+from app.extensions import db, mail
+from app.models import OutboxMessage, Task, TaskReview, User
+
+logger = logging.getLogger(__name__)
+
+# kind -> loader turning the stored context (ids and plain values) into template variables
+RENDER_CONTEXT = {
+    'task_completed': lambda ctx: {'task': db.session.get(Task, ctx['task_id']), 'user': db.session.get(User, ctx['user_id'])},
+    'task_reviewed': lambda ctx: {'task': db.session.get(Task, ctx['task_id']), 'review': db.session.get(TaskReview, ctx['review_id'])},
+    'access_request': lambda ctx: {'user': db.session.get(User, ctx['user_id']), 'reason': ctx.get('reason')},
+    'approved_request': lambda ctx: {'user': db.session.get(User, ctx['user_id']), 'role': ctx['role']},
+    'denied_request': lambda ctx: {'user': db.session.get(User, ctx['user_id'])},
+}
+
+# high-volume kinds that are held for OUTBOX_DIGEST_WINDOW and merged per recipient
+DIGEST_KINDS = {'task_completed', 'task_reviewed', 'access_request'}
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def queue_email(kind, subject, sender, recipients, dedup_key=None, **context):
+    """Add a notification to the current transaction; it is only sent if the transaction commits.
+
+    Digestable kinds get one row per recipient, held back for the digest window. A pending row
+    with the same ``dedup_key`` and recipient is replaced rather than sent twice.
+    """
+    if kind not in RENDER_CONTEXT:
+        raise ValueError(f"Unknown outbox message kind {kind!r}")
+    window = current_app.config['OUTBOX_DIGEST_WINDOW']
+    if kind not in DIGEST_KINDS or not window:
+        msg = OutboxMessage(kind=kind, subject=subject, sender=sender, recipients=list(recipients), context=context)
+        db.session.add(msg)
+        return [msg]
+
+    if dedup_key:
+        cancel_email(dedup_key, recipients)
+    available_at = _utcnow() + timedelta(seconds=window)
+    rows = [
+        OutboxMessage(kind=kind, subject=subject, sender=sender, recipients=[recipient], recipient=recipient,
+                      dedup_key=dedup_key, context=context, available_at=available_at)
+        for recipient in recipients
+    ]
+    db.session.add_all(rows)
+    return rows
+
+def cancel_email(dedup_key, recipients=None):
+    """Drop notifications with ``dedup_key`` that no sender has claimed yet, e.g. a toggle flipped back."""
+    query = db.delete(OutboxMessage).where(OutboxMessage.dedup_key == dedup_key, OutboxMessage.status == 'pending')
+    if recipients is not None:
+        query = query.where(OutboxMessage.recipient.in_(list(recipients)))
+    db.session.execute(query.execution_options(synchronize_session=False))
+
+def claim_batch(size, flush=False):
+    """Atomically mark up to ``size`` due messages as ours and return them.
+
+    When a digestable row is due, every other pending row for the same recipient is claimed with
+    it so they go out as one mail. Rows left in 'sending' by a crashed sender are reclaimed once
+    their lease expires. ``flush`` also claims rows still inside their digest window.
+    """
+    now = _utcnow()
+    lease = timedelta(seconds=current_app.config['OUTBOX_LEASE_SECONDS'])
+    due = OutboxMessage.status == 'pending' if flush else db.and_(OutboxMessage.status == 'pending', OutboxMessage.available_at <= now)
+    claimable = db.or_(
+        due,
+        db.and_(OutboxMessage.status == 'sending', OutboxMessage.claimed_at < now - lease),
+    )
+    token = f"{os.uname().nodename}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    ids = db.select(OutboxMessage.id).where(claimable).order_by(OutboxMessage.id).limit(size)
+    db.session.execute(
+        db.update(OutboxMessage)
+        .where(OutboxMessage.id.in_(ids.scalar_subquery()), claimable)
+        .values(status='sending', claimed_by=token, claimed_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    due_recipients = (
+        db.select(OutboxMessage.recipient)
+        .where(OutboxMessage.claimed_by == token, OutboxMessage.recipient.is_not(None))
+        .distinct()
+        .scalar_subquery()
+    )
+    db.session.execute(
+        db.update(OutboxMessage)
+        .where(OutboxMessage.status == 'pending', OutboxMessage.recipient.in_(due_recipients))
+        .values(status='sending', claimed_by=token, claimed_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return OutboxMessage.query.filter_by(claimed_by=token, status='sending').order_by(OutboxMessage.id).all()
+
+def _envelopes(rows):
+    """Group claimed rows into mails: one per plain row, one per recipient for digest rows."""
+    envelopes, digests = [], {}
+    for row in rows:
+        if row.recipient is None:
+            envelopes.append([row])
+        else:
+            digests.setdefault(row.recipient, []).append(row)
+    return envelopes + list(digests.values())
+
+def _render_context(row):
+    context = RENDER_CONTEXT[row.kind](row.context)
+    if any(value is None for value in context.values() if not isinstance(value, str)):
+        return None
+    return context
+
+def _build_message(rows):
+    # templates build absolute links, which need a request context outside the web process
+    with current_app.test_request_context(base_url=current_app.config['OUTBOX_BASE_URL']):
+        if len(rows) == 1:
+            row = rows[0]
+            context = _render_context(row)
+            if context is None:
+                raise LookupError(f"Objects referenced by outbox message {row.id} no longer exist")
+            msg = Message(row.subject, sender=row.sender, recipients=row.recipients)
+            msg.body = render_template(f'email/{row.kind}.txt', **context)
+            msg.html = render_template(f'email/{row.kind}.html', **context)
+            return msg
+
+        items = {kind: [] for kind in DIGEST_KINDS}
+        for row in rows:
+            context = _render_context(row)
+            if context is not None:
+                items[row.kind].append(context)
+        count = sum(len(entries) for entries in items.values())
+        if not count:
+            raise LookupError(f"Objects referenced by outbox messages {[r.id for r in rows]} no longer exist")
+        sender = current_app.config.get('MAIL_DEFAULT_SENDER') or rows[0].sender
+        msg = Message(f"KPI Manager: {count} new notifications", sender=sender, recipients=[rows[0].recipient])
+        msg.body = render_template('email/digest.txt', **items)
+        msg.html = render_template('email/digest.html', **items)
+        return msg
+
+def _mark_failed(rows, error):
+    for row in rows:
+        row.attempts += 1
+        row.last_error = repr(error)
+        if row.attempts >= current_app.config['OUTBOX_MAX_ATTEMPTS']:
+            row.status = 'failed'
+            logger.error("Outbox message %s failed permanently: %r", row.id, error)
+        else:
+            row.status = 'pending'
+            row.available_at = _utcnow() + timedelta(seconds=current_app.config['OUTBOX_RETRY_BACKOFF'] * 2 ** (row.attempts - 1))
+
+def _release(rows):
+    """Hand claimed rows back without spending an attempt; they are due again after the retry backoff."""
+    available_at = _utcnow() + timedelta(seconds=current_app.config['OUTBOX_RETRY_BACKOFF'])
+    for row in rows:
+        row.status = 'pending'
+        row.available_at = available_at
+
+def send_batch(rows):
+    """Send claimed rows over as few SMTP connections as possible, record each outcome and return the sent count.
+
+    Each sent mail is committed straight away, so a crash mid-batch never sends it twice. If the
+    server cannot be reached the rest of the batch is released for a later claim and the error re-raised.
+    """
+    pending = _envelopes(rows)
+    sent = 0
+    while pending:
+        connected = False
+        try:
+            with mail.connect() as conn:
+                connected = True
+                while pending:
+                    conn.send(_build_message(pending[0]))
+                    for row in pending.pop(0):
+                        row.status = 'sent'
+                        row.sent_at = _utcnow()
+                    db.session.commit()
+                    sent += 1
+        except Exception as e:
+            if not connected:
+                _release([row for envelope in pending for row in envelope])
+                db.session.commit()
+                raise
+            if pending:
+                # the connection may be unusable now; fail this mail and reconnect for the rest
+                _mark_failed(pending.pop(0), e)
+                db.session.commit()
+    return sent
+
+def run(batch_size=None, interval=None, once=False, flush=False):
+    """Claim and send batches until interrupted (or, with ``once``, until nothing is due or SMTP is down)."""
+    batch_size = batch_size or current_app.config['OUTBOX_BATCH_SIZE']
+    interval = interval if interval is not None else current_app.config['OUTBOX_POLL_INTERVAL']
+    sent = 0
+    while True:
+        rows = claim_batch(batch_size, flush=flush)
+        if not rows:
+            if once:
+                return sent
+            time.sleep(interval)
+            continue
+        try:
+            sent += send_batch(rows)
+        except Exception as e:
+            logger.warning("Cannot reach the mail server, postponing the rest of the batch: %r", e)
+            if once:
+                return sent
+            time.sleep(interval)
\ No newline at end of file
@@ -0,0 +1,87 @@
+import base64
+import json
+from sqlalchemy import tuple_
+
+class KeysetPage:
+    """One page of a keyset-paginated query, ordered newest first."""
+
+    def __init__(self, items, has_next, has_prev, sort_attr, id_attr):
+        self.items = items
+        self.has_next = has_next
+        self.has_prev = has_prev
+        self._sort_attr = sort_attr
+        self._id_attr = id_attr
+
+    def _cursor(self, item):
+        return encode_cursor(getattr(item, self._sort_attr), getattr(item, self._id_attr))
+
+    @property
+    def next_cursor(self):
+        return self._cursor(self.items[-1]) if self.has_next and self.items else None
+
+    @property
+    def prev_cursor(self):
+        return self._cursor(self.items[0]) if self.has_prev and self.items else None
+
+def encode_cursor(sort_value, id_value):
+    if hasattr(sort_value, 'isoformat'):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_value, id_value]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor, sort_column):
+    """Return ``(sort_value, id)`` for a cursor made by ``encode_cursor``, or None if it's malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        sort_value, id_value = json.loads(raw)
+        if sort_value is not None:
+            python_type = sort_column.type.python_type
+            if hasattr(python_type, 'fromisoformat'):
+                sort_value = python_type.fromisoformat(sort_value)
+        return sort_value, int(id_value)
+    except (ValueError, TypeError):
+        return None
+
+def keyset_paginate(query, sort_column, id_column, after=None, before=None, per_page=20):
+    """Seek-paginate ``query`` by ``(sort_column DESC NULLS LAST, id_column DESC)``.
+
+    ``after``/``before`` are cursors from a previous page. Unlike ``paginate`` there's no OFFSET:
+    rows with a sort value are read with a row-value range on the ``(sort_column, id_column)``
+    index, so page N costs the same index range scan as page 1, and the rows without one are
+    only queried once those run out.
+    """
+    after_key = decode_cursor(after, sort_column) if after else None
+    before_key = decode_cursor(before, sort_column) if before else None
+    key = tuple_(sort_column, id_column)
+    dated = query.filter(sort_column.is_not(None))
+    undated = query.filter(sort_column.is_(None))
+
+    if before_key is not None:
+        # walk backwards from the cursor in ascending order, then flip the page
+        value, last_id = before_key
+        ascending = dated.order_by(sort_column.asc(), id_column.asc())
+        if value is None:
+            rows = undated.filter(id_column > last_id).order_by(id_column.asc()).limit(per_page + 1).all()
+            if len(rows) <= per_page:
+                # past the first undated row: the oldest dated ones come right before it
+                rows += ascending.limit(per_page + 1 - len(rows)).all()
+        else:
+            rows = ascending.filter(key > tuple_(value, last_id)).limit(per_page + 1).all()
+        has_prev = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        has_next = True
+    else:
+        rows = []
+        if after_key is None or after_key[0] is not None:
+            if after_key is not None:
+                dated = dated.filter(key < tuple_(*after_key))
+            rows = dated.order_by(sort_column.desc(), id_column.desc()).limit(per_page + 1).all()
+        if len(rows) <= per_page:
+            if after_key is not None and after_key[0] is None:
+                undated = undated.filter(id_column < after_key[1])
+            rows += undated.order_by(id_column.desc()).limit(per_page + 1 - len(rows)).all()
+        has_next = len(rows) > per_page
+        items = rows[:per_page]
+        has_prev = after_key is not None
+
+    return KeysetPage(items, has_next, has_prev, sort_column.key, id_column.key)
\ No newline at end of file
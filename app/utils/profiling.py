@@ -0,0 +1,308 @@
+import logging
+import re
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import datetime, timezone
+from flask import before_render_template, g, has_request_context, request, request_started, request_tearing_down, template_rendered
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+SlowQuery = namedtuple('SlowQuery', 'at endpoint seconds statement plan')
+
+_EXPLAINABLE = re.compile(r'\s*(SELECT|WITH)\b', re.IGNORECASE)
+# dialects whose EXPLAIN syntax and output the plan reader knows, and their prefix
+_EXPLAIN = {'sqlite': 'EXPLAIN QUERY PLAN ', 'postgresql': 'EXPLAIN '}
+_SAVEPOINT = 'query_profiler_explain'
+# statements longer than this are cut short on the stats page and in the slow query log
+_STATEMENT_LIMIT = 2000
+# repeated statements remembered per endpoint, and EXPLAIN plans per process
+_REPEATED_LIMIT = 20
+_PLAN_LIMIT = 256
+
+class _RequestProfile:
+    __slots__ = ('started', 'queries', 'sql_seconds', 'render_started', 'render_depth', 'render_seconds', 'slow', 'selects')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.render_started = 0.0
+        self.render_depth = 0
+        self.render_seconds = 0.0
+        self.slow = 0
+        # SELECT text -> times run; SQLAlchemy reuses the compiled string, so its hash is cached
+        self.selects = {}
+
+class EndpointStats:
+    """Totals for every request one endpoint has handled since the worker started (or the last reset)."""
+
+    __slots__ = ('requests', 'queries', 'sql_seconds', 'render_seconds', 'seconds', 'max_queries', 'max_seconds',
+                 'n_plus_one', 'slow', 'repeated')
+
+    def __init__(self):
+        self.requests = self.queries = self.max_queries = self.n_plus_one = self.slow = 0
+        self.sql_seconds = self.render_seconds = self.seconds = self.max_seconds = 0.0
+        # statement -> [requests that repeated it, most repeats in one request]
+        self.repeated = {}
+
+    def add(self, profile, seconds, repeated):
+        self.requests += 1
+        self.queries += profile.queries
+        self.sql_seconds += profile.sql_seconds
+        self.render_seconds += profile.render_seconds
+        self.seconds += seconds
+        self.max_queries = max(self.max_queries, profile.queries)
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.slow += profile.slow
+        if repeated:
+            self.n_plus_one += 1
+        for statement, count in repeated.items():
+            seen = self.repeated.get(statement)
+            if seen is not None:
+                seen[0] += 1
+                seen[1] = max(seen[1], count)
+            elif len(self.repeated) < _REPEATED_LIMIT:
+                self.repeated[statement] = [1, count]
+
+    def copy(self):
+        other = EndpointStats()
+        for name in self.__slots__:
+            setattr(other, name, getattr(self, name))
+        other.repeated = {statement: list(seen) for statement, seen in self.repeated.items()}
+        return other
+
+class QueryProfiler:
+    """Per-endpoint query counts, SQL time, template render time and N+1 patterns, plus a slow query log.
+
+    Engine ``before/after_cursor_execute`` events time every statement and add it to the current
+    request's tally; Flask's request and template signals time the request and its rendering, and
+    fold the tally into per-endpoint totals when the request is torn down (after a streamed
+    response has finished). A SELECT run ``PROFILE_N_PLUS_ONE`` or more times in one request is
+    counted as an N+1 pattern. Statements slower than ``PROFILE_SLOW_QUERY_MS`` are logged with
+    their EXPLAIN plan, in requests and CLI commands alike; each distinct statement is explained
+    once per process.
+
+    The cost is two ``perf_counter()`` calls and a few dict updates per statement. Totals live in
+    this process: with several workers, each one reports its own.
+    """
+
+    def __init__(self, app=None, db=None):
+        self.enabled = False
+        self.endpoints = {}
+        self.slow_queries = deque(maxlen=50)
+        self.since = datetime.now(timezone.utc)
+        self._plans = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        self.enabled = app.config.get('PROFILING', True)
+        self.slow_seconds = app.config.get('PROFILE_SLOW_QUERY_MS', 250) / 1000
+        self.n_plus_one = app.config.get('PROFILE_N_PLUS_ONE', 10)
+        self.explain = app.config.get('PROFILE_EXPLAIN', True)
+        self.slow_queries = deque(self.slow_queries, maxlen=app.config.get('PROFILE_SLOW_QUERY_LOG_SIZE', 50))
+        app.extensions['query_profiler'] = self
+        if not self.enabled:
+            return
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+                event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        request_started.connect(self._request_started, app)
+        request_tearing_down.connect(self._request_finished, app)
+        before_render_template.connect(self._render_started, app)
+        template_rendered.connect(self._render_finished, app)
+
+    # --- statements ---
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info['profile_started'] = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info['profile_started']
+        profile = g.get('query_profile') if has_request_context() else None
+        if profile is not None:
+            profile.queries += 1
+            profile.sql_seconds += seconds
+            if context is not None and not (context.isinsert or context.isupdate or context.isdelete):
+                profile.selects[statement] = profile.selects.get(statement, 0) + 1
+        if seconds >= self.slow_seconds:
+            if profile is not None:
+                profile.slow += 1
+            self._log_slow(conn, cursor, statement, parameters, executemany, seconds)
+
+    def _log_slow(self, conn, cursor, statement, parameters, executemany, seconds):
+        endpoint = (request.endpoint or '<unmatched>') if has_request_context() else None
+        plan = None
+        if self.explain and not executemany and _EXPLAINABLE.match(statement):
+            plan = self._plan(conn, statement, parameters)
+        text = statement[:_STATEMENT_LIMIT]
+        self.slow_queries.append(SlowQuery(datetime.now(timezone.utc), endpoint, seconds, text, plan))
+        logger.warning("Slow query (%.0f ms) in %s:\n%s\nPlan:\n%s", seconds * 1000, endpoint or 'command',
+                       text, plan or '(not explained)')
+        logger.debug("Slow query parameters: %r", parameters)
+
+    def _plan(self, conn, statement, parameters):
+        plan = self._plans.get(statement)
+        if plan is not None:
+            return plan
+        prefix = _EXPLAIN.get(conn.dialect.name)
+        if prefix is None:
+            return None
+        # a cursor of its own on the same connection, so the plan sees the same transaction and the
+        # statement's own cursor keeps its results; inside a savepoint, because on PostgreSQL a
+        # failed statement aborts the whole transaction, and the request's work with it
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(f'SAVEPOINT {_SAVEPOINT}')
+        except Exception as e:
+            # e.g. autocommit mode, where there is no transaction to protect or nest in
+            cursor.close()
+            logger.info("Could not explain slow query: %s", e)
+            return None
+        try:
+            cursor.execute(prefix + statement, parameters)
+            rows = cursor.fetchall()
+        except Exception as e:
+            cursor.execute(f'ROLLBACK TO SAVEPOINT {_SAVEPOINT}')
+            logger.info("Could not explain slow query: %s", e)
+            return None
+        finally:
+            cursor.execute(f'RELEASE SAVEPOINT {_SAVEPOINT}')
+            cursor.close()
+        # SQLite: (id, parent, notused, detail); PostgreSQL: one text column per line
+        plan = '\n'.join(str(row[-1]) for row in rows)
+        if len(self._plans) >= _PLAN_LIMIT:
+            self._plans.clear()
+        self._plans[statement] = plan
+        return plan
+
+    # --- requests and templates ---
+
+    def _request_started(self, sender, **extra):
+        g.query_profile = _RequestProfile()
+
+    def _render_started(self, sender, template, context, **extra):
+        profile = g.get('query_profile')
+        if profile is not None:
+            # only the outermost template: one rendered from inside another is already being timed
+            if profile.render_depth == 0:
+                profile.render_started = time.perf_counter()
+            profile.render_depth += 1
+
+    def _render_finished(self, sender, template, context, **extra):
+        profile = g.get('query_profile')
+        if profile is not None and profile.render_depth:
+            profile.render_depth -= 1
+            if profile.render_depth == 0:
+                profile.render_seconds += time.perf_counter() - profile.render_started
+
+    def _request_finished(self, sender, exc=None, **extra):
+        profile = g.pop('query_profile', None)
+        if profile is None:
+            return
+        seconds = time.perf_counter() - profile.started
+        endpoint = request.endpoint or '<unmatched>'
+        repeated = {
+            statement[:_STATEMENT_LIMIT]: count
+            for statement, count in profile.selects.items() if count >= self.n_plus_one
+        }
+        with self._lock:
+            stats = self.endpoints.get(endpoint)
+            if stats is None:
+                stats = self.endpoints[endpoint] = EndpointStats()
+            stats.add(profile, seconds, repeated)
+
+    # --- reading ---
+
+    def snapshot(self):
+        """``{endpoint: EndpointStats}``, copied so it can be read while requests keep coming in."""
+        with self._lock:
+            return {endpoint: stats.copy() for endpoint, stats in self.endpoints.items()}
+
+    def reset(self):
+        with self._lock:
+            self.endpoints = {}
+            self.slow_queries.clear()
+            self.since = datetime.now(timezone.utc)
+
+def by_blueprint(snapshot):
+    """``snapshot`` summed per blueprint (the part of the endpoint name before the dot)."""
+    totals = {}
+    for endpoint, stats in snapshot.items():
+        blueprint = endpoint.rpartition('.')[0] or endpoint
+        total = totals.setdefault(blueprint, EndpointStats())
+        total.requests += stats.requests
+        total.queries += stats.queries
+        total.sql_seconds += stats.sql_seconds
+        total.render_seconds += stats.render_seconds
+        total.seconds += stats.seconds
+        total.max_queries = max(total.max_queries, stats.max_queries)
+        total.max_seconds = max(total.max_seconds, stats.max_seconds)
+        total.n_plus_one += stats.n_plus_one
+        total.slow += stats.slow
+    return totals
+
+# --- Prometheus text exposition format ---
+
+# (name, type, help, value of an EndpointStats)
+METRICS = [
+    ('requests_total', 'counter', "Requests handled.", lambda s: s.requests),
+    ('request_seconds_total', 'counter', "Time spent handling requests, including streamed bodies.", lambda s: s.seconds),
+    ('db_queries_total', 'counter', "SQL statements executed.", lambda s: s.queries),
+    ('db_query_seconds_total', 'counter', "Time spent executing SQL statements.", lambda s: s.sql_seconds),
+    ('template_render_seconds_total', 'counter', "Time spent rendering templates, including the SQL they trigger.",
+     lambda s: s.render_seconds),
+    ('db_slow_queries_total', 'counter', "SQL statements slower than PROFILE_SLOW_QUERY_MS.", lambda s: s.slow),
+    ('db_n_plus_one_requests_total', 'counter', "Requests that repeated a SELECT at least PROFILE_N_PLUS_ONE times.",
+     lambda s: s.n_plus_one),
+    ('db_queries_per_request_max', 'gauge', "Most SQL statements executed by one request.", lambda s: s.max_queries),
+    ('request_seconds_max', 'gauge', "Slowest request.", lambda s: s.max_seconds),
+]
+
+# (name, type, help, value of a Cache.stats() dict), one sample per cache namespace
+CACHE_METRICS = [
+    ('cache_hits_total', 'counter', "Cache lookups that found an entry.", lambda s: s['hits']),
+    ('cache_misses_total', 'counter', "Cache lookups that found nothing, or bypassed the cache during a write.",
+     lambda s: s['misses']),
+]
+
+# (name, type, help, value of a MailDispatcher.stats() dict)
+MAIL_METRICS = [
+    ('mail_queue_depth', 'gauge', "Messages waiting in this worker's mail queue.", lambda s: s['queue_depth']),
+    ('mail_queue_capacity', 'gauge', "MAIL_QUEUE_SIZE.", lambda s: s['queue_size']),
+    ('mail_sent_total', 'counter', "Messages handed to the SMTP server.", lambda s: s['sent']),
+    ('mail_failed_total', 'counter', "Messages given up on after MAIL_MAX_RETRIES attempts.", lambda s: s['failed']),
+    ('mail_retries_total', 'counter', "Failed SMTP attempts that were retried.", lambda s: s['retries']),
+    ('mail_sent_inline_total', 'counter', "Messages sent by the request itself because the queue was full.",
+     lambda s: s['sent_inline']),
+    ('mail_latency_seconds_avg', 'gauge', "Average time from enqueue to send.", lambda s: s['avg_latency']),
+    ('mail_latency_seconds_max', 'gauge', "Longest time from enqueue to send.", lambda s: s['max_latency']),
+]
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _series(lines, prefix, metrics, samples):
+    # samples: [({label: value}, item)]; every metric gets its HELP and TYPE even with no samples
+    for name, kind, help_text, value in metrics:
+        lines.append(f"# HELP {prefix}{name} {help_text}")
+        lines.append(f"# TYPE {prefix}{name} {kind}")
+        for labels, item in samples:
+            label_text = ','.join(f'{key}="{_label(text)}"' for key, text in labels.items())
+            lines.append(f'{prefix}{name}{{{label_text}}} {value(item)}' if label_text else f'{prefix}{name} {value(item)}')
+
+def prometheus_text(snapshot, caches=(), mail=None, prefix='kpi_manager_'):
+    """Per-endpoint stats, plus hit/miss counters of each ``Cache.stats()`` in ``caches`` and the
+    ``MailDispatcher.stats()`` in ``mail``."""
+    lines = []
+    _series(lines, prefix, METRICS, [
+        ({'endpoint': endpoint, 'blueprint': endpoint.rpartition('.')[0]}, stats)
+        for endpoint, stats in sorted(snapshot.items())
+    ])
+    _series(lines, prefix, CACHE_METRICS, [({'namespace': stats['namespace']}, stats) for stats in caches])
+    _series(lines, prefix, MAIL_METRICS, [({}, mail)] if mail else [])
+    return '\n'.join(lines) + '\n'
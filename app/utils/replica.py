@@ -0,0 +1,97 @@
+import functools
+import time
+from contextlib import contextmanager
+from flask import current_app, g, has_request_context, request, session as user_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql import Select
+
+# SQLALCHEMY_BINDS key of the read replica
+REPLICA = 'replica'
+
+class RoutingSession(Session):
+    """``db.session`` that sends plain SELECTs to the replica while a ``@replica_reads`` view runs.
+
+    Everything else stays on the primary: flushes, DML, ``SELECT ... FOR UPDATE``, raw SQL, and
+    ``session.connection()``, which the flush listeners use to maintain derived tables.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and isinstance(clause, Select)
+            and clause._for_update_arg is None
+            and has_request_context() and g.get('db_replica')
+        ):
+            engine = self._db.engines.get(REPLICA)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def replica_configured():
+    return REPLICA in current_app.config.get('SQLALCHEMY_BINDS', {})
+
+def pinned_to_primary():
+    """True while the current user's recent writes may not have reached the replica yet."""
+    return user_session.get('db_primary_until', 0) > time.time()
+
+@contextmanager
+def primary_reads():
+    """Read from the primary inside this block, even in a ``@replica_reads`` view.
+
+    For anything cached past this request: caches are invalidated when the primary commits, so
+    refilling one from a lagging replica would keep the stale value until the next change.
+    """
+    routed = has_request_context() and g.pop('db_replica', None)
+    try:
+        yield
+    finally:
+        if routed:
+            g.db_replica = routed
+
+def replica_reads(view):
+    """Serve this view's GET/HEAD queries from the replica, unless the user wrote something recently.
+
+    Only for views that never write: a write still goes to the primary, but whatever it was
+    based on came from a replica that may lag behind.
+    """
+    @functools.wraps(view)
+    def wrapped(*args, **kwargs):
+        if request.method in ('GET', 'HEAD') and replica_configured() and not pinned_to_primary():
+            g.db_replica = True
+        return view(*args, **kwargs)
+    return wrapped
+
+# --- read-your-writes: pin a user to the primary for a while after each commit that wrote ---
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _flushed(session, flush_context):
+    session.info['db_wrote'] = True
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _bulk_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info['db_wrote'] = True
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _pin_writer(session):
+    if session.info.pop('db_wrote', False) and has_request_context() and replica_configured():
+        user_session['db_primary_until'] = time.time() + current_app.config['REPLICA_STICKY_SECONDS']
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _forget_writes(session):
+    session.info.pop('db_wrote', None)
+
+def sync_sqlite(primary, replica):
+    """Copy the primary SQLite database over the replica with SQLite's online backup API.
+
+    A local stand-in for replication: run it on a timer and the replica lags by up to that long.
+    """
+    source = primary.raw_connection()
+    target = replica.raw_connection()
+    try:
+        source.driver_connection.backup(target.driver_connection)
+    finally:
+        target.close()
+        source.close()
\ No newline at end of file
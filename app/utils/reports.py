@@ -0,0 +1,135 @@
+from datetime import datetime
+from app.extensions import db, report_cache
+from app.models import (
+    Department, DepartmentClosure, UserAssignment, MonthlyKPISummary, TaskReview, task_assignments
+)
+
+BUCKET_SIZE = 10
+
+def _subtree_user_ids(department_id):
+    return (
+        db.select(UserAssignment.user_id)
+        .where(UserAssignment.department_id.in_(Department.subtree_ids(department_id)))
+        .distinct()
+    )
+
+def _score_stats(score_counts):
+    """Summarise ``[(score, count), ...]`` (one row per distinct score) into count/avg/median/buckets."""
+    score_counts = sorted((score, count) for score, count in score_counts if score is not None)
+    total = sum(count for _, count in score_counts)
+    buckets = [0] * (100 // BUCKET_SIZE)
+    for score, count in score_counts:
+        buckets[min(score // BUCKET_SIZE, len(buckets) - 1)] += count
+    stats = {
+        'count': total,
+        'avg': sum(score * count for score, count in score_counts) / total if total else None,
+        'min': score_counts[0][0] if score_counts else None,
+        'max': score_counts[-1][0] if score_counts else None,
+        'median': None,
+        'buckets': [
+            (f"{i * BUCKET_SIZE}-{i * BUCKET_SIZE + BUCKET_SIZE - (0 if i == len(buckets) - 1 else 1)}", n)
+            for i, n in enumerate(buckets)
+        ],
+    }
+    if total:
+        # walk the cumulative counts to the middle element(s)
+        lower, upper = (total - 1) // 2, total // 2
+        seen, low_value = 0, None
+        for score, count in score_counts:
+            if low_value is None and seen + count > lower:
+                low_value = score
+            if seen + count > upper:
+                stats['median'] = (low_value + score) / 2
+                break
+            seen += count
+    return stats
+
+def _kpi_filter(query, start, end):
+    period = MonthlyKPISummary.year * 100 + MonthlyKPISummary.month
+    return query.where(period >= start[0] * 100 + start[1], period <= end[0] * 100 + end[1])
+
+def _review_filter(query, start, end):
+    start_date, end_date = period_bounds(start, end)
+    return query.where(TaskReview.timestamp >= start_date, TaskReview.timestamp < end_date)
+
+def period_bounds(start, end):
+    """``[first day of start, first day after end)`` for inclusive ``(year, month)`` tuples."""
+    end_year, end_month = (end[0] + 1, 1) if end[1] == 12 else (end[0], end[1] + 1)
+    return datetime(start[0], start[1], 1), datetime(end_year, end_month, 1)
+
+def _reviewed_task_ids(user_ids):
+    return db.select(task_assignments.c.task_id).where(task_assignments.c.user_id.in_(user_ids))
+
+def _build_report(department_id, start, end):
+    users = _subtree_user_ids(department_id)
+
+    # the KPI for a user and month is its highest submission, already rolled up per row
+    kpi_counts = db.session.execute(_kpi_filter(
+        db.select(MonthlyKPISummary.max_score, db.func.count())
+        .where(MonthlyKPISummary.user_id.in_(users))
+        .group_by(MonthlyKPISummary.max_score),
+        start, end,
+    )).all()
+    review_counts = db.session.execute(_review_filter(
+        db.select(TaskReview.score, db.func.count())
+        .where(TaskReview.task_id.in_(_reviewed_task_ids(users)))
+        .group_by(TaskReview.score),
+        start, end,
+    )).all()
+
+    # per direct sub-department: (child subtree, user) pairs, each user counted once per child
+    children = db.select(Department.id).where(Department.parent_id == department_id)
+    members = (
+        db.select(DepartmentClosure.ancestor_id.label('department_id'), UserAssignment.user_id)
+        .join(UserAssignment, UserAssignment.department_id == DepartmentClosure.descendant_id)
+        .where(DepartmentClosure.ancestor_id.in_(children))
+        .distinct()
+        .subquery()
+    )
+    kpi_by_child = dict((row[0], row[1:]) for row in db.session.execute(_kpi_filter(
+        db.select(members.c.department_id, db.func.avg(MonthlyKPISummary.max_score), db.func.count())
+        .join(MonthlyKPISummary, MonthlyKPISummary.user_id == members.c.user_id)
+        .group_by(members.c.department_id),
+        start, end,
+    )))
+    # a review of a task with several assignees in the same child still counts once
+    child_reviews = _review_filter(
+        db.select(members.c.department_id, TaskReview.id, TaskReview.score)
+        .join(task_assignments, task_assignments.c.user_id == members.c.user_id)
+        .join(TaskReview, TaskReview.task_id == task_assignments.c.task_id)
+        .distinct(),
+        start, end,
+    ).subquery()
+    review_by_child = dict((row[0], row[1:]) for row in db.session.execute(
+        db.select(child_reviews.c.department_id, db.func.avg(child_reviews.c.score), db.func.count())
+        .group_by(child_reviews.c.department_id)
+    ))
+    breakdown = [
+        {
+            'department_id': child_id,
+            'department_name': name,
+            'kpi_avg': kpi_by_child.get(child_id, (None, 0))[0],
+            'kpi_count': kpi_by_child.get(child_id, (None, 0))[1],
+            'review_avg': review_by_child.get(child_id, (None, 0))[0],
+            'review_count': review_by_child.get(child_id, (None, 0))[1],
+        }
+        for child_id, name in db.session.execute(
+            db.select(Department.id, Department.name).where(Department.parent_id == department_id).order_by(Department.name)
+        )
+    ]
+
+    return {
+        'user_count': db.session.scalar(db.select(db.func.count()).select_from(users.subquery())),
+        'monthly_kpi': _score_stats(kpi_counts),
+        'task_reviews': _score_stats(review_counts),
+        'sub_departments': breakdown,
+    }
+
+def department_report(department_id, start, end):
+    """KPI and review score statistics for ``department_id`` and everything below it.
+
+    ``start``/``end`` are inclusive ``(year, month)`` tuples. Results are cached per
+    (department, period) until a KPI, review, assignment or department change is committed.
+    """
+    key = f"{department_id}:{start[0]}-{start[1]}:{end[0]}-{end[1]}"
+    return report_cache.get_or_set(key, lambda: _build_report(department_id, start, end))
@@ -0,0 +1,219 @@
+import re
+from collections import namedtuple
+from markupsafe import Markup, escape
+from app.extensions import db
+from app.models import Department, Project, Task, task_assignments
+
+# name and description of every task and project, in SQLite FTS5 tables whose rowid is the
+# row's id. Other databases (or a SQLite without the tables) fall back to LIKE scans.
+Index = namedtuple('Index', 'model fts')
+
+INDEXES = {
+    'project': Index(Project, db.table('project_search', db.column('rowid'), db.column('name'), db.column('description'))),
+    'task': Index(Task, db.table('task_search', db.column('rowid'), db.column('name'), db.column('description'))),
+}
+
+# bm25 weights per FTS column: a hit in the name counts ten times one in the description
+WEIGHTS = (10.0, 1.0)
+
+Hit = namedtuple('Hit', 'kind id name context_id context snippet')
+
+_TERM = re.compile(r'\w+', re.UNICODE)
+# private-use marks around snippet matches, swapped for <mark> once the text is escaped
+_OPEN, _CLOSE = '\ue000', '\ue001'
+
+_available = {}
+
+def available():
+    """True when the FTS5 tables exist on the current engine; checked once per engine."""
+    engine = db.engine
+    if engine not in _available:
+        _available[engine] = engine.dialect.name == 'sqlite' and all(
+            db.inspect(engine).has_table(index.fts.name) for index in INDEXES.values()
+        )
+    return _available[engine]
+
+def _fts_query(text, column=None, prefix=True):
+    """Every word of ``text`` as a quoted FTS5 term (so user input can't inject syntax), the last as a prefix."""
+    terms = [f'"{term}"' for term in _TERM.findall(text)]
+    if not terms:
+        return None
+    if prefix:
+        terms[-1] += '*'
+    expression = ' '.join(terms)
+    return f"{column} : ({expression})" if column else expression
+
+def _like(column, term):
+    return column.ilike('%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%', escape='\\')
+
+def _highlight(snippet):
+    if snippet is None:
+        return None
+    return Markup(str(escape(snippet)).replace(_OPEN, '<mark>').replace(_CLOSE, '</mark>'))
+
+def _context(kind):
+    # tasks are shown with their project, projects with their department
+    if kind == 'task':
+        return Project.id, Project.name, lambda query: query.join(Project, Project.id == Task.project_id)
+    return Department.id, Department.name, lambda query: query.join(Department, Department.id == Project.department_id)
+
+def _filtered(query, kind, department_id, assignee_id, start, end):
+    # both kinds have projects joined by now
+    if department_id is not None:
+        query = query.where(Project.department_id.in_(Department.subtree_ids(department_id)))
+    if kind == 'task':
+        if assignee_id is not None:
+            query = query.where(Task.id.in_(
+                db.select(task_assignments.c.task_id).where(task_assignments.c.user_id == assignee_id)
+            ))
+        if start is not None:
+            query = query.where(db.func.coalesce(Task.end_date, Task.start_date) >= start)
+        if end is not None:
+            query = query.where(Task.start_date <= end)
+    return query
+
+def _search_kind(kind, text, limit, names_only, filters):
+    index = INDEXES[kind]
+    model = index.model
+    context_id, context_name, join_context = _context(kind)
+    if available():
+        match = _fts_query(text, column='name' if names_only else None)
+        if match is None:
+            return []
+        fts = db.literal_column(index.fts.name)
+        rank = db.literal_column(f"{index.fts.name}.rank")
+        snippet = db.null() if names_only else db.func.snippet(fts, 1, _OPEN, _CLOSE, '…', 12)
+        query = (
+            db.select(model.id, model.name, context_id, context_name, snippet)
+            .select_from(index.fts)
+            .join(model, model.id == index.fts.c.rowid)
+            # ordering by FTS5's own rank column (bm25 with our weights) lets it sort inside the
+            # index instead of calling bm25() as a plain function on every match
+            .where(fts.op('MATCH')(match), rank.op('MATCH')(f"bm25({', '.join(map(str, WEIGHTS))})"))
+            .order_by(rank, model.id)
+        )
+    else:
+        terms = _TERM.findall(text)
+        if not terms:
+            return []
+        columns = (model.name,) if names_only else (model.name, model.description)
+        query = (
+            db.select(model.id, model.name, context_id, context_name, db.null())
+            .where(*(db.or_(*(_like(column, term) for column in columns)) for term in terms))
+            # no relevance score without an index: name matches first, newest first within them
+            .order_by(db.case((db.and_(*(_like(model.name, term) for term in terms)), 0), else_=1), model.id.desc())
+        )
+    query = _filtered(join_context(query), kind, **filters).limit(limit)
+    return [
+        Hit(kind, id_, name, ctx_id, ctx_name, _highlight(snippet))
+        for id_, name, ctx_id, ctx_name, snippet in db.session.execute(query)
+    ]
+
+def search(text, kinds=('project', 'task'), department_id=None, assignee_id=None, start=None, end=None, limit=50):
+    """``{kind: [Hit]}`` for the tasks and projects matching every word of ``text``, best first.
+
+    ``department_id`` narrows both to that department's subtree. ``assignee_id`` and the
+    ``start``/``end`` dates (tasks overlapping the range) only apply to tasks, so projects are
+    left out when either is given.
+    """
+    filters = {'department_id': department_id, 'assignee_id': assignee_id, 'start': start, 'end': end}
+    if assignee_id is not None or start is not None or end is not None:
+        kinds = [kind for kind in kinds if kind == 'task']
+    return {kind: _search_kind(kind, text, limit, False, filters) for kind in kinds}
+
+def typeahead(text, limit=10):
+    """Projects, then tasks, whose names contain words starting with those typed so far."""
+    filters = {'department_id': None, 'assignee_id': None, 'start': None, 'end': None}
+    hits = _search_kind('project', text, limit, True, filters)
+    return hits + _search_kind('task', text, limit - len(hits), True, filters) if len(hits) < limit else hits
+
+# --- keeping the index in sync ---
+
+def create_index(connection):
+    for index in INDEXES.values():
+        connection.execute(db.text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {index.fts.name} USING fts5(name, description, "
+            "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        ))
+    _available.clear()
+
+def reindex(connection, kind):
+    """Rebuild one kind's index from its table; returns the row count."""
+    index = INDEXES[kind]
+    model = index.model
+    connection.execute(index.fts.delete())
+    connection.execute(index.fts.insert().from_select(
+        ['rowid', 'name', 'description'], db.select(model.id, model.name, model.description)
+    ))
+    return connection.scalar(db.select(db.func.count()).select_from(index.fts))
+
+def _max_indexed(connection, index):
+    return connection.scalar(db.select(index.fts.c.rowid).order_by(index.fts.c.rowid.desc()).limit(1)) or 0
+
+def _catch_up(connection, index, floor):
+    # rows bulk-inserted since ``floor`` was the highest indexed id and not indexed by a flush since
+    model = index.model
+    connection.execute(index.fts.insert().from_select(
+        ['rowid', 'name', 'description'],
+        db.select(model.id, model.name, model.description).where(
+            model.id > floor,
+            model.id.not_in(db.select(index.fts.c.rowid).where(index.fts.c.rowid > floor)),
+        )
+    ))
+
+@db.event.listens_for(db.session, 'after_flush')
+def _index_flushed(session, flush_context):
+    if not available():
+        return
+    connection = session.connection()
+    for index in INDEXES.values():
+        stale, rows = set(), []
+        for obj in session.new:
+            if isinstance(obj, index.model):
+                rows.append({'rowid': obj.id, 'name': obj.name, 'description': obj.description})
+        for obj in session.dirty:
+            if isinstance(obj, index.model) and (
+                db.inspect(obj).attrs.name.history.has_changes()
+                or db.inspect(obj).attrs.description.history.has_changes()
+            ):
+                stale.add(obj.id)
+                rows.append({'rowid': obj.id, 'name': obj.name, 'description': obj.description})
+        stale.update(obj.id for obj in session.deleted if isinstance(obj, index.model))
+        if stale:
+            connection.execute(index.fts.delete().where(index.fts.c.rowid.in_(stale)))
+        if rows:
+            connection.execute(index.fts.insert(), rows)
+
+@db.event.listens_for(db.session, 'do_orm_execute')
+def _bulk_write(orm_execute_state):
+    # bulk statements don't say which rows they wrote: inserts are caught up by id at commit,
+    # anything else rebuilds that kind's index
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or not available():
+        return
+    for kind, index in INDEXES.items():
+        if mapper.class_ is not index.model:
+            continue
+        pending = orm_execute_state.session.info.setdefault('search_resync', {})
+        if not orm_execute_state.is_insert:
+            pending[kind] = None
+        elif kind not in pending:
+            pending[kind] = _max_indexed(orm_execute_state.session.connection(), index)
+
+@db.event.listens_for(db.session, 'before_commit')
+def _resync(session):
+    pending = session.info.pop('search_resync', None)
+    if not pending:
+        return
+    connection = session.connection()
+    for kind, floor in pending.items():
+        if floor is None:
+            reindex(connection, kind)
+        else:
+            _catch_up(connection, INDEXES[kind], floor)
+
+@db.event.listens_for(db.session, 'after_rollback')
+def _forget_resync(session):
+    session.info.pop('search_resync', None)
\ No newline at end of file
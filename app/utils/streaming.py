@@ -0,0 +1,30 @@
+from flask import Response, current_app, get_flashed_messages, render_template, stream_template, stream_with_context
+
+def _buffered(chunks, size):
+    # Jinja yields every text node and expression separately; send the <head> as soon as it is
+    # complete so the browser can fetch the stylesheet, then pieces of at least ``size`` characters
+    buffer, length, head_sent = [], 0, False
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size or (not head_sent and '</head>' in chunk):
+            head_sent = True
+            yield ''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+def render_listing(template_name, **context):
+    """``render_template`` for big listing pages, streamed while it renders when STREAM_TEMPLATES is on.
+
+    Pass generators (e.g. results fetched with ``yield_per``) in ``context`` to have rows read
+    from the database as they are written out. Once streaming has started the status code is
+    fixed, so anything that may abort (404/403 checks) must happen before this is called.
+    """
+    if not current_app.config['STREAM_TEMPLATES']:
+        return render_template(template_name, **context)
+    # the session cookie is written before the body, so flashed messages have to be popped now
+    # (the template's own get_flashed_messages() call then reads the same per-request copy)
+    get_flashed_messages()
+    chunks = _buffered(stream_template(template_name, **context), current_app.config['STREAM_TEMPLATES_BUFFER'])
+    return Response(stream_with_context(chunks), mimetype='text/html')
\ No newline at end of file
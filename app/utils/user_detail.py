@@ -0,0 +1,58 @@
+from collections import namedtuple
+from sqlalchemy.orm import joinedload, with_expression
+from app.extensions import db
+from app.models import KPISuggestion, MonthlyKPISummary, Task, TaskReview, task_assignments
+
+UserDetail = namedtuple('UserDetail', 'tasks total completed completed_on_page summary suggestion')
+
+def _best_score():
+    return (
+        db.select(db.func.max(TaskReview.score))
+        .where(TaskReview.task_id == Task.id)
+        .correlate(Task)
+        .scalar_subquery()
+    )
+
+def load_user_detail(user_id, start=None, end=None, completed_only=False, page=1, per_page=10, kpi_period=None):
+    """Everything the user detail page shows, in four queries whatever ``per_page`` is.
+
+    One conditional aggregate counts the user's tasks in the date range and how many are
+    submitted, one fetches the page with project, manager and best review score attached, and
+    two read the precomputed ``(year, month)`` KPI summary and suggestion for ``kpi_period``.
+    """
+    conditions = [task_assignments.c.user_id == user_id]
+    if start:
+        conditions.append(Task.start_date >= start)
+    if end:
+        conditions.append(Task.start_date <= end)
+    if completed_only:
+        conditions.append(Task.submitted == True)
+
+    total, completed = db.session.execute(
+        db.select(db.func.count(), db.func.coalesce(db.func.sum(db.case((Task.submitted == True, 1), else_=0)), 0))
+        .select_from(Task)
+        .join(task_assignments, task_assignments.c.task_id == Task.id)
+        .where(*conditions)
+    ).one()
+
+    tasks = (
+        Task.query
+        .join(task_assignments, task_assignments.c.task_id == Task.id)
+        .filter(*conditions)
+        .options(joinedload(Task.project), joinedload(Task.manager), with_expression(Task.best_score, _best_score()))
+        .order_by(Task.start_date.desc(), Task.id.desc())
+        .paginate(page=page, per_page=per_page, error_out=False, count=False)
+    )
+    # paginate(count=False) skips its own COUNT; reuse the aggregate above
+    tasks.total = total
+
+    summary = db.session.get(MonthlyKPISummary, (user_id, *kpi_period)) if kpi_period else None
+    suggestion = db.session.get(KPISuggestion, (user_id, *kpi_period)) if kpi_period else None
+    return UserDetail(
+        tasks=tasks,
+        total=total,
+        completed=completed,
+        completed_on_page=sum(1 for t in tasks.items if t.submitted),
+        summary=summary,
+        suggestion=suggestion,
+    )
\ No newline at end of file
@@ -0,0 +1,196 @@
+from collections import namedtuple
+from datetime import timedelta
+from flask import current_app
+from app.extensions import db, workload_cache
+from app.models import DataVersion, Department, DepartmentClosure, Task, User, UserAssignment, task_assignments
+from app.utils.replica import primary_reads
+
+try:
+    import numpy as np
+except ImportError:  # optional: the pure-Python sweep gives the same answers, just slower for big teams
+    np = None
+
+WeekLoad = namedtuple('WeekLoad', 'week days peak average over')
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+def _versions(user_id):
+    # cached weeks depend on the user's own counter, bumped when one of their tasks changes, and on
+    # a shared one for bulk writes that can't say whose tasks they touched
+    return ('workload', f"workload:{user_id}")
+
+def _intervals(user_ids, first_day, last_day):
+    """``(user_id, start, end, percent)`` for every assignment overlapping ``[first_day, last_day]``.
+
+    A task without an end date occupies its start day only; one without a start date, or ending
+    before it starts, has no usable schedule and is skipped.
+    """
+    last = db.func.coalesce(Task.end_date, Task.start_date)
+    return db.session.execute(
+        db.select(task_assignments.c.user_id, Task.start_date, last, task_assignments.c.workload_percent)
+        .join(Task, Task.id == task_assignments.c.task_id)
+        .where(
+            task_assignments.c.user_id.in_(list(user_ids)),
+            Task.start_date.is_not(None),
+            last >= Task.start_date,
+            Task.start_date <= last_day,
+            last >= first_day,
+        )
+    ).all()
+
+def _sweep_python(user_ids, intervals, first_day, days, default):
+    # difference array per user: +p where an interval opens, -p the day after it closes; the
+    # running sum is that day's load
+    diffs = {user_id: [0] * (days + 1) for user_id in user_ids}
+    for user_id, start, end, percent in intervals:
+        percent = default if percent is None else percent
+        diff = diffs[user_id]
+        diff[max((start - first_day).days, 0)] += percent
+        diff[min((end - first_day).days + 1, days)] -= percent
+    loads = {}
+    for user_id, diff in diffs.items():
+        running, row = 0, []
+        for delta in diff[:days]:
+            running += delta
+            row.append(running)
+        loads[user_id] = row
+    return loads
+
+def _sweep_numpy(user_ids, intervals, first_day, days, default):
+    # the same difference arrays as one (users x days) matrix, accumulated in a single cumsum
+    index = {user_id: i for i, user_id in enumerate(user_ids)}
+    diff = np.zeros((len(user_ids), days + 1), dtype=np.int64)
+    if intervals:
+        rows = np.fromiter((index[i[0]] for i in intervals), dtype=np.int64, count=len(intervals))
+        starts = np.fromiter(((i[1] - first_day).days for i in intervals), dtype=np.int64, count=len(intervals))
+        ends = np.fromiter(((i[2] - first_day).days + 1 for i in intervals), dtype=np.int64, count=len(intervals))
+        percents = np.fromiter((default if i[3] is None else i[3] for i in intervals), dtype=np.int64, count=len(intervals))
+        np.add.at(diff, (rows, np.clip(starts, 0, days)), percents)
+        np.add.at(diff, (rows, np.clip(ends, 0, days)), -percents)
+    loads = np.cumsum(diff[:, :days], axis=1)
+    return {user_id: loads[i].tolist() for user_id, i in index.items()}
+
+def daily_loads(user_ids, first_day, days):
+    """``{user_id: [load % for each of ``days`` days from first_day]}`` across overlapping tasks."""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+    last_day = first_day + timedelta(days=days - 1)
+    intervals = _intervals(user_ids, first_day, last_day)
+    default = current_app.config['WORKLOAD_DEFAULT_PERCENT']
+    sweep = _sweep_numpy if np is not None and len(user_ids) > 1 else _sweep_python
+    return sweep(user_ids, intervals, first_day, days, default)
+
+def weekly_loads(user_ids, first_week, weeks):
+    """``{user_id: [WeekLoad, ...]}`` for ``weeks`` weeks from the Monday of ``first_week``.
+
+    Each (user, week) is cached; only users with a missing week are recomputed, in one query.
+    """
+    first_week = week_start(first_week)
+    mondays = [first_week + timedelta(days=7 * i) for i in range(weeks)]
+    capacity = current_app.config['WORKLOAD_CAPACITY_PERCENT']
+    # every user's version counter in one query, rather than one per user below
+    workload_cache.preload({name for user_id in user_ids for name in _versions(user_id)})
+    days_by_user, missing = {}, []
+    for user_id in user_ids:
+        cached = workload_cache.get_many([f"{user_id}:{monday.isoformat()}" for monday in mondays], depends_on=_versions(user_id))
+        if any(days is None for days in cached):
+            missing.append(user_id)
+        else:
+            days_by_user[user_id] = cached
+
+    with primary_reads():
+        computed = daily_loads(missing, first_week, 7 * weeks)
+    for user_id, loads in computed.items():
+        days_by_user[user_id] = [tuple(loads[7 * i:7 * i + 7]) for i in range(weeks)]
+        workload_cache.set_many(
+            [(f"{user_id}:{monday.isoformat()}", days) for monday, days in zip(mondays, days_by_user[user_id])],
+            depends_on=_versions(user_id),
+        )
+
+    return {
+        user_id: [
+            WeekLoad(monday, days, max(days), sum(days) / 7, max(days) > capacity)
+            for monday, days in zip(mondays, days_by_user[user_id])
+        ]
+        for user_id in user_ids
+    }
+
+def department_heatmap(department_id, first_week, weeks):
+    """Weekly loads for everyone in ``department_id``'s subtree, plus one summary row per sub-department.
+
+    Returns ``(users, departments)``: ``users`` is ``[(user_id, name, [WeekLoad])]`` by name and
+    ``departments`` is ``[(department_id, name, [(average %, over-allocated count)] per week)]``
+    for the department itself and each direct child.
+    """
+    subtree = Department.subtree_ids(department_id)
+    members = db.session.execute(
+        db.select(User.id, User.name)
+        .where(User.id.in_(db.select(UserAssignment.user_id).where(UserAssignment.department_id.in_(subtree))))
+        .order_by(User.name)
+    ).all()
+    loads = weekly_loads([user_id for user_id, _ in members], first_week, weeks)
+    users = [(user_id, name, loads[user_id]) for user_id, name in members]
+
+    # which top-level branch (the department itself or one of its children) each member is under
+    branches = db.session.execute(
+        db.select(DepartmentClosure.ancestor_id, Department.name, UserAssignment.user_id)
+        .join(Department, Department.id == DepartmentClosure.ancestor_id)
+        .join(UserAssignment, UserAssignment.department_id == DepartmentClosure.descendant_id)
+        .where(db.or_(Department.id == department_id, Department.parent_id == department_id))
+        .distinct()
+    ).all()
+    groups = {}
+    for branch_id, name, user_id in branches:
+        groups.setdefault((branch_id != department_id, name, branch_id), set()).add(user_id)
+    departments = []
+    for (_, name, branch_id), user_ids in sorted(groups.items()):
+        summary = []
+        for i in range(weeks):
+            week = [loads[user_id][i] for user_id in user_ids]
+            summary.append((sum(w.average for w in week) / len(week), sum(w.over for w in week)))
+        departments.append((branch_id, name, summary))
+    return users, departments
+
+# --- incremental invalidation ---
+
+def mark_stale(session, user_ids):
+    """Bump the workload versions of ``user_ids`` in ``session``'s transaction, so every worker recomputes them once it commits."""
+    if user_ids:
+        DataVersion.bump_in(session, {f"workload:{user_id}" for user_id in user_ids})
+
+def mark_task_stale(session, task):
+    """Mark every past or present assignee of ``task`` whose schedule this transaction may change."""
+    history = db.inspect(task).attrs.assignees.history
+    assignees = task.assignees if history.empty() else (*history.added, *history.unchanged, *history.deleted)
+    mark_stale(session, {user.id for user in assignees if user.id is not None})
+
+def set_task_workload(task, percent):
+    """Give every assignee of ``task`` the same share of their day; flushes first so the links exist."""
+    db.session.flush()
+    db.session.execute(
+        task_assignments.update()
+        .where(task_assignments.c.task_id == task.id)
+        .values(workload_percent=percent)
+        .execution_options(workload_marked=True)
+    )
+    mark_task_stale(db.session, task)
+
+@db.event.listens_for(db.session, 'before_flush')
+def _collect_stale_users(session, flush_context, instances):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Task) and (obj not in session.dirty or session.is_modified(obj)):
+            mark_task_stale(session, obj)
+
+@db.event.listens_for(db.session, 'do_orm_execute')
+def _bulk_write(orm_execute_state):
+    # bulk statements don't say which users they touched
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    if orm_execute_state.statement.get_execution_options().get('workload_marked'):
+        return
+    mapper = orm_execute_state.bind_mapper
+    table = getattr(orm_execute_state.statement, 'table', None)
+    if (mapper is not None and mapper.class_ is Task) or table is task_assignments:
+        DataVersion.bump_at_commit(orm_execute_state.session, {'workload'})
\ No newline at end of file
@@ -6,9 +6,84 @@ load_dotenv(os.path.join(basedir, '.env'))
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'you-will-never-guess'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///' + os.path.join(basedir, 'kpi_manager.db')
+    # run on every new SQLite connection (app/utils/database.py): WAL lets pages read while another
+    # worker writes, and busy_timeout makes writers queue for the lock instead of failing with
+    # "database is locked". Set to {} for SQLite's stock behaviour.
+    SQLITE_PRAGMAS = {
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT') or 10000),  # ms
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE') or 'wal',
+        'synchronous': 'normal',  # with WAL: durable across crashes of the app, not of the OS
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -32 * 1024,  # negative means KiB, per connection
+        'temp_store': 'memory',
+    }
+    # a read replica for @replica_reads views (locally: a SQLite copy refreshed by `flask replica sync`)
+    REPLICA_DATABASE_URL = os.environ.get('REPLICA_DATABASE_URL')
+    SQLALCHEMY_BINDS = {'replica': REPLICA_DATABASE_URL} if REPLICA_DATABASE_URL else {}
+    # after a user commits a change, their reads stay on the primary this long so they see it
+    REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS') or 10)
+    # connections per worker process; recycle and timeout only apply to database servers
+    DATABASE_POOL_SIZE = int(os.environ.get('DATABASE_POOL_SIZE') or 10)
+    DATABASE_MAX_OVERFLOW = int(os.environ.get('DATABASE_MAX_OVERFLOW') or 20)
+    DATABASE_POOL_RECYCLE = int(os.environ.get('DATABASE_POOL_RECYCLE') or 1800)
+    DATABASE_POOL_TIMEOUT = int(os.environ.get('DATABASE_POOL_TIMEOUT') or 30)
     MAIL_SERVER = os.environ.get('MAIL_SERVER')
     MAIL_PORT = int(os.environ.get('MAIL_PORT') or 25)
     MAIL_USE_TLS = os.environ.get("MAIL_USE_TLS") is not None
     MAIL_USE_SSL = os.environ.get("MAIL_USE_SSL") is not None
     MAIL_USERNAME = os.environ.get("MAIL_USERNAME")
-    MAIL_PASSWORD = os.environ.get("MAIL_PASSWORD")
\ No newline at end of file
+    MAIL_PASSWORD = os.environ.get("MAIL_PASSWORD")
+    MAIL_QUEUE_SIZE = int(os.environ.get("MAIL_QUEUE_SIZE") or 1000)
+    MAIL_WORKERS = int(os.environ.get("MAIL_WORKERS") or 2)
+    MAIL_BATCH_SIZE = int(os.environ.get("MAIL_BATCH_SIZE") or 50)
+    MAIL_MAX_RETRIES = int(os.environ.get("MAIL_MAX_RETRIES") or 3)
+    MAIL_RETRY_BACKOFF = float(os.environ.get("MAIL_RETRY_BACKOFF") or 1.0)
+    MAIL_ENQUEUE_TIMEOUT = float(os.environ.get("MAIL_ENQUEUE_TIMEOUT") or 5.0)
+    # notifications written to the outbox table are sent by `flask outbox run`
+    OUTBOX_BASE_URL = os.environ.get("OUTBOX_BASE_URL") or 'http://localhost:5000'
+    OUTBOX_BATCH_SIZE = int(os.environ.get("OUTBOX_BATCH_SIZE") or 100)
+    OUTBOX_POLL_INTERVAL = float(os.environ.get("OUTBOX_POLL_INTERVAL") or 2.0)
+    OUTBOX_MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS") or 5)
+    OUTBOX_RETRY_BACKOFF = float(os.environ.get("OUTBOX_RETRY_BACKOFF") or 30.0)
+    OUTBOX_LEASE_SECONDS = int(os.environ.get("OUTBOX_LEASE_SECONDS") or 300)
+    # task submissions, reviews and access requests are held this long and merged per recipient; 0 sends each at once
+    OUTBOX_DIGEST_WINDOW = int(os.environ.get("OUTBOX_DIGEST_WINDOW") or 300)
+    # 'memory' keeps an LRU per worker; 'filesystem' shares entries between workers on one host
+    CACHE_TYPE = os.environ.get('CACHE_TYPE') or 'memory'
+    CACHE_DIR = os.environ.get('CACHE_DIR')
+    CACHE_MAXSIZE = int(os.environ.get('CACHE_MAXSIZE') or 1024)
+    # seconds; a backstop, since entries are keyed by data versions and never served stale
+    CACHE_DEFAULT_TIMEOUT = int(os.environ.get('CACHE_DEFAULT_TIMEOUT') or 3600)
+    # rendered page fragments ({% call cached(...) %}) kept per worker with the memory backend
+    FRAGMENT_CACHE_MAXSIZE = int(os.environ.get('FRAGMENT_CACHE_MAXSIZE') or 256)
+    # past this many users, user selects load options from /users/choices instead of embedding them all
+    CHOICES_INLINE_LIMIT = int(os.environ.get('CHOICES_INLINE_LIMIT') or 200)
+
+    # task_assignments.workload_percent: assumed when unset, and the daily load counted as over-allocated
+    WORKLOAD_DEFAULT_PERCENT = int(os.environ.get('WORKLOAD_DEFAULT_PERCENT') or 100)
+    WORKLOAD_CAPACITY_PERCENT = int(os.environ.get('WORKLOAD_CAPACITY_PERCENT') or 100)
+
+    # relative weights of the `flask kpi suggest` factors in app/utils/kpi_engine.py; 0 turns one off
+    KPI_SUGGESTION_WEIGHTS = {'reviews': 0.6, 'completion': 0.2, 'punctuality': 0.2, 'workload': 0.0}
+
+    # send department tree, task list and role management pages while they render instead of all at once
+    STREAM_TEMPLATES = os.environ.get('STREAM_TEMPLATES', '1') not in ('0', 'false', 'False')
+    STREAM_TEMPLATES_BUFFER = int(os.environ.get('STREAM_TEMPLATES_BUFFER') or 8192)
+
+    # rows validated and committed per transaction by bulk imports
+    IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE') or 1000)
+
+    # /api/v1: rows per page (and per ?ids= batch), and items per POST/PATCH transaction
+    API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE') or 1000)
+    API_MAX_BATCH = int(os.environ.get('API_MAX_BATCH') or 1000)
+
+    # per-endpoint query counts, SQL and render time at /admin/queries and /admin/metrics (app/utils/profiling.py)
+    PROFILING = os.environ.get('PROFILING', '1') not in ('0', 'false', 'False')
+    # statements slower than this are logged with their EXPLAIN plan
+    PROFILE_SLOW_QUERY_MS = int(os.environ.get('PROFILE_SLOW_QUERY_MS') or 250)
+    PROFILE_EXPLAIN = os.environ.get('PROFILE_EXPLAIN', '1') not in ('0', 'false', 'False')
+    PROFILE_SLOW_QUERY_LOG_SIZE = int(os.environ.get('PROFILE_SLOW_QUERY_LOG_SIZE') or 50)
+    # a request running the same SELECT this many times is counted as an N+1 pattern
+    PROFILE_N_PLUS_ONE = int(os.environ.get('PROFILE_N_PLUS_ONE') or 10)
+    # lets a Prometheus scraper read /admin/metrics with "Authorization: Bearer <token>"; admins can always read it
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
\ No newline at end of file
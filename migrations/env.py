@@ -90,9 +90,14 @@ def run_migrations_online():
                 directives[:] = []
                 logger.info('No changes in schema detected.')
 
+    # the full-text search tables and their FTS5 shadow tables aren't models; leave them alone
+    def include_name(name, type_, parent_names):
+        return type_ != 'table' or not name.startswith(('task_search', 'project_search'))
+
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    conf_args.setdefault("include_name", include_name)
 
     connectable = get_engine()
 
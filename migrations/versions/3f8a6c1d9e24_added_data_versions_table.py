@@ -0,0 +1,35 @@
+"""added data_versions table
+
+Revision ID: 3f8a6c1d9e24
+Revises: 9d4b2e7a1c63
+Create Date: 2026-10-17 19:12:45.902113
+
+"""
+from datetime import datetime, timezone
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f8a6c1d9e24'
+down_revision = '9d4b2e7a1c63'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    data_versions = op.create_table('data_versions',
+    sa.Column('table_name', sa.String(length=64), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('changed_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('table_name')
+    )
+    # start every tracked table at version 1 as of now; the app bumps them from here
+    tables = ['departments', 'projects', 'roles', 'users', 'user_assignments', 'tasks', 'task_assignments',
+              'task_reviews', 'monthly_kpis']
+    now = datetime.now(timezone.utc)
+    op.bulk_insert(data_versions, [{'table_name': table, 'version': 1, 'changed_at': now} for table in tables])
+
+
+def downgrade():
+    op.drop_table('data_versions')
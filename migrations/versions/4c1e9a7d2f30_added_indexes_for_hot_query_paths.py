@@ -0,0 +1,70 @@
+"""added indexes for hot query paths
+
+Revision ID: 4c1e9a7d2f30
+Revises: b7db3879ae6b
+Create Date: 2026-10-17 10:12:41.203518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c1e9a7d2f30'
+down_revision = 'b7db3879ae6b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('departments', schema=None) as batch_op:
+        batch_op.create_index('ix_departments_parent_id', ['parent_id'], unique=False)
+
+    with op.batch_alter_table('user_assignments', schema=None) as batch_op:
+        batch_op.create_index('ix_user_assignments_user_dept_role', ['user_id', 'department_id', 'role_id'], unique=False)
+        batch_op.create_index('ix_user_assignments_dept_user', ['department_id', 'user_id'], unique=False)
+
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.create_index('ix_projects_department_id', ['department_id'], unique=False)
+
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.create_index('ix_tasks_start_date_id', ['start_date', 'id'], unique=False)
+        batch_op.create_index('ix_tasks_project_start_date', ['project_id', 'start_date', 'id'], unique=False)
+        batch_op.create_index('ix_tasks_manager_start_date', ['manager_id', 'start_date', 'id'], unique=False)
+        batch_op.create_index('ix_tasks_submitted_start_date', ['submitted', 'start_date', 'id'], unique=False)
+
+    with op.batch_alter_table('task_assignments', schema=None) as batch_op:
+        batch_op.create_index('ix_task_assignments_user_task', ['user_id', 'task_id'], unique=False)
+
+    with op.batch_alter_table('task_reviews', schema=None) as batch_op:
+        batch_op.create_index('ix_task_reviews_task_id', ['task_id'], unique=False)
+
+    with op.batch_alter_table('access_requests', schema=None) as batch_op:
+        batch_op.create_index('ix_access_requests_timestamp', ['timestamp'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('access_requests', schema=None) as batch_op:
+        batch_op.drop_index('ix_access_requests_timestamp')
+
+    with op.batch_alter_table('task_reviews', schema=None) as batch_op:
+        batch_op.drop_index('ix_task_reviews_task_id')
+
+    with op.batch_alter_table('task_assignments', schema=None) as batch_op:
+        batch_op.drop_index('ix_task_assignments_user_task')
+
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.drop_index('ix_tasks_submitted_start_date')
+        batch_op.drop_index('ix_tasks_manager_start_date')
+        batch_op.drop_index('ix_tasks_project_start_date')
+        batch_op.drop_index('ix_tasks_start_date_id')
+
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.drop_index('ix_projects_department_id')
+
+    with op.batch_alter_table('user_assignments', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_assignments_dept_user')
+        batch_op.drop_index('ix_user_assignments_user_dept_role')
+
+    with op.batch_alter_table('departments', schema=None) as batch_op:
+        batch_op.drop_index('ix_departments_parent_id')
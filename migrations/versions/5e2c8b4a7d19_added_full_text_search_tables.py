@@ -0,0 +1,35 @@
+"""added full-text search tables
+
+Revision ID: 5e2c8b4a7d19
+Revises: 3f8a6c1d9e24
+Create Date: 2026-10-17 21:03:18.226415
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e2c8b4a7d19'
+down_revision = '3f8a6c1d9e24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FTS5 is SQLite-only; elsewhere app/utils/search.py falls back to LIKE scans
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for table, source in (('task_search', 'tasks'), ('project_search', 'projects')):
+        op.execute(
+            f"CREATE VIRTUAL TABLE {table} USING fts5(name, description, "
+            "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        op.execute(f"INSERT INTO {table} (rowid, name, description) SELECT id, name, description FROM {source}")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute("DROP TABLE IF EXISTS project_search")
+    op.execute("DROP TABLE IF EXISTS task_search")
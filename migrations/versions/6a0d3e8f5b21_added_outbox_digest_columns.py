@@ -0,0 +1,32 @@
+"""added outbox digest columns
+
+Revision ID: 6a0d3e8f5b21
+Revises: 2b7f4c9e1d85
+Create Date: 2026-10-17 14:37:45.093614
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6a0d3e8f5b21'
+down_revision = '2b7f4c9e1d85'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('outbox', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('recipient', sa.String(length=120), nullable=True))
+        batch_op.add_column(sa.Column('dedup_key', sa.String(length=128), nullable=True))
+        batch_op.create_index('ix_outbox_recipient_status', ['recipient', 'status'], unique=False)
+        batch_op.create_index('ix_outbox_dedup_key', ['dedup_key'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('outbox', schema=None) as batch_op:
+        batch_op.drop_index('ix_outbox_dedup_key')
+        batch_op.drop_index('ix_outbox_recipient_status')
+        batch_op.drop_column('dedup_key')
+        batch_op.drop_column('recipient')
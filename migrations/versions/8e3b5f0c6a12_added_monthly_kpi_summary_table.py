@@ -0,0 +1,47 @@
+"""added monthly_kpi_summary table
+
+Revision ID: 8e3b5f0c6a12
+Revises: 4c1e9a7d2f30
+Create Date: 2026-10-17 11:02:17.640925
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e3b5f0c6a12'
+down_revision = '4c1e9a7d2f30'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('monthly_kpi_summary',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Integer(), nullable=False),
+    sa.Column('max_score', sa.Integer(), nullable=False),
+    sa.Column('min_score', sa.Integer(), nullable=False),
+    sa.Column('avg_score', sa.Float(), nullable=False),
+    sa.Column('kpi_count', sa.Integer(), nullable=False),
+    sa.Column('latest_reviewer_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['latest_reviewer_id'], ['users.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'year', 'month')
+    )
+    # backfill from the existing submissions; afterwards the app keeps it current
+    op.execute("""
+        INSERT INTO monthly_kpi_summary
+            (user_id, year, month, max_score, min_score, avg_score, kpi_count, latest_reviewer_id)
+        SELECT k.user_id, k.year, k.month, MAX(k.score), MIN(k.score), AVG(k.score), COUNT(k.id),
+               (SELECT l.reviewer_id FROM monthly_kpis l
+                WHERE l.user_id = k.user_id AND l.year = k.year AND l.month = k.month
+                ORDER BY l.timestamp DESC, l.id DESC LIMIT 1)
+        FROM monthly_kpis k
+        GROUP BY k.user_id, k.year, k.month
+    """)
+
+
+def downgrade():
+    op.drop_table('monthly_kpi_summary')
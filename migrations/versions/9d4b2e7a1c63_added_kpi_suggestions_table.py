@@ -0,0 +1,40 @@
+"""added kpi_suggestions table and tasks.submitted_at
+
+Revision ID: 9d4b2e7a1c63
+Revises: 6a0d3e8f5b21
+Create Date: 2026-10-17 16:40:12.318274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4b2e7a1c63'
+down_revision = '6a0d3e8f5b21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('submitted_at', sa.DateTime(), nullable=True))
+
+    op.create_table('kpi_suggestions',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Integer(), nullable=False),
+    sa.Column('factors', sa.JSON(), nullable=False),
+    sa.Column('task_count', sa.Integer(), nullable=False),
+    sa.Column('computed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'year', 'month')
+    )
+
+
+def downgrade():
+    op.drop_table('kpi_suggestions')
+
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.drop_column('submitted_at')
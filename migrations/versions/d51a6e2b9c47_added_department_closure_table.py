@@ -0,0 +1,48 @@
+"""added department_closure table
+
+Revision ID: d51a6e2b9c47
+Revises: 8e3b5f0c6a12
+Create Date: 2026-10-17 12:26:53.118406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd51a6e2b9c47'
+down_revision = '8e3b5f0c6a12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    closure = op.create_table('department_closure',
+    sa.Column('ancestor_id', sa.Integer(), nullable=False),
+    sa.Column('descendant_id', sa.Integer(), nullable=False),
+    sa.Column('depth', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['ancestor_id'], ['departments.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['descendant_id'], ['departments.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('ancestor_id', 'descendant_id')
+    )
+    with op.batch_alter_table('department_closure', schema=None) as batch_op:
+        batch_op.create_index('ix_department_closure_descendant', ['descendant_id', 'depth'], unique=False)
+
+    # backfill from the adjacency list by walking each department up to its root
+    parents = dict(op.get_bind().execute(sa.text('SELECT id, parent_id FROM departments')).all())
+    rows = []
+    for dept_id in parents:
+        node, depth, seen = dept_id, 0, set()
+        while node is not None and node in parents and node not in seen:
+            seen.add(node)
+            rows.append({'ancestor_id': node, 'descendant_id': dept_id, 'depth': depth})
+            node, depth = parents[node], depth + 1
+    if rows:
+        op.bulk_insert(closure, rows)
+
+
+def downgrade():
+    with op.batch_alter_table('department_closure', schema=None) as batch_op:
+        batch_op.drop_index('ix_department_closure_descendant')
+
+    op.drop_table('department_closure')
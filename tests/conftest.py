@@ -0,0 +1,115 @@
+from datetime import date, timedelta
+from types import SimpleNamespace
+import pytest
+from sqlalchemy import event
+from config import Config
+from app import create_app
+from app.extensions import db
+from app.models import Department, MonthlyKPI, Project, Role, Task, TaskReview, User, UserAssignment
+
+PASSWORD = 'secret1'
+
+def make_app(tmp_path, **settings):
+    """An app on a fresh SQLite file in ``tmp_path``; ``settings`` override the test config."""
+    config = type('TestConfig', (Config,), {
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'test.db'),
+        'SQLALCHEMY_BINDS': {},
+        'TESTING': True,
+        'WTF_CSRF_ENABLED': False,
+        'MAIL_SUPPRESS_SEND': True,
+        'CACHE_TYPE': 'memory',
+        'STREAM_TEMPLATES': True,
+        **settings,
+    })
+    return create_app(config)
+
+@pytest.fixture
+def app(tmp_path):
+    app = make_app(tmp_path)
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+@pytest.fixture
+def data(app):
+    """A root department with one child, an admin, a manager of the child and ``members`` in it, and a project of tasks."""
+    with app.app_context():
+        root = Department(name='Root')
+        db.session.add(root)
+        db.session.flush()
+        child = Department(name='Child', parent_id=root.id)
+        admin_role, manager_role, member_role = Role(name='Admin', level=100), Role(name='Manager', level=60), Role(name='Fresher', level=30)
+        db.session.add_all([child, admin_role, manager_role, member_role])
+        db.session.flush()
+        admin = User(name='Admin', email='admin@example.com')
+        manager = User(name='Manager', email='manager@example.com')
+        for user in (admin, manager):
+            user.set_password(PASSWORD)
+        # nobody logs in as a member: skip the slow password hash
+        members = [User(name=f'Member {i}', email=f'member{i}@example.com', password_hash='!') for i in range(10)]
+        db.session.add_all([admin, manager, *members])
+        db.session.flush()
+        db.session.add_all([
+            UserAssignment(user_id=admin.id, role_id=admin_role.id, department_id=root.id),
+            UserAssignment(user_id=manager.id, role_id=manager_role.id, department_id=child.id),
+            *(UserAssignment(user_id=m.id, role_id=member_role.id, department_id=child.id) for m in members),
+        ])
+        project = Project(name='Project', department_id=child.id, creator_id=admin.id)
+        db.session.add(project)
+        db.session.flush()
+        today = date.today()
+        tasks = []
+        for i in range(40):
+            task = Task(name=f'Task {i}', project_id=project.id, start_date=today - timedelta(days=i % 20),
+                        end_date=today + timedelta(days=3), manager_id=manager.id, created_by=admin.id,
+                        submitted=i % 3 == 0)
+            task.assignees = [members[i % 5]]
+            tasks.append(task)
+        db.session.add_all(tasks)
+        db.session.flush()
+        db.session.add(TaskReview(task_id=tasks[0].id, reviewer_id=manager.id, score=80))
+        db.session.add(MonthlyKPI(user_id=members[0].id, reviewer_id=manager.id, year=today.year, month=today.month, score=70))
+        db.session.commit()
+        return SimpleNamespace(
+            root_id=root.id, child_id=child.id, admin_id=admin.id, manager_id=manager.id,
+            member_ids=[m.id for m in members], project_id=project.id, task_ids=[t.id for t in tasks],
+            role_ids={'admin': admin_role.id, 'manager': manager_role.id, 'member': member_role.id},
+        )
+
+def login(client, email):
+    response = client.post('/auth/login', data={'email': email, 'password': PASSWORD})
+    assert response.status_code == 302, response.data[:500]
+    return client
+
+@pytest.fixture
+def admin_client(app, data):
+    return login(app.test_client(), 'admin@example.com')
+
+@pytest.fixture
+def manager_client(app, data):
+    return login(app.test_client(), 'manager@example.com')
+
+@pytest.fixture
+def member_client(app, data):
+    """Logged in as ``Member 0``, who holds no management role."""
+    with app.app_context():
+        db.session.get(User, data.member_ids[0]).set_password(PASSWORD)
+        db.session.commit()
+    return login(app.test_client(), 'member0@example.com')
+
+@pytest.fixture
+def queries(app):
+    """Statements sent to the database, in order; ``clear()`` it before the part you want to count."""
+    statements = []
+    with app.app_context():
+        engine = db.engine
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    yield statements
+    event.remove(engine, 'before_cursor_execute', record)
\ No newline at end of file
@@ -0,0 +1,43 @@
+import pytest
+from app.extensions import db
+from app.models import Project, Task
+
+@pytest.fixture
+def outside(app, data):
+    """A project and task in Root, outside the manager's Child subtree."""
+    with app.app_context():
+        project = Project(name='Head office', department_id=data.root_id, creator_id=data.admin_id)
+        db.session.add(project)
+        db.session.flush()
+        task = Task(name='Budget', project_id=project.id, created_by=data.admin_id)
+        db.session.add(task)
+        db.session.commit()
+        return project.id, task.id
+
+def fields(response):
+    assert response.status_code == 422, response.get_json()
+    return [error['field'] for error in response.get_json()['errors']]
+
+def test_manager_writes_projects_only_in_their_subtree(data, outside, manager_client):
+    project_id, _ = outside
+    assert fields(manager_client.post('/api/v1/projects', json={'data': [{'name': 'X', 'department_id': data.root_id}]})) == ['department_id']
+    assert fields(manager_client.patch('/api/v1/projects', json={'data': [{'id': project_id, 'name': 'Mine now'}]})) == ['id']
+    assert fields(manager_client.patch('/api/v1/projects', json={'data': [{'id': data.project_id, 'department_id': data.root_id}]})) == ['department_id']
+
+    response = manager_client.post('/api/v1/projects', json={'data': [{'name': 'X', 'department_id': data.child_id}]})
+    assert response.status_code == 201
+    assert manager_client.patch('/api/v1/projects', json={'data': [{'id': data.project_id, 'name': 'Renamed'}]}).status_code == 200
+
+def test_manager_writes_tasks_only_in_their_subtree(data, outside, manager_client):
+    project_id, task_id = outside
+    assert fields(manager_client.post('/api/v1/tasks', json={'data': [{'name': 'X', 'project_id': project_id}]})) == ['project_id']
+    assert fields(manager_client.patch('/api/v1/tasks', json={'data': [{'id': task_id, 'submitted': True}]})) == ['id']
+    assert fields(manager_client.patch('/api/v1/tasks', json={'data': [{'id': data.task_ids[0], 'project_id': project_id}]})) == ['project_id']
+
+    assert manager_client.post('/api/v1/tasks', json={'data': [{'name': 'X', 'project_id': data.project_id}]}).status_code == 201
+    assert manager_client.patch('/api/v1/tasks', json={'data': [{'id': data.task_ids[0], 'submitted': True}]}).status_code == 200
+
+def test_admin_writes_anywhere(data, outside, admin_client):
+    project_id, task_id = outside
+    assert admin_client.post('/api/v1/tasks', json={'data': [{'name': 'X', 'project_id': project_id}]}).status_code == 201
+    assert admin_client.patch('/api/v1/projects', json={'data': [{'id': project_id, 'department_id': data.child_id}]}).status_code == 200
\ No newline at end of file
@@ -0,0 +1,59 @@
+import re
+import pytest
+from app.extensions import db
+from app.models import Department, UserAssignment
+from app.utils.access_control import AuthContext, DepartmentRole
+
+# every page reads the user's roles several times (navbar, decorators, templates)
+PAGES = ['/dashboard', '/departments/', '/projects/', '/tasks/', '/users/', '/users/manage-roles', '/reports/']
+
+# load_user's joined query, or a lazy load of one user's assignments or of one assignment's role
+_ROLE_LOOKUP = re.compile(r'FROM users LEFT OUTER JOIN user_assignments|user_assignments\.user_id = \?|roles\.id = \?')
+
+def role_queries(statements):
+    return [s for s in statements if _ROLE_LOOKUP.search(s)]
+
+def test_keeps_highest_role_per_department():
+    auth = AuthContext([
+        DepartmentRole(1, 'Root', 'Fresher', 30),
+        DepartmentRole(1, 'Root', 'Manager', 60),
+        DepartmentRole(2, 'Child', 'Fresher', 30),
+    ])
+    assert auth.max_level == 60
+    assert auth.department_roles[1].role_name == 'Manager'
+    assert auth.managed_department_ids == {1}
+    assert auth.manages(1) and not auth.manages(2)
+    assert auth.manages_any([2, 1])
+
+def test_empty_context_has_no_level():
+    auth = AuthContext()
+    assert auth.max_level == 0
+    assert not auth.managed_department_ids
+
+@pytest.mark.parametrize('page', PAGES)
+def test_roles_resolved_at_most_once_per_request(manager_client, queries, page):
+    queries.clear()
+    response = manager_client.get(page)
+    assert response.status_code in (200, 302)
+    response.get_data()  # streamed pages run their queries while the body is read
+    assert len(role_queries(queries)) <= 1, role_queries(queries)
+
+@pytest.mark.parametrize('page', PAGES)
+def test_query_count_does_not_grow_with_assignments(app, data, manager_client, queries, page):
+    manager_client.get(page).get_data()
+    queries.clear()
+    manager_client.get(page).get_data()
+    before = len(queries)
+
+    with app.app_context():
+        for i in range(10):
+            department = Department(name=f'Extra {i}', parent_id=data.root_id)
+            db.session.add(department)
+            db.session.flush()
+            db.session.add(UserAssignment(user_id=data.manager_id, role_id=data.role_ids['manager'], department_id=department.id))
+        db.session.commit()
+
+    manager_client.get(page).get_data()
+    queries.clear()
+    manager_client.get(page).get_data()
+    assert len(queries) <= before, queries
\ No newline at end of file
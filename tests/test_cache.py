@@ -0,0 +1,146 @@
+import multiprocessing
+import threading
+import time
+import pytest
+from config import Config
+from app.extensions import db, fragment_cache, permission_cache, report_cache
+from app.models import DataVersion, Department, UserAssignment
+from app.utils.cache import LRUBackend, _MISSING
+
+def _demote(uri, user_id, role_id):
+    # runs in a fresh process: its own app, engine and caches, like another gunicorn worker
+    from app import create_app
+    app = create_app(type('WorkerConfig', (Config,), {'SQLALCHEMY_DATABASE_URI': uri, 'SQLALCHEMY_BINDS': {}}))
+    with app.app_context():
+        for assignment in UserAssignment.query.filter_by(user_id=user_id):
+            assignment.role_id = role_id
+        db.session.commit()
+
+def in_another_process(target, *args):
+    process = multiprocessing.get_context('spawn').Process(target=target, args=args)
+    process.start()
+    process.join(60)
+    assert process.exitcode == 0
+
+def test_lru_backend_requires_a_ttl():
+    with pytest.raises(ValueError):
+        LRUBackend(None)
+    with pytest.raises(ValueError):
+        LRUBackend(0)
+
+def test_lru_backend_expires_entries():
+    backend = LRUBackend(0.05, maxsize=2)
+    backend.set('a', 1)
+    assert backend.get('a') == 1
+    time.sleep(0.1)
+    assert backend.get('a') is _MISSING
+
+def test_lru_backend_evicts_least_recently_used():
+    backend = LRUBackend(60, maxsize=2)
+    backend.set('a', 1)
+    backend.set('b', 2)
+    backend.get('a')
+    backend.set('c', 3)
+    assert backend.get('b') is _MISSING
+    assert backend.get('a') == 1 and backend.get('c') == 3
+
+def test_role_change_in_another_worker_reaches_this_one(app, data, manager_client):
+    # manager level: reports are allowed, and the permissions are now cached here
+    assert manager_client.get('/reports/').status_code == 200
+    assert manager_client.get('/reports/').status_code == 200
+    assert permission_cache.hits
+
+    in_another_process(_demote, app.config['SQLALCHEMY_DATABASE_URI'], data.manager_id, data.role_ids['member'])
+
+    response = manager_client.get('/reports/')
+    assert response.status_code == 302
+    assert response.location.endswith('/dashboard')
+
+def test_commit_from_another_session_changes_the_key(app, data):
+    with app.app_context():
+        report_cache.set('key', 'old')
+        assert report_cache.get('key') == 'old'
+    # a separate session and connection, committing behind this app's back
+    with app.app_context():
+        with db.engine.begin() as connection:
+            DataVersion.bump(connection, {'task_reviews'})
+    with app.app_context():
+        assert report_cache.get('key') is None
+
+def test_uncommitted_writes_bypass_the_cache(app, data):
+    with app.app_context():
+        permission_cache.set(data.manager_id, 'cached')
+        assert permission_cache.get(data.manager_id) == 'cached'
+        assignment = db.session.scalars(db.select(UserAssignment).filter_by(user_id=data.manager_id)).first()
+        assignment.role_id = data.role_ids['admin']
+        db.session.flush()
+        # the version this transaction is about to commit isn't visible to other workers yet
+        assert DataVersion.committed(['user_assignments']) is None
+        assert permission_cache.get(data.manager_id) is None
+        permission_cache.set(data.manager_id, 'uncommitted')
+        db.session.rollback()
+        assert permission_cache.get(data.manager_id) == 'cached'
+
+def test_fragments_are_keyed_by_the_shared_versions(app, data):
+    renders = []
+
+    def render():
+        renders.append(1)
+        return f'<ul>{len(renders)}</ul>'
+
+    with app.app_context():
+        assert fragment_cache.render('tree', ['departments'], render) == '<ul>1</ul>'
+        assert fragment_cache.render('tree', ['departments'], render) == '<ul>1</ul>'
+        # a table the fragment doesn't name leaves it alone
+        with db.engine.begin() as connection:
+            DataVersion.bump(connection, {'tasks'})
+    with app.app_context():
+        assert fragment_cache.render('tree', ['departments'], render) == '<ul>1</ul>'
+        # another worker's commit to one it does name replaces it
+        with db.engine.begin() as connection:
+            DataVersion.bump(connection, {'departments'})
+    with app.app_context():
+        assert fragment_cache.render('tree', ['departments'], render) == '<ul>2</ul>'
+
+        # this transaction's own uncommitted write: rendered afresh, and not stored
+        db.session.add(Department(name='Pending', parent_id=data.root_id))
+        db.session.flush()
+        assert fragment_cache.render('tree', ['departments'], render) == '<ul>3</ul>'
+        db.session.rollback()
+        assert fragment_cache.render('tree', ['departments'], render) == '<ul>2</ul>'
+
+        with pytest.raises(ValueError):
+            fragment_cache.render('tree', ['access_requests'], render)
+
+def test_a_permission_cache_hit_loads_no_user_row(manager_client, queries):
+    manager_client.get('/reports/')
+    queries.clear()
+    assert manager_client.get('/reports/').status_code == 200
+    assert not [q for q in queries if 'FROM users' in q], queries
+
+def test_counters_add_up_across_threads(app, data):
+    with app.app_context():
+        report_cache.reset_stats()
+        report_cache.set('warm', 1)
+
+    def lookups():
+        with app.app_context():
+            for i in range(500):
+                report_cache.get('warm' if i % 2 else 'cold')
+
+    threads = [threading.Thread(target=lookups) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert report_cache.stats() | {'hit_ratio': None} == {
+        'namespace': 'reports', 'hits': 1000, 'misses': 1000, 'hit_ratio': None,
+    }
+
+def test_cache_counters_are_in_the_metrics(admin_client):
+    admin_client.get('/reports/')
+    body = admin_client.get('/admin/metrics').get_data(as_text=True)
+    assert '# TYPE kpi_manager_cache_hits_total counter' in body
+    assert 'kpi_manager_cache_hits_total{namespace="permissions"}' in body
+    assert 'kpi_manager_cache_misses_total{namespace="fragments"}' in body
+    assert '<td>permissions</td>' in admin_client.get('/admin/queries').get_data(as_text=True)
\ No newline at end of file
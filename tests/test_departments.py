@@ -0,0 +1,103 @@
+import pytest
+from app.extensions import db
+from app.models import Department, DepartmentClosure
+
+def closure_rows():
+    return set(db.session.execute(db.select(DepartmentClosure.ancestor_id, DepartmentClosure.descendant_id, DepartmentClosure.depth)))
+
+def closure_from_parents():
+    """The closure as it should be, worked out by walking every department's parent chain."""
+    parents = dict(db.session.execute(db.select(Department.id, Department.parent_id)).all())
+    rows = set()
+    for id_ in parents:
+        ancestor, depth = id_, 0
+        while ancestor is not None:
+            rows.add((ancestor, id_, depth))
+            ancestor, depth = parents[ancestor], depth + 1
+    return rows
+
+@pytest.fixture
+def chain(app, data):
+    """Root > Child > Grandchild > Leaf, plus Other under Root: returns their ids by name."""
+    with app.app_context():
+        grandchild = Department(name='Grandchild', parent_id=data.child_id)
+        other = Department(name='Other', parent_id=data.root_id)
+        db.session.add_all([grandchild, other])
+        db.session.flush()
+        leaf = Department(name='Leaf', parent_id=grandchild.id)
+        db.session.add(leaf)
+        db.session.commit()
+        return {'root': data.root_id, 'child': data.child_id, 'grandchild': grandchild.id, 'leaf': leaf.id, 'other': other.id}
+
+def subtree(department_id):
+    return set(db.session.scalars(Department.subtree_ids(department_id)))
+
+def test_moving_a_subtree_rewrites_its_paths(app, chain):
+    with app.app_context():
+        db.session.get(Department, chain['grandchild']).parent_id = chain['other']
+        db.session.commit()
+        assert subtree(chain['other']) == {chain['other'], chain['grandchild'], chain['leaf']}
+        assert subtree(chain['child']) == {chain['child']}
+        assert subtree(chain['root']) == set(chain.values())
+        leaf = db.session.get(Department, chain['leaf'])
+        assert [d.id for d in leaf.ancestors()] == [chain['root'], chain['other'], chain['grandchild']]
+        assert leaf.depth == 3
+        assert closure_rows() == closure_from_parents()
+
+        # and up to the top level
+        db.session.get(Department, chain['grandchild']).parent_id = None
+        db.session.commit()
+        assert subtree(chain['root']) == {chain['root'], chain['child'], chain['other']}
+        assert closure_rows() == closure_from_parents()
+
+def test_moving_under_its_own_descendant_is_refused(app, chain):
+    with app.app_context():
+        before = closure_rows()
+        db.session.get(Department, chain['child']).parent_id = chain['leaf']
+        with pytest.raises(ValueError, match='own sub-department'):
+            db.session.commit()
+        db.session.rollback()
+        assert db.session.get(Department, chain['child']).parent_id == chain['root']
+        assert closure_rows() == before
+
+def test_edit_form_offers_no_parent_inside_the_subtree(app, chain, admin_client):
+    response = admin_client.post(f"/departments/{chain['child']}/edit", data={'name': 'Child', 'parent_id': chain['leaf']})
+    assert response.status_code == 200  # re-rendered with the choice error
+    with app.app_context():
+        assert db.session.get(Department, chain['child']).parent_id == chain['root']
+
+def test_deleting_a_department_removes_its_subtree_and_paths(app, chain, admin_client):
+    assert admin_client.post(f"/departments/{chain['grandchild']}/delete").status_code == 302
+    with app.app_context():
+        assert db.session.get(Department, chain['leaf']) is None
+        assert not [row for row in closure_rows() if {chain['grandchild'], chain['leaf']} & set(row[:2])]
+        assert closure_rows() == closure_from_parents()
+
+def test_tree_streams_one_cached_fragment_per_branch(app, data, admin_client, queries):
+    with app.app_context():
+        alpha = Department(name='Alpha', parent_id=data.root_id)
+        beta = Department(name='Beta', parent_id=data.root_id)
+        db.session.add_all([alpha, beta])
+        db.session.flush()
+        db.session.add_all([Department(name='Alpha 1', parent_id=alpha.id), Department(name='Beta 1', parent_id=beta.id)])
+        db.session.commit()
+    app.config['STREAM_TEMPLATES_BUFFER'] = 1
+
+    # three cold branches, one tree query
+    queries.clear()
+    chunks = [chunk.decode() for chunk in admin_client.get('/departments/?view=tree').response]
+    assert len([q for q in queries if 'department_closure' in q]) == 1, queries
+    alpha_chunk = next(chunk for chunk in chunks if '<strong>Alpha 1</strong>' in chunk)
+    assert '<strong>Alpha</strong>' in alpha_chunk
+    assert '<strong>Child</strong>' not in alpha_chunk and '<strong>Root</strong>' not in alpha_chunk
+
+    # both branches come from the cache: no subtree query
+    queries.clear()
+    body = admin_client.get('/departments/?view=tree').get_data(as_text=True)
+    assert body.index('<strong>Root</strong>') < body.index('<strong>Alpha 1</strong>') < body.index('<strong>Beta 1</strong>') < body.index('<strong>Child</strong>')
+    assert not [q for q in queries if 'department_closure' in q], queries
+
+    with app.app_context():
+        db.session.scalars(db.select(Department).filter_by(name='Alpha 1')).one().name = 'Alpha One'
+        db.session.commit()
+    assert '<strong>Alpha One</strong>' in admin_client.get('/departments/?view=tree').get_data(as_text=True)
\ No newline at end of file
@@ -0,0 +1,71 @@
+import csv
+import io
+import sys
+from datetime import date
+import pytest
+from app.extensions import db
+from app.models import Department, MonthlyKPI
+from app.utils import exporter
+from app.utils.exporter import stream_export
+
+@pytest.fixture
+def kpis(app, data):
+    """Scores for member 1 in January to April 2025."""
+    with app.app_context():
+        db.session.add_all(
+            MonthlyKPI(user_id=data.member_ids[1], reviewer_id=data.manager_id, year=2025, month=month, score=60 + month)
+            for month in range(1, 5)
+        )
+        db.session.commit()
+
+def read_csv(chunks):
+    return list(csv.reader(io.StringIO(b''.join(chunks).decode())))
+
+def test_csv_streams_the_header_then_one_chunk_per_partition(app, data, monkeypatch):
+    monkeypatch.setattr(exporter, 'YIELD_PER', 7)
+    with app.app_context():
+        chunks = list(stream_export('tasks', department_id=data.child_id))
+    assert chunks[0] == b'task_id,task,project,department,manager_email,start_date,end_date,submitted\r\n'
+    # 40 tasks in partitions of 7
+    assert len(chunks) == 1 + 6
+    assert [len(read_csv([chunk])) for chunk in chunks[1:]] == [7, 7, 7, 7, 7, 5]
+    rows = read_csv(chunks)[1:]
+    assert [int(row[0]) for row in rows] == sorted(data.task_ids)
+    assert rows[0][3:5] == ['Child', 'manager@example.com']
+
+@pytest.mark.parametrize('start, end, months', [
+    (date(2025, 2, 1), date(2025, 4, 1), [2, 3]),
+    # a month counts when its first day falls inside [start, end)
+    (date(2025, 1, 15), date(2025, 3, 2), [2, 3]),
+    (None, date(2025, 2, 1), [1]),
+    (date(2025, 4, 1), date(2025, 5, 1), [4]),
+])
+def test_kpis_cover_the_months_starting_in_the_range(app, kpis, start, end, months):
+    with app.app_context():
+        rows = read_csv(stream_export('kpis', start=start, end=end))[1:]
+    assert [(row[1], int(row[4])) for row in rows] == [('member1@example.com', month) for month in months]
+
+def test_kpis_are_limited_to_the_department_subtree(app, data, kpis):
+    with app.app_context():
+        other = Department(name='Other', parent_id=data.root_id)
+        db.session.add(other)
+        db.session.commit()
+        # member 1's four months plus member 0's current one
+        assert len(read_csv(stream_export('kpis', department_id=data.child_id))) == 1 + 5
+        assert len(read_csv(stream_export('kpis', department_id=data.root_id))) == 1 + 5
+        assert len(read_csv(stream_export('kpis', department_id=other.id))) == 1
+
+def test_parquet_round_trips(app, data, monkeypatch):
+    pq = pytest.importorskip('pyarrow.parquet')
+    monkeypatch.setattr(exporter, 'YIELD_PER', 7)
+    with app.app_context():
+        table = pq.read_table(io.BytesIO(b''.join(stream_export('tasks', 'parquet', department_id=data.child_id))))
+    assert table.column_names == ['task_id', 'task', 'project', 'department', 'manager_email', 'start_date', 'end_date', 'submitted']
+    assert table.num_rows == 40
+    assert table.column('task_id').to_pylist() == sorted(data.task_ids)
+    assert table.column('submitted').to_pylist() == [i % 3 == 0 for i in range(40)]
+
+def test_parquet_without_pyarrow_is_refused_up_front(app, monkeypatch):
+    monkeypatch.setitem(sys.modules, 'pyarrow', None)
+    with app.app_context(), pytest.raises(RuntimeError, match='needs pyarrow'):
+        stream_export('tasks', 'parquet')
\ No newline at end of file
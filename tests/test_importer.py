@@ -0,0 +1,58 @@
+import io
+import sys
+import pytest
+from sqlalchemy.exc import IntegrityError
+from app.extensions import db
+from app.models import Department
+from app.utils.importer import import_rows, read_rows
+
+def test_a_failed_chunk_leaves_no_names_behind(app, data, monkeypatch):
+    commit = db.session.commit
+    failures = [IntegrityError('INSERT', {}, Exception('UNIQUE constraint failed'))]
+
+    def commit_once_failing():
+        if failures:
+            raise failures.pop()
+        commit()
+
+    rows = [
+        (2, {'name': 'Ops', 'parent': 'Root'}),
+        # Ops was rolled back, so it can't be a parent, but it can be imported again
+        (3, {'name': 'Team', 'parent': 'Ops'}),
+        (4, {'name': 'Ops', 'parent': 'Root'}),
+    ]
+    with app.app_context():
+        monkeypatch.setattr(db.session, 'commit', commit_once_failing)
+        result = import_rows('departments', rows, chunk_size=1)
+        monkeypatch.undo()
+
+        assert result.imported == 1
+        assert [(e.line, e.message.split(':')[0]) for e in result.errors] == [
+            (2, 'lines 2-2 not imported'), (3, "unknown parent department 'Ops'"),
+        ]
+        ops = db.session.scalars(db.select(Department).where(Department.name == 'Ops')).one()
+        assert ops.parent_id == data.root_id
+        assert db.session.scalar(db.select(Department.id).where(Department.name == 'Team')) is None
+
+def upload(client, filename, content, kind='departments'):
+    response = client.post('/import/', data={
+        'kind': kind, 'dry_run': 'y', 'file': (io.BytesIO(content), filename),
+    }, content_type='multipart/form-data')
+    assert response.status_code == 200
+    return response.get_data(as_text=True)
+
+def test_upload_accepts_every_extension_the_reader_handles(admin_client, monkeypatch):
+    html = upload(admin_client, 'departments.csv', b'name,parent\nOps,Root\n')
+    assert '1 row(s) read, 1 would be imported' in html
+
+    # without openpyxl both spreadsheet types get past the form and are refused with a hint
+    monkeypatch.setitem(sys.modules, 'openpyxl', None)
+    for name in ('departments.xlsx', 'departments.xlsm'):
+        html = upload(admin_client, name, b'PK')
+        assert 'needs openpyxl (pip install openpyxl)' in html
+    assert 'CSV or XLSX files only.' in upload(admin_client, 'departments.txt', b'name')
+
+def test_a_missing_openpyxl_is_reported_before_any_row_is_read(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'openpyxl', None)
+    with pytest.raises(RuntimeError, match='openpyxl'):
+        read_rows(io.BytesIO(b''), 'Departments.XLSM')
\ No newline at end of file
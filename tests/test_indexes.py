@@ -0,0 +1,64 @@
+import re
+import pytest
+from flask_migrate import upgrade
+from sqlalchemy import event
+from app.extensions import db
+from app.models import (AccessRequest, Department, DepartmentClosure, MonthlyKPI, Project, Task, TaskReview,
+                        UserAssignment, task_assignments)
+
+# a plan step that visits every row of a table, directly or through an index
+SCAN = re.compile(r'SCAN (\w+)( USING (COVERING )?INDEX \w+)?$')
+# listings with no filter, where walking an index in sort order (and stopping at the page size) is the plan
+UNFILTERED = {'tasks page', 'access requests'}
+
+@pytest.fixture
+def migrated(app):
+    # the schema the migrations build, so a missing index in a migration is caught too
+    with app.app_context():
+        db.drop_all()
+        upgrade()
+    return app
+
+# the statements behind the busiest pages, with the filters they actually use
+HOT_QUERIES = {
+    'tasks page': lambda: db.select(Task).order_by(Task.start_date.desc(), Task.id.desc()).limit(21),
+    'tasks by project': lambda: db.select(Task).where(Task.project_id == 1)
+        .order_by(Task.start_date.desc(), Task.id.desc()).limit(21),
+    'tasks by manager': lambda: db.select(Task).where(Task.manager_id == 1)
+        .order_by(Task.start_date.desc(), Task.id.desc()).limit(21),
+    'tasks by status': lambda: db.select(Task).where(Task.submitted == False)
+        .order_by(Task.start_date.desc(), Task.id.desc()).limit(21),
+    'tasks of a user': lambda: db.select(Task).join(task_assignments, task_assignments.c.task_id == Task.id)
+        .where(task_assignments.c.user_id == 1),
+    'assignments of a user': lambda: db.select(UserAssignment).where(UserAssignment.user_id == 1),
+    'members of departments': lambda: db.select(UserAssignment.user_id).where(UserAssignment.department_id.in_([1, 2])),
+    'child departments': lambda: db.select(Department).where(Department.parent_id == 1),
+    'ancestors of a department': lambda: db.select(DepartmentClosure.ancestor_id)
+        .where(DepartmentClosure.descendant_id == 1),
+    'projects of departments': lambda: db.select(Project).where(Project.department_id.in_([1, 2])),
+    'reviews of a task': lambda: db.select(TaskReview).where(TaskReview.task_id == 1),
+    'access requests': lambda: db.select(AccessRequest).order_by(AccessRequest.timestamp.desc()),
+    'monthly KPI': lambda: db.select(MonthlyKPI).where(MonthlyKPI.user_id == 1, MonthlyKPI.year == 2024,
+                                                      MonthlyKPI.month == 5),
+}
+
+@pytest.mark.parametrize('name', HOT_QUERIES)
+def test_hot_query_uses_an_index(migrated, name):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    with migrated.app_context():
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            db.session.execute(HOT_QUERIES[name]()).all()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        statement, parameters = statements[-1]
+        plan = [row[3] for row in db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)]
+        if name in UNFILTERED:
+            # no sort of the whole table, and no scan of it outside an index
+            assert not [step for step in plan if step.startswith('USE TEMP B-TREE') or SCAN.match(step) and 'USING' not in step], plan
+        else:
+            assert not [step for step in plan if SCAN.match(step)], plan
\ No newline at end of file
@@ -0,0 +1,79 @@
+from datetime import date, timedelta
+import pytest
+from app.extensions import db
+from app.models import KPISuggestion, TaskReview
+from app.utils import kpi_engine
+
+# every fixture task ends three days from now
+DUE = date.today() + timedelta(days=3)
+MONTH = (DUE.year, DUE.month)
+
+@pytest.fixture
+def precomputed(app, data):
+    with app.app_context():
+        assert kpi_engine.precompute(MONTH, MONTH) == 5
+        db.session.commit()
+
+def stored(app):
+    with app.app_context():
+        return {
+            s.user_id: (s.score, s.factors, s.computed_at)
+            for s in db.session.scalars(db.select(KPISuggestion).where(
+                KPISuggestion.year == MONTH[0], KPISuggestion.month == MONTH[1]
+            ))
+        }
+
+def fresh(app, user_id):
+    with app.app_context():
+        [(_, score, factors)] = kpi_engine.suggest(MONTH, MONTH, user_ids=[user_id])
+        return score, factors
+
+def test_scores_weigh_reviews_completion_and_punctuality(app, data):
+    with app.app_context():
+        results = {m.user_id: (m, score, factors) for m, score, factors in kpi_engine.suggest(MONTH, MONTH)}
+    # member 0 has tasks 0, 5, ..., 35: three of them submitted, task 0 reviewed at 80
+    metrics, score, factors = results[data.member_ids[0]]
+    assert (metrics.tasks, metrics.submitted, metrics.review_avg) == (8, 3, 80.0)
+    # submitted without a timestamp and not overdue yet: punctuality has nothing to say
+    assert factors == {'reviews': 0.8, 'completion': 0.375}
+    assert score == round(100 * (0.6 * 0.8 + 0.2 * 0.375) / 0.8)
+    # nobody else was reviewed, so their score is completion alone
+    metrics, score, factors = results[data.member_ids[1]]
+    assert factors == {'completion': metrics.submitted / metrics.tasks}
+
+def test_a_review_recomputes_that_months_stored_suggestion(app, data, manager_client, precomputed):
+    before = stored(app)
+    response = manager_client.post(f'/tasks/{data.task_ids[5]}/review', data={'score': 20, 'comments': 'late'})
+    assert response.status_code == 302
+    after = stored(app)
+
+    member = data.member_ids[0]
+    assert after[member][:2] == fresh(app, member)
+    assert after[member][1]['reviews'] == 0.5
+    assert after[member][0] < before[member][0]
+    assert after[member][2] > before[member][2]
+    # task 5 is only member 0's
+    assert {k: v for k, v in after.items() if k != member} == {k: v for k, v in before.items() if k != member}
+
+def test_submitting_a_task_recomputes_its_assignees_suggestion(app, data, member_client, precomputed):
+    member = data.member_ids[0]
+    before = stored(app)[member]
+    member_client.post(f'/tasks/{data.task_ids[5]}/toggle')
+    after = stored(app)[member]
+    assert after[1]['completion'] == 4 / 8 > before[1]['completion']
+    assert after[:2] == fresh(app, member)
+
+def test_months_never_precomputed_are_left_to_the_nightly_run(app, data):
+    with app.app_context():
+        db.session.add(TaskReview(task_id=data.task_ids[5], reviewer_id=data.manager_id, score=20))
+        db.session.commit()
+        assert db.session.scalar(db.select(db.func.count()).select_from(KPISuggestion)) == 0
+
+def test_a_rolled_back_review_changes_nothing(app, data, precomputed):
+    before = stored(app)
+    with app.app_context():
+        db.session.add(TaskReview(task_id=data.task_ids[5], reviewer_id=data.manager_id, score=20))
+        db.session.flush()
+        db.session.rollback()
+        db.session.commit()
+    assert stored(app) == before
\ No newline at end of file
@@ -0,0 +1,47 @@
+from datetime import date
+from app.extensions import db
+from app.models import MonthlyKPI, MonthlyKPISummary, User
+
+def summaries():
+    return {
+        (s.user_id, s.year, s.month): (s.max_score, s.min_score, s.avg_score, s.kpi_count, s.latest_reviewer_id)
+        for s in db.session.scalars(db.select(MonthlyKPISummary))
+    }
+
+def rebuilt():
+    # what a full rebuild (flask rebuild-kpi-summaries) would produce
+    MonthlyKPISummary.refresh(db.session.connection())
+    return summaries()
+
+def test_summary_follows_inserts_moves_and_deletes(app, data):
+    member_id = data.member_ids[0]
+    today = date.today()
+    with app.app_context():
+        kpi = MonthlyKPI(user_id=member_id, reviewer_id=data.admin_id, year=2024, month=5, score=90)
+        db.session.add_all([kpi, MonthlyKPI(user_id=member_id, reviewer_id=data.manager_id, year=2024, month=5, score=60)])
+        db.session.commit()
+        assert summaries()[(member_id, 2024, 5)][:4] == (90, 60, 75.0, 2)
+        assert db.session.get(User, member_id).get_kpi_for_month(2024, 5) == 90
+        assert summaries()[(member_id, today.year, today.month)][:4] == (70, 70, 70.0, 1)
+
+        # moving a KPI refreshes the month it left as well as the one it joined
+        kpi.month = 6
+        db.session.commit()
+        assert summaries()[(member_id, 2024, 5)][:4] == (60, 60, 60.0, 1)
+        assert summaries()[(member_id, 2024, 6)][:4] == (90, 90, 90.0, 1)
+
+        db.session.delete(kpi)
+        db.session.commit()
+        assert (member_id, 2024, 6) not in summaries()
+
+        incremental = summaries()
+        assert rebuilt() == incremental
+
+def test_latest_reviewer_is_the_newest_kpi(app, data):
+    member_id = data.member_ids[1]
+    with app.app_context():
+        db.session.add(MonthlyKPI(user_id=member_id, reviewer_id=data.admin_id, year=2024, month=1, score=50))
+        db.session.commit()
+        db.session.add(MonthlyKPI(user_id=member_id, reviewer_id=data.manager_id, year=2024, month=1, score=40))
+        db.session.commit()
+        assert summaries()[(member_id, 2024, 1)] == (50, 40, 45.0, 2, data.manager_id)
\ No newline at end of file
@@ -0,0 +1,73 @@
+import threading
+from flask_mail import Message
+from app.utils.mail_queue import MailDispatcher
+
+class FakeSMTP:
+    """Stands in for ``mail``: ``connect()`` fails ``refuse`` times, then sends everything but ``reject``."""
+
+    def __init__(self, refuse=0, reject=()):
+        self.refuse = refuse
+        self.reject = set(reject)
+        self.connections = 0
+        self.delivered = []
+        self.lock = threading.Lock()
+
+    def connect(self):
+        with self.lock:
+            if self.refuse:
+                self.refuse -= 1
+                raise ConnectionRefusedError("SMTP server down")
+            self.connections += 1
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def send(self, msg):
+        if msg.subject in self.reject:
+            raise OSError("550 mailbox unavailable")
+        with self.lock:
+            self.delivered.append(msg.subject)
+
+    def __getattr__(self, name):
+        raise AssertionError(f"inline send not expected ({name})")
+
+def dispatcher(app, smtp, **config):
+    app.config.update({'MAIL_WORKERS': 1, 'MAIL_RETRY_BACKOFF': 0, 'MAIL_MAX_RETRIES': 2, **config})
+    return MailDispatcher(smtp, app)
+
+def message(subject):
+    return Message(subject, sender='kpi@example.com', recipients=['someone@example.com'])
+
+def test_sends_everything_queued_over_reused_connections(app):
+    smtp = FakeSMTP()
+    mailer = dispatcher(app, smtp, MAIL_BATCH_SIZE=50)
+    for i in range(20):
+        mailer.enqueue(message(f'm{i}'))
+    mailer.shutdown()
+    assert sorted(smtp.delivered) == sorted(f'm{i}' for i in range(20))
+    assert smtp.connections < 20
+    stats = mailer.stats()
+    assert (stats['sent'], stats['failed'], stats['retries'], stats['queue_depth']) == (20, 0, 0, 0)
+    assert stats['max_latency'] >= stats['avg_latency'] > 0
+
+def test_retries_a_dead_server_and_gives_up_on_a_rejected_message(app):
+    smtp = FakeSMTP(refuse=2, reject={'bad'})
+    mailer = dispatcher(app, smtp)
+    for subject in ('first', 'bad', 'last'):
+        mailer.enqueue(message(subject))
+    mailer.shutdown()
+    assert smtp.delivered == ['first', 'last']
+    stats = mailer.stats()
+    assert (stats['sent'], stats['failed']) == (2, 1)
+    # two refused connections, then two more attempts at the rejected message before giving up
+    assert stats['retries'] == 4
+
+def test_queue_stats_are_in_the_metrics(admin_client):
+    body = admin_client.get('/admin/metrics').get_data(as_text=True)
+    assert '# TYPE kpi_manager_mail_queue_depth gauge' in body
+    assert '\nkpi_manager_mail_sent_total 0\n' in body
+    assert 'Mail queue' in admin_client.get('/admin/queries').get_data(as_text=True)
\ No newline at end of file
@@ -0,0 +1,39 @@
+from app.extensions import db
+from app.models import UserAssignment
+
+def assignment_id(app, user_id):
+    with app.app_context():
+        return db.session.scalar(db.select(UserAssignment.id).where(UserAssignment.user_id == user_id))
+
+def role_of(app, assignment_id):
+    with app.app_context():
+        return db.session.get(UserAssignment, assignment_id).role_id
+
+def test_bulk_update_redirects_to_a_summary_that_is_safe_to_reload(app, data, manager_client):
+    promoted, kept, outside = (assignment_id(app, user_id) for user_id in (data.member_ids[0], data.member_ids[1], data.admin_id))
+    response = manager_client.post('/users/manage-roles', data={
+        f'role-{promoted}': data.role_ids['manager'],
+        f'role-{kept}': data.role_ids['member'],
+        f'role-{outside}': data.role_ids['member'],
+    })
+    assert response.status_code == 302
+    assert response.headers['Location'] == '/users/manage-roles/changes'
+    assert role_of(app, promoted) == data.role_ids['manager']
+    # the admin's assignment is in a department the manager does not manage
+    assert role_of(app, outside) == data.role_ids['admin']
+
+    html = manager_client.get('/users/manage-roles/changes').get_data(as_text=True)
+    assert '<td>Member 0</td>' in html and '<td>Fresher</td>' in html and '<td>Manager</td>' in html
+    assert 'Member 1' not in html and '2 assignment(s) left as they were.' in html
+
+    # reloading the summary shows it again without re-applying anything
+    with app.app_context():
+        db.session.get(UserAssignment, promoted).role_id = data.role_ids['member']
+        db.session.commit()
+    assert '<td>Member 0</td>' in manager_client.get('/users/manage-roles/changes').get_data(as_text=True)
+    assert role_of(app, promoted) == data.role_ids['member']
+
+def test_summary_without_an_update_goes_back_to_the_form(manager_client):
+    response = manager_client.get('/users/manage-roles/changes')
+    assert response.status_code == 302
+    assert response.headers['Location'] == '/users/manage-roles'
\ No newline at end of file
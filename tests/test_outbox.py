@@ -0,0 +1,119 @@
+import pytest
+from app.extensions import db
+from app.models import OutboxMessage
+from app.utils import outbox
+from tests.test_mail_queue import FakeSMTP
+
+class Crash(BaseException):
+    """Kills the sender outright, like the process dying mid-batch."""
+
+@pytest.fixture
+def smtp(monkeypatch):
+    def install(**kwargs):
+        fake = FakeSMTP(**kwargs)
+        monkeypatch.setattr(outbox, 'mail', fake)
+        return fake
+    return install
+
+def queue(data, *subjects):
+    for subject in subjects:
+        outbox.queue_email('approved_request', subject, 'kpi@example.com', ['member0@example.com'],
+                           user_id=data.member_ids[0], role='Fresher')
+    db.session.commit()
+
+def statuses():
+    db.session.expire_all()
+    return {row.subject: (row.status, row.attempts) for row in OutboxMessage.query}
+
+def test_each_sent_mail_is_committed_before_the_next(app, data, smtp):
+    fake = smtp()
+    send = fake.send
+
+    def crash_on_third(msg):
+        if msg.subject == 'm2':
+            raise Crash()
+        send(msg)
+    fake.send = crash_on_third
+    with app.app_context():
+        queue(data, 'm0', 'm1', 'm2')
+        with pytest.raises(Crash):
+            outbox.run(once=True)
+        db.session.rollback()
+        assert statuses() == {'m0': ('sent', 0), 'm1': ('sent', 0), 'm2': ('sending', 0)}
+
+def test_a_dead_server_postpones_the_batch_without_spending_attempts(app, data, smtp):
+    fake = smtp(refuse=5)
+    with app.app_context():
+        queue(data, 'm0', 'm1', 'm2')
+        assert outbox.run(once=True) == 0
+        # one connection attempt for the whole batch, not one per mail
+        assert fake.refuse == 4
+        assert statuses() == {f'm{i}': ('pending', 0) for i in range(3)}
+        # released rows wait out the backoff
+        assert outbox.run(once=True) == 0
+        assert fake.refuse == 4
+
+        fake.refuse = 0
+        assert outbox.run(once=True, flush=True) == 3
+        assert fake.delivered == ['m0', 'm1', 'm2']
+        assert statuses() == {f'm{i}': ('sent', 0) for i in range(3)}
+
+def test_a_rejected_mail_is_retried_later_and_the_rest_still_go_out(app, data, smtp):
+    fake = smtp(reject={'m1'})
+    with app.app_context():
+        queue(data, 'm0', 'm1', 'm2')
+        assert outbox.run(once=True) == 2
+        assert fake.delivered == ['m0', 'm2']
+        assert statuses() == {'m0': ('sent', 0), 'm1': ('pending', 1), 'm2': ('sent', 0)}
+
+def pending_for(recipient):
+    db.session.expire_all()
+    return OutboxMessage.query.filter_by(recipient=recipient, status='pending').all()
+
+def test_toggling_back_within_the_window_sends_nothing(app, data, member_client):
+    # tasks 5 and 10 belong to member 0 and start unsubmitted
+    task_id = data.task_ids[5]
+    member_client.post(f'/tasks/{task_id}/toggle')
+    with app.app_context():
+        [row] = pending_for('manager@example.com')
+        assert (row.kind, row.dedup_key) == ('task_completed', f'task_completed:{task_id}')
+
+    member_client.post(f'/tasks/{task_id}/toggle')
+    with app.app_context():
+        assert pending_for('manager@example.com') == []
+
+    for _ in range(3):
+        member_client.post(f'/tasks/{task_id}/toggle')
+    with app.app_context():
+        assert len(pending_for('manager@example.com')) == 1
+
+def test_events_for_one_recipient_go_out_as_one_digest(app, data, member_client, smtp):
+    fake = smtp()
+    bodies = {}
+    send = fake.send
+
+    def record(msg):
+        bodies[msg.recipients[0]] = msg.body
+        send(msg)
+    fake.send = record
+    for i in (5, 10):
+        member_client.post(f'/tasks/{data.task_ids[i]}/toggle')
+    member_client.post('/auth/request-access', data={'reason': 'need reports'})
+    with app.app_context():
+        # still inside the digest window
+        assert outbox.run(once=True) == 0
+        assert outbox.run(once=True, flush=True) == 2
+    assert fake.connections == 1
+    # two submissions merge into one digest; a lone access request keeps its own template
+    assert sorted(fake.delivered) == ['KPI Manager: 2 new notifications', 'New Access Request']
+    assert '"Task 5"' in bodies['manager@example.com'] and '"Task 10"' in bodies['manager@example.com']
+    assert 'need reports' in bodies['admin@example.com']
+
+def test_without_a_window_every_event_is_mailed_on_its_own(app, data, member_client, smtp):
+    app.config['OUTBOX_DIGEST_WINDOW'] = 0
+    fake = smtp()
+    for i in (5, 10):
+        member_client.post(f'/tasks/{data.task_ids[i]}/toggle')
+    with app.app_context():
+        assert outbox.run(once=True) == 2
+    assert fake.delivered == ['Task submitted: Task 5', 'Task submitted: Task 10']
\ No newline at end of file
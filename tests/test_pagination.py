@@ -0,0 +1,93 @@
+from datetime import date, timedelta
+import pytest
+from sqlalchemy import event
+from app.extensions import db
+from app.models import Task
+from app.utils.pagination import encode_cursor, keyset_paginate
+
+@pytest.fixture
+def tasks(app, data):
+    # some tasks share a start date and some have none, so ties and the NULL tail are exercised
+    with app.app_context():
+        project_id = data.project_id
+        today = date.today()
+        db.session.add_all([
+            Task(name=f'Extra {i}', project_id=project_id, created_by=data.admin_id,
+                 start_date=None if i % 7 == 0 else today - timedelta(days=i % 4))
+            for i in range(60)
+        ])
+        db.session.commit()
+    return app
+
+def expected_order(query):
+    return [t.id for t in query.order_by(Task.start_date.desc().nulls_last(), Task.id.desc())]
+
+@pytest.mark.parametrize('per_page', [1, 7, 20])
+def test_walks_forward_and_back_in_order(tasks, per_page):
+    with tasks.app_context():
+        expected = expected_order(Task.query)
+        pages, cursor = [], None
+        while True:
+            page = keyset_paginate(Task.query, Task.start_date, Task.id, after=cursor, per_page=per_page)
+            pages.append(page)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        assert [t.id for page in pages for t in page.items] == expected
+        assert not pages[0].has_prev
+
+        page, walked = pages[-1], []
+        while page.has_prev:
+            page = keyset_paginate(Task.query, Task.start_date, Task.id, before=page.prev_cursor, per_page=per_page)
+            walked.insert(0, [t.id for t in page.items])
+        assert walked == [[t.id for t in p.items] for p in pages[:-1]]
+
+def test_filters_apply_to_both_partitions(tasks):
+    with tasks.app_context():
+        query = Task.query.filter(Task.submitted == False)
+        page = keyset_paginate(query, Task.start_date, Task.id, per_page=1000)
+        assert [t.id for t in page.items] == expected_order(query)
+
+def _plans(app, run):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            run()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        connection = db.session.connection()
+        return [
+            [row[3] for row in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)]
+            for statement, parameters in statements if statement.startswith('SELECT')
+        ]
+
+@pytest.mark.parametrize('direction, cursor', [
+    ('after', 'first'), ('after', 'dated'), ('after', 'undated'), ('before', 'dated'), ('before', 'undated'),
+])
+@pytest.mark.parametrize('project_filter', [False, True])
+def test_every_page_seeks_the_index(tasks, cursor, direction, project_filter):
+    with tasks.app_context():
+        ordered = db.session.execute(
+            db.select(Task.start_date, Task.id).order_by(Task.start_date.desc().nulls_last(), Task.id.desc())
+        ).all()
+        keys = {
+            'first': None,
+            'dated': next(key for key in ordered[len(ordered) // 2:] if key[0] is not None),
+            'undated': next(key for key in ordered if key[0] is None),
+        }
+    cursor = encode_cursor(*keys[cursor]) if keys[cursor] else None
+
+    def run():
+        query = Task.query.filter(Task.project_id == 1) if project_filter else Task.query
+        keyset_paginate(query, Task.start_date, Task.id, per_page=20, **{direction: cursor})
+
+    plans = _plans(tasks, run)
+    assert plans
+    for plan in plans:
+        tasks_steps = [step for step in plan if ' tasks ' in f' {step} ']
+        assert tasks_steps and all(step.startswith('SEARCH tasks USING') for step in tasks_steps), plan
\ No newline at end of file
@@ -0,0 +1,32 @@
+from app.extensions import db, query_profiler
+from app.models import Department
+from app.utils import profiling
+
+def test_slow_queries_are_logged_with_their_plan(app, data, admin_client, monkeypatch):
+    monkeypatch.setattr(query_profiler, 'slow_seconds', 0)
+    monkeypatch.setattr(query_profiler, '_plans', {})
+    query_profiler.slow_queries.clear()
+    assert admin_client.get('/projects/').status_code == 200
+    plans = [slow.plan for slow in query_profiler.slow_queries if slow.statement.lstrip().startswith('SELECT')]
+    assert plans and all(plans)
+
+def test_a_failed_explain_leaves_the_transaction_alone(app, data, monkeypatch):
+    monkeypatch.setattr(query_profiler, 'slow_seconds', 0)
+    monkeypatch.setattr(query_profiler, '_plans', {})
+    monkeypatch.setitem(profiling._EXPLAIN, 'sqlite', 'EXPLAIN NONSENSE ')
+    query_profiler.slow_queries.clear()
+    with app.app_context():
+        db.session.add(Department(name='Uncommitted', parent_id=data.root_id))
+        db.session.flush()
+        # explained (and failing) as soon as it runs, while the insert above is still pending
+        assert db.session.scalar(db.select(Department.id).where(Department.name == 'Uncommitted'))
+        assert query_profiler.slow_queries[-1].plan is None
+        db.session.commit()
+    with app.app_context():
+        assert db.session.scalar(db.select(Department.id).where(Department.name == 'Uncommitted'))
+
+def test_other_dialects_are_not_explained(app, monkeypatch):
+    monkeypatch.setattr(query_profiler, '_plans', {})
+    monkeypatch.delitem(profiling._EXPLAIN, 'sqlite')
+    with app.app_context():
+        assert query_profiler._plan(db.session.connection(), 'SELECT 1', ()) is None
\ No newline at end of file
@@ -0,0 +1,90 @@
+import pytest
+from flask import g
+from app.extensions import db
+from app.models import Department, Project
+from app.utils.replica import REPLICA, primary_reads, sync_sqlite
+from tests.conftest import login, make_app
+
+@pytest.fixture
+def app(tmp_path):
+    """The usual test app plus a second SQLite file as its replica, filled by ``replicate``."""
+    app = make_app(tmp_path, SQLALCHEMY_BINDS={REPLICA: 'sqlite:///' + str(tmp_path / 'replica.db')})
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+    # ``db`` outlives the app; without this, create_all in later tests looks for the replica bind
+    db.metadatas.pop(REPLICA, None)
+
+def replicate(app):
+    with app.app_context():
+        sync_sqlite(db.engines[None], db.engines[REPLICA])
+
+def rename_on_primary(app, project_id, name):
+    # outside any request, so no user gets pinned to the primary by it
+    with app.app_context():
+        db.session.get(Project, project_id).name = name
+        db.session.commit()
+
+def unpinned(client):
+    # logging in writes, which pins the client to the primary for a while
+    with client.session_transaction() as session:
+        session.pop('db_primary_until', None)
+    return client
+
+@pytest.fixture
+def lagging(app, data):
+    """The replica holds the fixture data; the primary has since renamed the project."""
+    replicate(app)
+    rename_on_primary(app, data.project_id, 'Renamed')
+
+def test_get_views_read_the_replica(app, data, lagging):
+    client = unpinned(login(app.test_client(), 'admin@example.com'))
+    assert '<h2>Project</h2>' in client.get(f'/projects/{data.project_id}').get_data(as_text=True)
+    replicate(app)
+    assert '<h2>Renamed</h2>' in client.get(f'/projects/{data.project_id}').get_data(as_text=True)
+
+def test_a_writer_reads_its_own_writes_until_the_pin_expires(app, data, lagging):
+    writer = unpinned(login(app.test_client(), 'admin@example.com'))
+    reader = unpinned(login(app.test_client(), 'manager@example.com'))
+    response = writer.post(f'/projects/projects/{data.project_id}/edit', data={
+        'name': 'Edited', 'department_id': data.child_id, 'description': '',
+    })
+    assert response.status_code == 302
+    # the edit went to the primary, the writer is pinned there, everyone else still reads the replica
+    assert '<h2>Edited</h2>' in writer.get(f'/projects/{data.project_id}').get_data(as_text=True)
+    assert '<h2>Project</h2>' in reader.get(f'/projects/{data.project_id}').get_data(as_text=True)
+
+    with writer.session_transaction() as session:
+        session['db_primary_until'] = 0
+    assert '<h2>Project</h2>' in writer.get(f'/projects/{data.project_id}').get_data(as_text=True)
+
+def test_only_plain_selects_in_replica_views_are_routed(app, data, lagging):
+    name = db.select(Project.name).where(Project.id == data.project_id)
+    with app.test_request_context():
+        assert db.session.scalar(name) == 'Renamed'
+        g.db_replica = True
+        assert db.session.scalar(name) == 'Project'
+        assert db.session.scalar(name.with_for_update()) == 'Renamed'
+        with primary_reads():
+            assert db.session.scalar(name) == 'Renamed'
+        assert db.session.scalar(name) == 'Project'
+
+def test_without_a_replica_bind_nothing_is_routed(tmp_path):
+    app = make_app(tmp_path)
+    with app.app_context():
+        db.create_all()
+        dept = Department(name='Solo')
+        db.session.add(dept)
+        db.session.flush()
+        db.session.add(Project(name='Solo', department_id=dept.id))
+        db.session.commit()
+    with app.test_request_context():
+        g.db_replica = True
+        assert db.session.scalar(db.select(Project.name)) == 'Solo'
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
\ No newline at end of file
@@ -0,0 +1,50 @@
+from datetime import date
+from app.extensions import db, report_cache
+from app.models import MonthlyKPI
+from app.utils.reports import _score_stats, department_report
+
+def this_month():
+    today = date.today()
+    return today.year, today.month
+
+def test_score_stats_median_and_buckets():
+    stats = _score_stats([(100, 1), (70, 2), (10, 1), (None, 5)])
+    assert (stats['count'], stats['min'], stats['max'], stats['avg']) == (4, 10, 100, 62.5)
+    assert stats['median'] == 70
+    assert stats['buckets'][1] == ('10-19', 1) and stats['buckets'][-1] == ('90-100', 1)
+    assert _score_stats([(60, 1), (80, 1)])['median'] == 70
+    assert _score_stats([])['median'] is None
+
+def test_report_rolls_up_the_subtree(app, data):
+    with app.app_context():
+        report = department_report(data.root_id, this_month(), this_month())
+        assert report['user_count'] == 12
+        assert (report['monthly_kpi']['count'], report['monthly_kpi']['avg']) == (1, 70)
+        assert (report['task_reviews']['count'], report['task_reviews']['avg']) == (1, 80)
+        child, = report['sub_departments']
+        assert (child['department_name'], child['kpi_avg'], child['kpi_count'], child['review_avg'], child['review_count']) == \
+            ('Child', 70, 1, 80, 1)
+
+        # months outside the period don't count
+        year, month = this_month()
+        before = (year - 1, month)
+        assert department_report(data.root_id, before, before)['monthly_kpi']['count'] == 0
+
+def test_report_is_cached_until_a_kpi_is_committed(app, data, queries):
+    period = this_month()
+    with app.app_context():
+        department_report(data.child_id, period, period)
+    with app.app_context():
+        queries.clear()
+        hits = report_cache.hits
+        department_report(data.child_id, period, period)
+        assert report_cache.hits == hits + 1
+        assert not [q for q in queries if 'data_versions' not in q], queries
+
+        db.session.add(MonthlyKPI(user_id=data.member_ids[1], reviewer_id=data.manager_id, year=period[0], month=period[1], score=90))
+        db.session.commit()
+        assert department_report(data.child_id, period, period)['monthly_kpi']['avg'] == 80
+
+def test_managers_only_see_reports_for_their_subtree(data, manager_client):
+    assert manager_client.get(f'/reports/departments/{data.root_id}').status_code == 403
+    assert manager_client.get(f'/reports/departments/{data.child_id}').status_code == 200
\ No newline at end of file
@@ -0,0 +1,104 @@
+from datetime import date, timedelta
+import pytest
+from app.extensions import db
+from app.models import Department, Project, Task
+from app.utils import search
+
+@pytest.fixture(params=['fts', 'like'])
+def backend(request, app, data):
+    """Runs each test against the FTS5 index and against the LIKE fallback."""
+    with app.app_context():
+        sales = Department(name='Sales', parent_id=data.root_id)
+        db.session.add(sales)
+        db.session.flush()
+        budget = Project(name='Budget planning', description='Yearly numbers', department_id=data.child_id, creator_id=data.admin_id)
+        pitch = Project(name='Pitch deck', description='Budget slides for the board', department_id=sales.id, creator_id=data.admin_id)
+        db.session.add_all([budget, pitch])
+        db.session.flush()
+        today = date.today()
+        db.session.add_all([
+            Task(name='Quarterly budget', description='Draft <b>numbers</b>', project_id=budget.id, start_date=today),
+            Task(name='Review slides', description='Check the budget totals', project_id=pitch.id,
+                 start_date=today - timedelta(days=60), end_date=today - timedelta(days=50)),
+        ])
+        db.session.commit()
+    if request.param == 'fts':
+        result = app.test_cli_runner().invoke(args=['search', 'rebuild'])
+        assert 'Indexed 42 tasks and 3 projects.' in result.output
+    with app.app_context():
+        assert search.available() == (request.param == 'fts')
+    return request.param
+
+def names(hits):
+    return [hit.name for hit in hits]
+
+def test_name_matches_rank_above_description_matches(app, backend):
+    with app.app_context():
+        hits = search.search('budget')
+    assert names(hits['project']) == ['Budget planning', 'Pitch deck']
+    assert names(hits['task']) == ['Quarterly budget', 'Review slides']
+    assert hits['task'][0].context == 'Budget planning'
+    assert hits['project'][1].context == 'Sales'
+
+def test_every_word_must_match_and_the_last_is_a_prefix(app, backend):
+    with app.app_context():
+        assert names(search.search('quarterly bud')['task']) == ['Quarterly budget']
+        assert names(search.search('budget nowhere')['task']) == []
+
+def test_filters(app, data, backend):
+    today = date.today()
+    with app.app_context():
+        # the Child subtree holds only the budget project
+        hits = search.search('budget', department_id=data.child_id)
+        assert names(hits['project']) == ['Budget planning'] and names(hits['task']) == ['Quarterly budget']
+        # task-only filters drop projects
+        assert list(search.search('budget', start=today - timedelta(days=7))) == ['task']
+        assert names(search.search('budget', start=today - timedelta(days=7))['task']) == ['Quarterly budget']
+        assert names(search.search('budget', end=today - timedelta(days=30))['task']) == ['Review slides']
+        # member 2 has tasks 2, 7, ..., 37
+        hits = search.search('task', assignee_id=data.member_ids[2], limit=100)['task']
+        assert sorted(names(hits)) == sorted(f'Task {i}' for i in range(2, 40, 5))
+
+def test_index_follows_inserts_renames_deletes_and_bulk_writes(app, data, backend):
+    with app.app_context():
+        task = Task(name='Forecast model', project_id=data.project_id)
+        db.session.add(task)
+        db.session.commit()
+        assert names(search.search('forecast')['task']) == ['Forecast model']
+
+        task.name = 'Revenue model'
+        db.session.commit()
+        assert names(search.search('forecast')['task']) == []
+        assert names(search.search('revenue')['task']) == ['Revenue model']
+
+        db.session.delete(task)
+        db.session.commit()
+        assert names(search.search('revenue')['task']) == []
+
+        db.session.execute(db.insert(Task), [{'name': 'Bulk forecast', 'project_id': data.project_id}])
+        db.session.commit()
+        assert names(search.search('forecast')['task']) == ['Bulk forecast']
+        db.session.execute(db.update(Task).where(Task.name == 'Bulk forecast').values(name='Bulk estimate'))
+        db.session.commit()
+        assert names(search.search('forecast')['task']) == []
+
+def test_user_input_is_not_query_syntax(app, backend):
+    with app.app_context():
+        assert names(search.search('"budget" OR NEAR(* -)')['task']) == []
+        assert search.search('*** ""') == {'project': [], 'task': []}
+
+def test_snippets_escape_text_and_mark_matches(app, backend):
+    if backend == 'like':
+        pytest.skip('the LIKE fallback has no snippets')
+    with app.app_context():
+        [hit] = search.search('numbers')['task']
+    assert hit.snippet == 'Draft &lt;b&gt;<mark>numbers</mark>&lt;/b&gt;'
+
+def test_typeahead(app, admin_client, backend):
+    response = admin_client.get('/search/typeahead?q=bu')
+    assert [(r['kind'], r['text']) for r in response.get_json()['results']] == [
+        ('project', 'Budget planning'), ('task', 'Quarterly budget'),
+    ]
+    assert admin_client.get('/search/typeahead?q=b').get_json() == {'results': []}
+    html = admin_client.get('/search/?q=budget').get_data(as_text=True)
+    assert 'Quarterly budget' in html and 'Pitch deck' in html
\ No newline at end of file
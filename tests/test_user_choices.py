@@ -0,0 +1,59 @@
+import re
+import pytest
+from app.extensions import db
+from app.models import User, UserAssignment
+
+@pytest.fixture
+def outsider(app, data):
+    """A user of the root department, which the manager does not manage."""
+    with app.app_context():
+        user = User(name='Outsider', email='outsider@example.com', password_hash='!')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(UserAssignment(user_id=user.id, role_id=data.role_ids['member'], department_id=data.root_id))
+        db.session.commit()
+        return user.id
+
+def names(client, **params):
+    response = client.get('/users/choices', query_string=params)
+    assert response.status_code == 200
+    return [row['text'].split(' (')[0] for row in response.get_json()['results']]
+
+def test_members_cannot_search_users(member_client):
+    response = member_client.get('/users/choices')
+    assert response.status_code == 302
+
+def test_managers_only_find_users_of_their_departments(manager_client, admin_client, outsider):
+    found = names(manager_client, per_page=100)
+    assert 'Manager' in found and 'Member 9' in found
+    assert 'Outsider' not in found and 'Admin' not in found
+    assert names(manager_client, q='outsider') == []
+    assert names(admin_client, q='outsider') == ['Outsider']
+
+def options(html, select_name):
+    select = re.search(rf'<select[^>]*name="{select_name}"[^>]*>(.*?)</select>', html, re.S)
+    return re.findall(r'<option[^>]* value="(\d+)"', select.group(1))
+
+def test_task_list_embeds_users_until_the_limit(app, data, manager_client):
+    html = manager_client.get('/tasks/').get_data(as_text=True)
+    assert len(options(html, 'assignee')) == 12
+    assert 'data-source' not in html
+
+    app.config['CHOICES_INLINE_LIMIT'] = 5
+    html = manager_client.get('/tasks/', query_string={'assignee': data.member_ids[3]}).get_data(as_text=True)
+    assert options(html, 'assignee') == [str(data.member_ids[3])]
+    assert 'data-source="/users/choices"' in html
+
+def test_task_form_only_embeds_the_selected_users_past_the_limit(app, data, manager_client):
+    app.config['CHOICES_INLINE_LIMIT'] = 5
+    html = manager_client.get(f'/tasks/{data.task_ids[1]}/edit').get_data(as_text=True)
+    assert options(html, 'manager_id') == [str(data.manager_id)]
+    assert options(html, 'assignees') == [str(data.member_ids[1])]
+
+    response = manager_client.post(f'/tasks/{data.task_ids[1]}/edit', data={
+        'name': 'Renamed', 'project_id': data.project_id, 'manager_id': data.manager_id,
+        'assignees': [data.member_ids[7]], 'start_date': '2026-01-01', 'end_date': '2026-01-31',
+    })
+    assert response.status_code == 302
+    with app.app_context():
+        assert db.session.get(User, data.member_ids[7]).assigned_tasks
\ No newline at end of file
@@ -0,0 +1,45 @@
+from datetime import date, timedelta
+import pytest
+from app.extensions import db
+from app.models import Project, Task, TaskReview, User
+from app.utils.user_detail import load_user_detail
+
+@pytest.mark.parametrize('per_page', [1, 10, 50])
+def test_loads_in_four_queries_whatever_the_page_size(app, data, queries, per_page):
+    with app.app_context():
+        queries.clear()
+        detail = load_user_detail(data.member_ids[0], page=1, per_page=per_page, kpi_period=(2024, 5))
+        # everything the template reads from each task
+        [(t.project.name, t.manager.name if t.manager else None, t.best_score) for t in detail.tasks.items]
+        assert len(queries) == 4, queries
+
+def test_page_query_count_does_not_grow_with_tasks(app, data, manager_client, queries):
+    member_id = data.member_ids[0]
+    today = date.today()
+    url = f'/users/{member_id}/detail?start_date={today - timedelta(days=60)}&end_date={today}'
+    manager_client.get(url).get_data()
+    queries.clear()
+    manager_client.get(url).get_data()
+    before = len(queries)
+
+    # a full page of tasks, each with its own project, manager and review
+    with app.app_context():
+        member = db.session.get(User, member_id)
+        for i in range(20):
+            project = Project(name=f'Other {i}', department_id=data.child_id, creator_id=data.admin_id)
+            manager = User(name=f'Lead {i}', email=f'lead{i}@example.com', password_hash='!')
+            db.session.add_all([project, manager])
+            db.session.flush()
+            task = Task(name=f'Extra {i}', project_id=project.id, manager_id=manager.id, created_by=data.admin_id,
+                        start_date=today, submitted=True)
+            task.assignees = [member]
+            db.session.add(task)
+            db.session.flush()
+            db.session.add(TaskReview(task_id=task.id, reviewer_id=data.manager_id, score=50 + i))
+        db.session.commit()
+
+    manager_client.get(url).get_data()
+    queries.clear()
+    response = manager_client.get(url)
+    assert b'Extra 19' in response.get_data()
+    assert len(queries) <= before, queries
\ No newline at end of file
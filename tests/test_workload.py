@@ -0,0 +1,40 @@
+from datetime import date
+import pytest
+from app.extensions import db
+from app.models import Task
+from app.utils import workload
+
+FIRST_DAY = date(2026, 3, 2)
+
+# (user, start, end, percent): clipped at both ends of the window, a one-day task, a default
+# percent, overlapping tasks and a user with nothing scheduled
+INTERVALS = [
+    (1, date(2026, 2, 20), date(2026, 3, 4), 50),
+    (1, date(2026, 3, 3), date(2026, 3, 3), 30),
+    (1, date(2026, 3, 6), date(2026, 3, 20), None),
+    (2, date(2026, 3, 2), date(2026, 3, 8), 100),
+    (2, date(2026, 3, 5), date(2026, 3, 6), 25),
+]
+EXPECTED = {
+    1: [50, 80, 50, 0, 40, 40, 40],
+    2: [100, 100, 100, 125, 125, 100, 100],
+    3: [0] * 7,
+}
+
+def test_python_sweep():
+    assert workload._sweep_python([1, 2, 3], INTERVALS, FIRST_DAY, 7, 40) == EXPECTED
+
+def test_numpy_sweep_matches_python():
+    pytest.importorskip('numpy')
+    assert workload._sweep_numpy([1, 2, 3], INTERVALS, FIRST_DAY, 7, 40) == EXPECTED
+    assert workload._sweep_numpy([1, 2, 3], [], FIRST_DAY, 7, 40) == workload._sweep_python([1, 2, 3], [], FIRST_DAY, 7, 40)
+
+def test_daily_loads_agree_with_and_without_numpy(app, data, monkeypatch):
+    with app.app_context():
+        db.session.get(Task, data.task_ids[0]).end_date = None
+        db.session.commit()
+        first_day = date.today().replace(day=1)
+        loads = workload.daily_loads(data.member_ids, first_day, 35)
+        monkeypatch.setattr(workload, 'np', None)
+        assert workload.daily_loads(data.member_ids, first_day, 35) == loads
+    assert any(any(row) for row in loads.values())
\ No newline at end of file